@@ -5,9 +5,12 @@ File lengkap: app.py (REVISI - TANPA CHAT DAN REPORT)
 
 import os
 import sys
+import time
 import uuid
+import hmac
+import hashlib
+import threading
 import bcrypt
-import mysql.connector
 from mysql.connector import Error
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -16,26 +19,31 @@ import json
 import requests
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, g, has_request_context
+from flask import before_render_template, template_rendered
 from flask_session import Session
 from werkzeug.utils import secure_filename
 import logging
 from dotenv import load_dotenv
-import base64
-import midtransclient
+from logging_setup import setup_logging, parse_mapping
+from metrics import MetricsRegistry, InstrumentedCursor
+from slow_queries import SlowQueryLog
+from db_pool import ConnectionPool
+from fleet_cache import FleetSnapshot
+from availability import AvailabilityIndex
+from webhook_queue import WebhookQueue, WebhookEvent
+from idempotency import EventDedup, event_key
+from midtrans_client import MidtransClient, CircuitBreaker, auth_header
+from snap_tokens import SnapTokenManager
+from suggest import SuggestionSource
+from search_index import fulltext_query
+from keyset import CountCache, decode_cursor, seek_clause, split_page, next_cursor
+from image_pipeline import ImagePipeline, ImageRejected, srcset
+from markupsafe import Markup, escape
 
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
 # ============================================
@@ -52,6 +60,12 @@ class Config:
     DB_PASSWORD = os.environ.get('DB_PASSWORD', 'Vallenlistrik1')
     DB_NAME = os.environ.get('DB_NAME', 'rental_mobil')
     
+    # Database Connection Pool
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_POOL_MAX_LIFETIME = int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800))  # detik
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # detik menunggu koneksi kosong
+    DB_POOL_VALIDATE_IDLE = int(os.environ.get('DB_POOL_VALIDATE_IDLE', 5))  # ping jika idle >= N detik
+    
     # File Upload Configuration
     UPLOAD_FOLDER = 'static/uploads'
     CAR_UPLOAD_FOLDER = 'static/uploads/cars'
@@ -59,6 +73,13 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     
+    # Pipeline gambar upload: file utama JPEG + varian JPEG/WebP per lebar (lihat image_pipeline.py)
+    IMAGE_MAX_WIDTH = int(os.environ.get('IMAGE_MAX_WIDTH', 1600))  # piksel, file utama
+    CAR_IMAGE_WIDTHS = tuple(int(w) for w in os.environ.get('CAR_IMAGE_WIDTHS', '320,640,1024').split(','))
+    PROFILE_IMAGE_WIDTHS = tuple(int(w) for w in os.environ.get('PROFILE_IMAGE_WIDTHS', '96,256').split(','))
+    IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 82))
+    IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 80))
+    
     # Session Configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=1)
     SESSION_TYPE = 'filesystem'
@@ -70,16 +91,67 @@ class Config:
     MIDTRANS_SERVER_KEY = os.environ.get('MIDTRANS_SERVER_KEY', 'Mid-server-dfRkZmytSoucD3XLAPV2iEqa')
     MIDTRANS_CLIENT_KEY = os.environ.get('MIDTRANS_CLIENT_KEY', 'Mid-client-KMUkkAkMpLMRF8Ya')
     MIDTRANS_SANDBOX = os.environ.get('MIDTRANS_SANDBOX', 'True').lower() == 'true'
-    MIDTRANS_API_URL = 'https://app.sandbox.midtrans.com/snap/v1/transactions' if MIDTRANS_SANDBOX else 'https://app.midtrans.com/snap/v1/transactions'
+    # Bisa diarahkan ke stand-in lokal (fake_midtrans.py) untuk pengujian offline
+    MIDTRANS_API_URL = os.environ.get('MIDTRANS_API_URL', 'https://app.sandbox.midtrans.com/snap/v1/transactions' if MIDTRANS_SANDBOX else 'https://app.midtrans.com/snap/v1/transactions')
+    MIDTRANS_API_BASE_URL = os.environ.get('MIDTRANS_API_BASE_URL', 'https://api.sandbox.midtrans.com' if MIDTRANS_SANDBOX else 'https://api.midtrans.com')
+    MIDTRANS_SNAP_JS_URL = os.environ.get('MIDTRANS_SNAP_JS_URL', 'https://app.sandbox.midtrans.com/snap/snap.js' if MIDTRANS_SANDBOX else 'https://app.midtrans.com/snap/snap.js')
+    MIDTRANS_CONNECT_TIMEOUT = float(os.environ.get('MIDTRANS_CONNECT_TIMEOUT', 3.05))  # detik
+    MIDTRANS_READ_TIMEOUT = float(os.environ.get('MIDTRANS_READ_TIMEOUT', 5))  # detik
+    MIDTRANS_MAX_RETRIES = int(os.environ.get('MIDTRANS_MAX_RETRIES', 2))
+    MIDTRANS_BREAKER_THRESHOLD = int(os.environ.get('MIDTRANS_BREAKER_THRESHOLD', 5))  # gagal berturut-turut
+    MIDTRANS_BREAKER_RESET = int(os.environ.get('MIDTRANS_BREAKER_RESET', 30))  # detik sebelum dicoba lagi
+    SNAP_TOKEN_TTL = int(os.environ.get('SNAP_TOKEN_TTL', 1440))  # menit, masa berlaku token Snap
+    MIDTRANS_VERIFY_SIGNATURE = os.environ.get('MIDTRANS_VERIFY_SIGNATURE', 'True').lower() == 'true'
+    
+    # Midtrans Webhook Queue (notifikasi diproses worker di belakang layar)
+    WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', 4))
+    WEBHOOK_BATCH_SIZE = int(os.environ.get('WEBHOOK_BATCH_SIZE', 50))
+    WEBHOOK_BATCH_WAIT = float(os.environ.get('WEBHOOK_BATCH_WAIT', 0.05))  # detik mengumpulkan batch
+    WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 5))
+    PAYMENT_EVENT_CACHE_SIZE = int(os.environ.get('PAYMENT_EVENT_CACHE_SIZE', 10000))  # key event di LRU
     
     # Application Settings
     ITEMS_PER_PAGE = 10
+    API_PAGE_MAX_LIMIT = 50  # maksimal item per halaman API infinite scroll
+    COUNT_CACHE_TTL = int(os.environ.get('COUNT_CACHE_TTL', 30))  # detik, total daftar boleh basi
+    SEARCH_FULLTEXT = os.environ.get('SEARCH_FULLTEXT', 'True').lower() == 'true'  # False = selalu LIKE
+    SEARCH_NGRAM_TOKEN_SIZE = int(os.environ.get('SEARCH_NGRAM_TOKEN_SIZE', 2))  # sama dengan ngram_token_size MySQL
+    SUGGEST_MAX_AGE = int(os.environ.get('SUGGEST_MAX_AGE', 600))  # detik, reload penuh index saran
+    SUGGEST_MAX_ORDERS = int(os.environ.get('SUGGEST_MAX_ORDERS', 50000))  # kode pesanan terbaru di index saran
+    SUGGEST_MAX_LIMIT = 10
+    FLEET_SNAPSHOT_MAX_AGE = int(os.environ.get('FLEET_SNAPSHOT_MAX_AGE', 300))  # detik, reload penuh
+    AVAILABILITY_MAX_AGE = int(os.environ.get('AVAILABILITY_MAX_AGE', 300))  # detik, reload penuh
     BOOKING_ADVANCE_DAYS = 1
     MAX_RENTAL_DAYS = 30
     
     # WhatsApp Contact (Ganti dengan nomor admin yang sesuai)
     WHATSAPP_ADMIN_NUMBER = os.environ.get('WHATSAPP_ADMIN_NUMBER', '6281234567890')
     
+    # Admin Authorization Cache (detik); batas waktu perubahan role/status berlaku
+    ADMIN_ROLE_CACHE_TTL = int(os.environ.get('ADMIN_ROLE_CACHE_TTL', 60))
+    
+    # Logging (ditulis thread terpisah lewat antrean; request tidak menunggu disk)
+    LOG_FILE = os.environ.get('LOG_FILE', 'app.log')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    # Level per logger: "nama=LEVEL,..."; DEBUG mysql.connector berisi obrolan auth tiap koneksi
+    LOG_LEVELS = parse_mapping(os.environ.get('LOG_LEVELS', 'mysql.connector=WARNING,urllib3=WARNING,werkzeug=INFO'))
+    # Sampling baris INFO bervolume tinggi: "awalan pesan=N" -> simpan 1 dari N
+    LOG_SAMPLE = parse_mapping(os.environ.get('LOG_SAMPLE', 'Notification queued for order=10,Midtrans log inserted for order=10'))
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))  # byte, rotasi berdasarkan ukuran
+    LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN', '')  # mis. 'midnight' = rotasi waktu; kosong = ukuran
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 10))
+    LOG_COMPRESS = os.environ.get('LOG_COMPRESS', 'True').lower() == 'true'  # arsip rotasi di-gzip
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))  # record; penuh = dibuang, bukan menunggu
+    
+    # Metrics & access log per request
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # kosong = /metrics terbuka (batasi di reverse proxy)
+    ACCESS_LOG = os.environ.get('ACCESS_LOG', 'True').lower() == 'true'
+    
+    # Slow query log di lapisan cursor (lihat /admin/slow-queries)
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))  # milidetik
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'True').lower() == 'true'  # EXPLAIN kejadian pertama
+    SLOW_QUERY_MAX_FINGERPRINTS = int(os.environ.get('SLOW_QUERY_MAX_FINGERPRINTS', 200))
+    
     @staticmethod
     def init_app(app):
         for folder in [app.config['UPLOAD_FOLDER'], 
@@ -91,45 +163,437 @@ class Config:
 # FLASK APP INITIALIZATION
 # ============================================
 
+log_pipeline = setup_logging(
+    log_file=Config.LOG_FILE,
+    level=Config.LOG_LEVEL,
+    levels=Config.LOG_LEVELS,
+    sample=Config.LOG_SAMPLE,
+    max_bytes=Config.LOG_MAX_BYTES,
+    rotate_when=Config.LOG_ROTATE_WHEN,
+    backup_count=Config.LOG_BACKUP_COUNT,
+    compress=Config.LOG_COMPRESS,
+    queue_size=Config.LOG_QUEUE_SIZE
+)
+
 app = Flask(__name__)
 app.config.from_object(Config)
 
 Session(app)
 Config.init_app(app)
 
+# ============================================
+# METRICS & REQUEST INSTRUMENTATION
+# ============================================
+
+metrics = MetricsRegistry(prefix='rental_')
+http_duration = metrics.histogram('http_request_duration_seconds', 'Request latency per endpoint',
+                                  labels=('endpoint', 'method', 'status'))
+http_db_queries = metrics.counter('http_db_queries_total', 'DB queries issued by requests per endpoint',
+                                  labels=('endpoint',))
+http_db_seconds = metrics.counter('http_db_seconds_total', 'DB time spent by requests per endpoint',
+                                  labels=('endpoint',))
+db_query_duration = metrics.histogram('db_query_duration_seconds', 'Duration of each DB statement',
+                                      labels=('statement',))
+midtrans_duration = metrics.histogram('midtrans_request_duration_seconds', 'Midtrans API call latency',
+                                      labels=('method', 'outcome'))
+template_duration = metrics.histogram('template_render_seconds', 'Template render time',
+                                      labels=('template',))
+metrics.gauge('db_pool_connections', 'Pooled DB connections by state',
+              lambda: {(state,): db_pool.stats()[state] for state in ('in_use', 'idle', 'waiters')},
+              labels=('state',))
+metrics.gauge('webhook_queue_depth', 'Midtrans notifications waiting to be applied',
+              lambda: {(): webhook_queue.stats()['depth']})
+metrics.gauge('log_records_dropped', 'Log records dropped because the log queue was full',
+              lambda: {(): log_pipeline.stats()['dropped']})
+
+access_logger = logging.getLogger('access')
+
+# Jenis statement (SELECT, UPDATE, ...) sebagai label; teks query lengkap terlalu beragam
+SQL_VERBS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CALL', 'EXPLAIN', 'SHOW')
+
+def request_perf():
+    """Per-request counters, or None outside a request"""
+    if has_request_context():
+        return g.get('perf')
+    return None
+
+def statement_verb(statement):
+    words = str(statement or '').lstrip(' (\r\n\t').split(None, 1)
+    verb = words[0].upper() if words else ''
+    return verb if verb in SQL_VERBS else 'OTHER'
+
+def explain_statement(statement, params):
+    """EXPLAIN a captured slow statement on its own pooled connection"""
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="Database unavailable for EXPLAIN")
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(f"EXPLAIN {statement}", params)
+        plan = cursor.fetchall()
+        cursor.close()
+        return plan
+    finally:
+        conn.close()
+
+slow_query_log = SlowQueryLog(
+    threshold=app.config['SLOW_QUERY_THRESHOLD_MS'] / 1000,
+    explain=explain_statement if app.config['SLOW_QUERY_EXPLAIN'] else None,
+    max_fingerprints=app.config['SLOW_QUERY_MAX_FINGERPRINTS']
+)
+
+def observe_query(seconds, statement, params=None):
+    """InstrumentedCursor callback: statement histogram, slow query log, per-request DB totals"""
+    db_query_duration.observe(seconds, statement_verb(statement))
+    slow_query_log.observe(seconds, statement, params)
+    perf = request_perf()
+    if perf is not None:
+        perf['db_queries'] += 1
+        perf['db_seconds'] += seconds
+
+def observe_midtrans(method, outcome, seconds):
+    """MidtransClient observer: latency per method/outcome + per-request totals"""
+    midtrans_duration.observe(seconds, method, outcome)
+    perf = request_perf()
+    if perf is not None:
+        perf['midtrans_calls'] += 1
+        perf['midtrans_seconds'] += seconds
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    perf = request_perf()
+    if perf is not None:
+        perf['render_started'].append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def stop_template_timer(sender, template, context, **extra):
+    perf = request_perf()
+    if perf is not None and perf['render_started']:
+        seconds = time.perf_counter() - perf['render_started'].pop()
+        template_duration.observe(seconds, template.name or 'string')
+        perf['render_seconds'] += seconds
+
+@app.before_request
+def start_request_timer():
+    g.perf = {
+        'started': time.perf_counter(),
+        'db_queries': 0,
+        'db_seconds': 0.0,
+        'midtrans_calls': 0,
+        'midtrans_seconds': 0.0,
+        'render_seconds': 0.0,
+        'render_started': [],
+    }
+
+@app.after_request
+def record_request_metrics(response):
+    """Latency histogram per endpoint and one key=value access log line per request"""
+    perf = request_perf()
+    if perf is None:
+        return response
+    
+    duration = time.perf_counter() - perf['started']
+    endpoint = request.endpoint or 'unmatched'
+    http_duration.observe(duration, endpoint, request.method, str(response.status_code))
+    http_db_queries.inc(endpoint, amount=perf['db_queries'])
+    http_db_seconds.inc(endpoint, amount=perf['db_seconds'])
+    
+    if app.config['ACCESS_LOG']:
+        access_logger.info(
+            f"method={request.method} path={request.full_path.rstrip('?')} endpoint={endpoint} "
+            f"status={response.status_code} duration_ms={duration * 1000:.1f} "
+            f"db_queries={perf['db_queries']} db_ms={perf['db_seconds'] * 1000:.1f} "
+            f"render_ms={perf['render_seconds'] * 1000:.1f} "
+            f"midtrans_calls={perf['midtrans_calls']} midtrans_ms={perf['midtrans_seconds'] * 1000:.1f} "
+            f"ip={request.remote_addr}"
+        )
+    return response
+
+db_pool = ConnectionPool(
+    size=app.config['DB_POOL_SIZE'],
+    max_lifetime=app.config['DB_POOL_MAX_LIFETIME'],
+    timeout=app.config['DB_POOL_TIMEOUT'],
+    validate_idle=app.config['DB_POOL_VALIDATE_IDLE'],
+    cursor_wrapper=lambda cursor: InstrumentedCursor(cursor, observe_query),
+    host=app.config['DB_HOST'],
+    user=app.config['DB_USER'],
+    password=app.config['DB_PASSWORD'],
+    database=app.config['DB_NAME'],
+    autocommit=False
+)
+
+midtrans = MidtransClient(
+    server_key=app.config['MIDTRANS_SERVER_KEY'],
+    api_base_url=app.config['MIDTRANS_API_BASE_URL'],
+    snap_url=app.config['MIDTRANS_API_URL'],
+    connect_timeout=app.config['MIDTRANS_CONNECT_TIMEOUT'],
+    read_timeout=app.config['MIDTRANS_READ_TIMEOUT'],
+    max_retries=app.config['MIDTRANS_MAX_RETRIES'],
+    breaker=CircuitBreaker(
+        failure_threshold=app.config['MIDTRANS_BREAKER_THRESHOLD'],
+        reset_timeout=app.config['MIDTRANS_BREAKER_RESET']
+    ),
+    observer=observe_midtrans
+)
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
 def get_db_connection():
-    """Create database connection"""
+    """Get pooled database connection (one connection per request)"""
+    if has_request_context() and 'db_conn' in g:
+        return g.db_conn
+    
     try:
-        connection = mysql.connector.connect(
-            host=app.config['DB_HOST'],
-            user=app.config['DB_USER'],
-            password=app.config['DB_PASSWORD'],
-            database=app.config['DB_NAME'],
-            autocommit=False
-        )
-        return connection
+        connection = db_pool.acquire()
     except Error as e:
         logger.error(f"Error connecting to MySQL: {e}")
         return None
+    
+    if has_request_context():
+        # close() di view tidak mengembalikan koneksi; dilepas saat teardown
+        connection.request_bound = True
+        g.db_conn = connection
+    return connection
+
+@app.teardown_request
+def release_db_connection(exception=None):
+    """Return the request connection to the pool"""
+    connection = g.pop('db_conn', None)
+    if connection is not None:
+        connection.release()
+
+def load_fleet_rows(car_id=None):
+    """Read mobil rows for the fleet snapshot (all cars, or one car)"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        if car_id is None:
+            cursor.execute("SELECT * FROM mobil")
+        else:
+            cursor.execute("SELECT * FROM mobil WHERE id = %s", (car_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except Error as e:
+        logger.error(f"Error loading fleet snapshot: {e}")
+        return None
+    finally:
+        conn.close()
+
+fleet_snapshot = FleetSnapshot(load_fleet_rows, max_age=app.config['FLEET_SNAPSHOT_MAX_AGE'])
+
+def load_suggestion_rows(query, row_query, row_id=None, params=()):
+    """Rows for a SuggestionSource: all (query) or one (row_query); None on database error"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        if row_id is None:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(row_query, (row_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except Error as e:
+        logger.error(f"Error loading suggestions: {e}")
+        return None
+    finally:
+        conn.close()
+
+# Saran typeahead admin: nama & email user, kode pesanan terbaru
+user_suggestions = SuggestionSource(
+    lambda user_id=None: load_suggestion_rows(
+        "SELECT id, nama, email FROM users",
+        "SELECT id, nama, email FROM users WHERE id = %s", user_id),
+    {'nama': 'name', 'email': 'email'},
+    max_age=app.config['SUGGEST_MAX_AGE'],
+    whole_kinds=('email',)
+)
+order_suggestions = SuggestionSource(
+    lambda order_id=None: load_suggestion_rows(
+        "SELECT id, kode_pesanan FROM pesanan ORDER BY id DESC LIMIT %s",
+        "SELECT id, kode_pesanan FROM pesanan WHERE id = %s", order_id,
+        (app.config['SUGGEST_MAX_ORDERS'],)),
+    {'kode_pesanan': 'order'},
+    max_age=app.config['SUGGEST_MAX_AGE'],
+    whole_kinds=('order',)
+)
+
+# Pesanan yang masih memblokir mobilnya pada rentang tanggal_mulai..tanggal_selesai
+BLOCKING_ORDER_CONDITION = """
+    status NOT IN ('dibatalkan', 'selesai')
+    AND status_pembayaran NOT IN ('failed', 'expired')
+"""
+
+def load_blocking_orders(order_id=None):
+    """Read orders that still block their car, for the availability index"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        if order_id is None:
+            cursor.execute(f"""
+                SELECT id, mobil_id, tanggal_mulai, tanggal_selesai FROM pesanan
+                WHERE {BLOCKING_ORDER_CONDITION} AND tanggal_selesai >= CURDATE()
+            """)
+        else:
+            cursor.execute(f"""
+                SELECT id, mobil_id, tanggal_mulai, tanggal_selesai FROM pesanan
+                WHERE id = %s AND {BLOCKING_ORDER_CONDITION}
+            """, (order_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+    except Error as e:
+        logger.error(f"Error loading availability index: {e}")
+        return None
+    finally:
+        conn.close()
+
+availability_index = AvailabilityIndex(load_blocking_orders, max_age=app.config['AVAILABILITY_MAX_AGE'])
+
+# Mobil dalam status ini bisa dipesan untuk tanggal yang masih kosong.
+# mobil.status hanya diubah admin (mis. 'maintenance'); 'disewa' tersisa dari data lama.
+# Ketersediaan per tanggal selalu diambil dari availability_index.
+RENTABLE_CAR_STATUSES = ('tersedia', 'disewa')
+
+def parse_rental_range(tanggal_mulai, tanggal_selesai):
+    """(start, end) dates of an availability query; ValueError with a user-facing message"""
+    try:
+        start_date = datetime.strptime(tanggal_mulai, '%Y-%m-%d').date()
+        end_date = datetime.strptime(tanggal_selesai, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('tanggal_mulai dan tanggal_selesai harus format YYYY-MM-DD')
+    if end_date < start_date:
+        raise ValueError('tanggal_selesai harus setelah tanggal_mulai')
+    if start_date < datetime.now().date():
+        raise ValueError('tanggal_mulai tidak boleh sebelum hari ini')
+    if (end_date - start_date).days + 1 > app.config['MAX_RENTAL_DAYS']:
+        raise ValueError(f'Maksimal sewa adalah {app.config["MAX_RENTAL_DAYS"]} hari')
+    return start_date, end_date
+
+def create_booking(conn, user_id, car_id, start_date, end_date, lokasi_penjemputan=None, catatan=None):
+    """Reserve a car for a date range in one transaction.
+    
+    The car row is locked with SELECT ... FOR UPDATE so concurrent bookings of the
+    same car are serialized, then a conditional INSERT ... SELECT only inserts when
+    no blocking order overlaps the range. Returns (order, None) on success or
+    (None, reason) with reason 'unavailable' or 'conflict'. Database errors are
+    raised after rolling back.
+    """
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    try:
+        placeholders = ', '.join(['%s'] * len(RENTABLE_CAR_STATUSES))
+        cursor.execute(f"""
+            SELECT harga_per_hari FROM mobil
+            WHERE id = %s AND status IN ({placeholders})
+            FOR UPDATE
+        """, (car_id, *RENTABLE_CAR_STATUSES))
+        car = cursor.fetchone()
+        if not car:
+            conn.rollback()
+            return None, 'unavailable'
+        
+        durasi_hari = (end_date - start_date).days + 1
+        total_harga = car['harga_per_hari'] * durasi_hari
+        kode_pesanan = generate_booking_code()
+        
+        cursor.execute(f"""
+            INSERT INTO pesanan (
+                kode_pesanan, user_id, mobil_id, tanggal_mulai, tanggal_selesai,
+                durasi_hari, total_harga, lokasi_penjemputan, catatan,
+                metode_pembayaran, status_pembayaran, status
+            )
+            SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, 'midtrans', 'pending', 'pending'
+            FROM DUAL
+            WHERE NOT EXISTS (
+                SELECT 1 FROM pesanan
+                WHERE mobil_id = %s AND {BLOCKING_ORDER_CONDITION}
+                AND tanggal_mulai <= %s AND tanggal_selesai >= %s
+            )
+        """, (
+            kode_pesanan, user_id, car_id, start_date, end_date,
+            durasi_hari, total_harga, lokasi_penjemputan, catatan,
+            car_id, end_date, start_date
+        ))
+        
+        if cursor.rowcount != 1:
+            conn.rollback()
+            return None, 'conflict'
+        
+        order = {
+            'id': cursor.lastrowid,
+            'kode_pesanan': kode_pesanan,
+            'mobil_id': car_id,
+            'tanggal_mulai': start_date,
+            'tanggal_selesai': end_date,
+            'durasi_hari': durasi_hari,
+            'total_harga': total_harga
+        }
+        conn.commit()
+        return order, None
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def save_file(file, folder):
-    """Save uploaded file with unique filename"""
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4().hex}_{filename}"
-        filepath = os.path.join(folder, unique_filename)
-        file.save(filepath)
-        return unique_filename
-    return None
+image_pipeline = ImagePipeline(
+    max_width=app.config['IMAGE_MAX_WIDTH'],
+    jpeg_quality=app.config['IMAGE_JPEG_QUALITY'],
+    webp_quality=app.config['IMAGE_WEBP_QUALITY']
+)
+
+# Subfolder upload -> (folder di disk, lebar varian)
+IMAGE_FOLDERS = {
+    'cars': (app.config['CAR_UPLOAD_FOLDER'], app.config['CAR_IMAGE_WIDTHS']),
+    'profiles': (app.config['PROFILE_UPLOAD_FOLDER'], app.config['PROFILE_IMAGE_WIDTHS']),
+}
+
+def save_image(file, kind):
+    """Save an uploaded image through the pipeline (upright, no metadata, JPEG/WebP variants).
+    
+    Returns (filename, None) on success or (None, message) with a message to flash.
+    """
+    if not file or not allowed_file(file.filename):
+        return None, f"Format gambar tidak didukung (gunakan {', '.join(sorted(app.config['ALLOWED_EXTENSIONS']))})"
+    folder, widths = IMAGE_FOLDERS[kind]
+    filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
+    try:
+        return image_pipeline.save(file.stream, folder, filename, widths), None
+    except ImageRejected as e:
+        logger.warning(f"Rejected image upload {file.filename}: {e}")
+        return None, 'Gambar tidak dapat diproses. Pastikan file adalah gambar yang valid dan tidak terlalu besar.'
+
+@app.template_global()
+def responsive_image(kind, filename, alt='', sizes='100vw', **attrs):
+    """<picture> with WebP/JPEG srcset for an uploaded image; plain <img> if it has no variants"""
+    folder, widths = IMAGE_FOLDERS[kind]
+    url = lambda name: url_for('serve_upload', filename=f"{kind}/{name}")
+    # class_ -> class (kata kunci Python)
+    extra = ''.join(f' {name.rstrip("_")}="{escape(value)}"' for name, value in attrs.items())
+    img = f'<img src="{escape(url(filename))}" alt="{escape(alt)}"{extra}'
+    found = image_pipeline.variants(folder, filename, widths)
+    if not found:
+        return Markup(img + '>')
+    return Markup(
+        f'<picture>'
+        f'<source type="image/webp" srcset="{escape(srcset(filename, found, "webp", url))}" sizes="{escape(sizes)}">'
+        f'{img} srcset="{escape(srcset(filename, found, "jpg", url))}" sizes="{escape(sizes)}">'
+        f'</picture>'
+    )
 
 def verify_password(password_hash, password_input):
     """Verify password with dual hash support"""
@@ -155,6 +619,57 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# user_id -> waktu perubahan role/status terakhir (cek role sebelum waktu ini dianggap basi)
+_role_invalidations = {}
+_role_invalidations_lock = threading.Lock()
+
+def invalidate_role_cache(user_id):
+    """Force the next admin check for this user to hit the database"""
+    now = time.time()
+    ttl = app.config['ADMIN_ROLE_CACHE_TTL']
+    with _role_invalidations_lock:
+        # Entri yang lebih tua dari TTL sudah tidak berpengaruh
+        for stale_id in [uid for uid, ts in _role_invalidations.items() if now - ts > ttl]:
+            del _role_invalidations[stale_id]
+        _role_invalidations[user_id] = now
+
+def stamp_role_check(role):
+    """Record a fresh role check in the session"""
+    session['user_role'] = role
+    session['role_checked_at'] = time.time()
+
+def has_cached_admin_role():
+    """True if the session holds an admin role check that is still valid"""
+    checked_at = session.get('role_checked_at')
+    if session.get('user_role') != 'admin' or not checked_at:
+        return False
+    if time.time() - checked_at >= app.config['ADMIN_ROLE_CACHE_TTL']:
+        return False
+    return checked_at > _role_invalidations.get(session['user_id'], 0)
+
+def is_active_admin():
+    """True if the logged-in user is an active admin (role cache first, then the database)"""
+    if 'user_id' not in session:
+        return False
+    
+    if has_cached_admin_role():
+        return True
+    
+    conn = get_db_connection()
+    if conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT role, status FROM users WHERE id = %s", (session['user_id'],))
+        user = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        
+        if user and user['role'] == 'admin' and user['status'] == 'active':
+            stamp_role_check(user['role'])
+            return True
+    
+    session.pop('role_checked_at', None)
+    return False
+
 def admin_required(f):
     """Decorator for requiring admin role"""
     @wraps(f)
@@ -163,16 +678,8 @@ def admin_required(f):
             flash('Silakan login terlebih dahulu', 'warning')
             return redirect(url_for('login'))
         
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT role FROM users WHERE id = %s", (session['user_id'],))
-            user = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            if user and user['role'] == 'admin':
-                return f(*args, **kwargs)
+        if is_active_admin():
+            return f(*args, **kwargs)
         
         flash('Akses ditolak. Hanya admin yang dapat mengakses halaman ini.', 'danger')
         return redirect(url_for('index'))
@@ -198,15 +705,9 @@ def generate_booking_code():
     """Generate unique booking code"""
     return f"RENT-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
 
-def generate_midtrans_token(order_data):
+def generate_midtrans_token(order_data, expiry_minutes=None):
     """Generate Midtrans Snap token for pop-up payment"""
     try:
-        # Create Snap API instance
-        snap = midtransclient.Snap(
-            is_production=not app.config['MIDTRANS_SANDBOX'],
-            server_key=app.config['MIDTRANS_SERVER_KEY']
-        )
-        
         # Prepare customer details
         customer_details = {
             "first_name": order_data.get('first_name', 'Customer'),
@@ -237,8 +738,12 @@ def generate_midtrans_token(order_data):
         if item_details:
             param["item_details"] = item_details
         
+        # Masa berlaku eksplisit agar kedaluwarsa token bisa dilacak
+        if expiry_minutes:
+            param["expiry"] = {"unit": "minutes", "duration": expiry_minutes}
+        
         # Create transaction
-        transaction = snap.create_transaction(param)
+        transaction = midtrans.create_snap_transaction(param)
         transaction_token = transaction['token']
         
         logger.info(f"Midtrans token generated for order {order_data['order_id']}")
@@ -250,9 +755,70 @@ def generate_midtrans_token(order_data):
 
 def get_midtrans_auth_header():
     """Generate Authorization header for Midtrans API"""
-    server_key = app.config['MIDTRANS_SERVER_KEY']
-    auth_string = base64.b64encode(f"{server_key}:".encode()).decode()
-    return f"Basic {auth_string}"
+    return auth_header(app.config['MIDTRANS_SERVER_KEY'])
+
+def load_payment_order(kode_pesanan):
+    """Order row joined with car and customer, as used by the payment page"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT p.*, m.merk, m.model, m.harga_per_hari, u.nama, u.email, u.no_telepon
+            FROM pesanan p 
+            JOIN mobil m ON p.mobil_id = m.id 
+            JOIN users u ON p.user_id = u.id 
+            WHERE p.kode_pesanan = %s
+        """, (kode_pesanan,))
+        order = cursor.fetchone()
+        cursor.close()
+        return order
+    finally:
+        conn.close()
+
+def build_snap_order_data(order):
+    """Snap transaction data from a load_payment_order() row"""
+    nama = (order['nama'] or '').split()
+    return {
+        'order_id': order['kode_pesanan'],
+        'gross_amount': int(order['total_harga']),
+        'first_name': nama[0] if nama else 'Customer',
+        'last_name': ' '.join(nama[1:]),
+        'email': order['email'],
+        'phone': order['no_telepon'] or '081234567890',
+        'item_details': [
+            {
+                'id': str(order['mobil_id']),
+                'price': int(order['harga_per_hari']),
+                'quantity': order['durasi_hari'],
+                'name': f"{order['merk']} {order['model']} Rental"
+            }
+        ]
+    }
+
+def store_snap_token(kode_pesanan, token, expires_at):
+    """Persist a new Snap token and its expiry on the order"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE pesanan 
+            SET midtrans_token = %s,
+                midtrans_token_expires_at = %s,
+                updated_at = NOW()
+            WHERE kode_pesanan = %s
+        """, (token, expires_at, kode_pesanan))
+        conn.commit()
+        cursor.close()
+        logger.info(f"Midtrans token generated for order {kode_pesanan}")
+    finally:
+        conn.close()
+
+snap_tokens = SnapTokenManager(generate_midtrans_token, store_snap_token,
+                               ttl_minutes=app.config['SNAP_TOKEN_TTL'])
 
 def terbilang(n):
     """Convert number to Indonesian words"""
@@ -289,37 +855,34 @@ def format_rupiah(n):
     except:
         return "Rp 0"
 
+MIDTRANS_LOG_INSERT = """
+    INSERT INTO midtrans_logs 
+    (order_id, transaction_id, transaction_status, fraud_status, 
+     payment_type, bank, va_number, gross_amount, response_data)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def midtrans_log_row(order_id, transaction_data):
+    """Parameters for one MIDTRANS_LOG_INSERT row"""
+    return (
+        order_id,
+        transaction_data.get('transaction_id'),
+        transaction_data.get('transaction_status'),
+        transaction_data.get('fraud_status'),
+        transaction_data.get('payment_type'),
+        transaction_data.get('bank'),
+        transaction_data.get('va_number'),
+        transaction_data.get('gross_amount'),
+        json.dumps(transaction_data)
+    )
+
 def insert_midtrans_log(order_id, transaction_data):
     """Insert Midtrans notification log"""
     try:
         conn = get_db_connection()
         if conn:
             cursor = conn.cursor()
-            
-            transaction_status = transaction_data.get('transaction_status')
-            fraud_status = transaction_data.get('fraud_status')
-            transaction_id = transaction_data.get('transaction_id')
-            payment_type = transaction_data.get('payment_type')
-            bank = transaction_data.get('bank')
-            va_number = transaction_data.get('va_number')
-            gross_amount = transaction_data.get('gross_amount')
-            
-            cursor.execute("""
-                INSERT INTO midtrans_logs 
-                (order_id, transaction_id, transaction_status, fraud_status, 
-                 payment_type, bank, va_number, gross_amount, response_data)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                order_id,
-                transaction_id,
-                transaction_status,
-                fraud_status,
-                payment_type,
-                bank,
-                va_number,
-                gross_amount,
-                json.dumps(transaction_data)
-            ))
+            cursor.execute(MIDTRANS_LOG_INSERT, midtrans_log_row(order_id, transaction_data))
             
             conn.commit()
             cursor.close()
@@ -335,8 +898,172 @@ def insert_midtrans_log(order_id, transaction_data):
 # FIXED VERSION: update_payment_status FUNCTION
 # ============================================
 
+HANDLED_TRANSACTION_STATUSES = ('settlement', 'capture', 'pending', 'deny', 'cancel', 'expire', 'failure')
+
+# Event (order_id, transaction_id, transaction_status) yang sudah di-commit
+payment_events = EventDedup(max_entries=app.config['PAYMENT_EVENT_CACHE_SIZE'])
+
+def payment_event_key(order_id, transaction_data):
+    return event_key(order_id, transaction_data.get('transaction_id'), transaction_data.get('transaction_status'))
+
+def claim_payment_event(cursor, order_id, transaction_data):
+    """Record the event in midtrans_events; False if it was already applied.
+    
+    The claim is part of the caller's transaction, so a rollback releases it.
+    A concurrent claim of the same key blocks on the unique index until the
+    other transaction finishes.
+    """
+    key = payment_event_key(order_id, transaction_data)
+    cursor.execute("""
+        INSERT IGNORE INTO midtrans_events (order_id, transaction_id, transaction_status)
+        VALUES (%s, %s, %s)
+    """, key)
+    return cursor.rowcount == 1
+
+def apply_payment_notification(cursor, order_id, transaction_data):
+    """Apply one Midtrans status to pesanan/mobil/pembayaran on an open transaction.
+    
+    Does not commit. Returns (order, outcome) where outcome is 'paid', 'pending',
+    'failed' or 'duplicate' (event already applied, nothing written), or None when
+    the order is unknown or the status is not handled. Call
+    payment_events.remember() with payment_event_key() once committed.
+    """
+    if payment_events.seen(payment_event_key(order_id, transaction_data)):
+        logger.info(f"Duplicate Midtrans event for order {order_id} skipped (cache)")
+        return None, 'duplicate'
+    
+    transaction_status = transaction_data.get('transaction_status')
+    transaction_id = transaction_data.get('transaction_id')
+    payment_type = transaction_data.get('payment_type')
+    bank = transaction_data.get('bank')
+    va_number = transaction_data.get('va_number')
+    settlement_time = transaction_data.get('settlement_time')
+    
+    logger.info(f"Updating payment status for order {order_id}: {transaction_status}")
+    
+    # Check if order exists
+    cursor.execute("SELECT id, mobil_id, user_id, total_harga FROM pesanan WHERE kode_pesanan = %s", (order_id,))
+    order = cursor.fetchone()
+    
+    if not order:
+        logger.error(f"Order {order_id} not found in database")
+        return None, None
+    
+    logger.info(f"Found order: ID={order['id']}, User={order['user_id']}, Mobil={order['mobil_id']}")
+    
+    if transaction_status not in HANDLED_TRANSACTION_STATUSES:
+        logger.warning(f"Unknown transaction status: {transaction_status}")
+        return order, None
+    
+    if not claim_payment_event(cursor, order_id, transaction_data):
+        logger.info(f"Duplicate Midtrans event for order {order_id} skipped")
+        return order, 'duplicate'
+    
+    # Handle different transaction statuses
+    if transaction_status in ['settlement', 'capture']:
+        # Pembayaran BERHASIL
+        new_payment_status = 'paid'
+        new_order_status = 'dikonfirmasi'
+        
+        # Handle settlement time
+        payment_date = None
+        if settlement_time:
+            try:
+                payment_date = datetime.strptime(settlement_time, '%Y-%m-%d %H:%M:%S')
+            except:
+                try:
+                    payment_date = datetime.strptime(settlement_time, '%Y-%m-%d %H:%M:%S.%f')
+                except:
+                    payment_date = datetime.now()
+        else:
+            payment_date = datetime.now()
+        
+        logger.info(f"Payment SUCCESS for {order_id}, payment date: {payment_date}")
+        
+        # Update pesanan
+        cursor.execute("""
+            UPDATE pesanan 
+            SET status_pembayaran = %s,
+                status = %s,
+                midtrans_order_id = %s,
+                midtrans_transaction_status = %s,
+                payment_type = %s,
+                bank = %s,
+                va_number = %s,
+                transaction_time = %s,
+                settlement_time = %s,
+                tanggal_pembayaran = %s,
+                updated_at = NOW()
+            WHERE kode_pesanan = %s
+        """, (
+            new_payment_status,
+            new_order_status,
+            transaction_id,
+            transaction_status,
+            payment_type,
+            bank,
+            va_number,
+            payment_date,
+            payment_date if transaction_status == 'settlement' else None,
+            payment_date,
+            order_id
+        ))
+        
+        # INSERT IGNORE + unique key (pesanan_id, transaction_id) mencegah duplikat
+        cursor.execute("""
+            INSERT IGNORE INTO pembayaran 
+            (pesanan_id, jumlah, metode, status, transaction_id, 
+             payment_type, bank, va_number, tanggal_pembayaran, created_at, updated_at)
+            VALUES (%s, %s, 'midtrans', 'success', %s, %s, %s, %s, %s, NOW(), NOW())
+        """, (
+            order['id'],
+            order['total_harga'],
+            transaction_id,
+            payment_type,
+            bank,
+            va_number,
+            payment_date
+        ))
+        return order, 'paid'
+        
+    elif transaction_status == 'pending':
+        # Pembayaran PENDING
+        cursor.execute("""
+            UPDATE pesanan 
+            SET status_pembayaran = 'pending',
+                midtrans_order_id = %s,
+                midtrans_transaction_status = %s,
+                payment_type = %s,
+                bank = %s,
+                va_number = %s,
+                updated_at = NOW()
+            WHERE kode_pesanan = %s
+        """, (transaction_id, transaction_status, payment_type, bank, va_number, order_id))
+        return order, 'pending'
+        
+    else:
+        # Pembayaran GAGAL (deny, cancel, expire, failure)
+        cursor.execute("""
+            UPDATE pesanan 
+            SET status_pembayaran = 'failed',
+                status = 'dibatalkan',
+                midtrans_order_id = %s,
+                midtrans_transaction_status = %s,
+                updated_at = NOW()
+            WHERE kode_pesanan = %s
+        """, (transaction_id, transaction_status, order_id))
+        return order, 'failed'
+
+def after_payment_applied(order, outcome):
+    """Sync in-memory caches after a committed payment status change"""
+    if outcome == 'paid':
+        availability_index.refresh_order(order['id'])
+    elif outcome == 'failed':
+        availability_index.remove_booking(order['id'])
+
 def update_payment_status(order_id, transaction_data):
     """Update payment status based on Midtrans notification - FIXED VERSION"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -344,157 +1071,22 @@ def update_payment_status(order_id, transaction_data):
             return False
             
         cursor = conn.cursor(dictionary=True)
+        order, outcome = apply_payment_notification(cursor, order_id, transaction_data)
         
-        transaction_status = transaction_data.get('transaction_status')
-        transaction_id = transaction_data.get('transaction_id')
-        payment_type = transaction_data.get('payment_type')
-        bank = transaction_data.get('bank')
-        va_number = transaction_data.get('va_number')
-        settlement_time = transaction_data.get('settlement_time')
-        gross_amount = transaction_data.get('gross_amount')
-        
-        logger.info(f"Updating payment status for order {order_id}: {transaction_status}")
-        
-        # Check if order exists
-        cursor.execute("SELECT id, mobil_id, user_id, total_harga FROM pesanan WHERE kode_pesanan = %s", (order_id,))
-        order = cursor.fetchone()
-        
-        if not order:
-            logger.error(f"Order {order_id} not found in database")
+        if not outcome:
+            conn.rollback()
             cursor.close()
             conn.close()
             return False
         
-        logger.info(f"Found order: ID={order['id']}, User={order['user_id']}, Mobil={order['mobil_id']}")
-        
-        # Handle different transaction statuses
-        if transaction_status in ['settlement', 'capture']:
-            # Pembayaran BERHASIL
-            new_payment_status = 'paid'
-            new_order_status = 'dikonfirmasi'
-            
-            # Handle settlement time
-            payment_date = None
-            if settlement_time:
-                try:
-                    payment_date = datetime.strptime(settlement_time, '%Y-%m-%d %H:%M:%S')
-                except:
-                    try:
-                        payment_date = datetime.strptime(settlement_time, '%Y-%m-%d %H:%M:%S.%f')
-                    except:
-                        payment_date = datetime.now()
-            else:
-                payment_date = datetime.now()
-            
-            logger.info(f"Payment SUCCESS for {order_id}, payment date: {payment_date}")
-            
-            # Update pesanan
-            cursor.execute("""
-                UPDATE pesanan 
-                SET status_pembayaran = %s,
-                    status = %s,
-                    midtrans_order_id = %s,
-                    midtrans_transaction_status = %s,
-                    payment_type = %s,
-                    bank = %s,
-                    va_number = %s,
-                    transaction_time = %s,
-                    settlement_time = %s,
-                    tanggal_pembayaran = %s,
-                    updated_at = NOW()
-                WHERE kode_pesanan = %s
-            """, (
-                new_payment_status,
-                new_order_status,
-                transaction_id,
-                transaction_status,
-                payment_type,
-                bank,
-                va_number,
-                payment_date,
-                payment_date if transaction_status == 'settlement' else None,
-                payment_date,
-                order_id
-            ))
-            
-            # Update mobil status
-            cursor.execute("UPDATE mobil SET status = 'disewa', updated_at = NOW() WHERE id = %s", 
-                          (order['mobil_id'],))
-            
-            # Insert into pembayaran table (using INSERT IGNORE to avoid duplicates)
-            cursor.execute("""
-                INSERT IGNORE INTO pembayaran 
-                (pesanan_id, jumlah, metode, status, transaction_id, 
-                 payment_type, bank, va_number, tanggal_pembayaran, created_at, updated_at)
-                VALUES (%s, %s, 'midtrans', 'success', %s, %s, %s, %s, %s, NOW(), NOW())
-            """, (
-                order['id'],
-                order['total_harga'],
-                transaction_id,
-                payment_type,
-                bank,
-                va_number,
-                payment_date
-            ))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            logger.info(f"Database updated successfully for order {order_id}")
-            
-            return True
-            
-        elif transaction_status == 'pending':
-            # Pembayaran PENDING
-            cursor.execute("""
-                UPDATE pesanan 
-                SET status_pembayaran = 'pending',
-                    midtrans_order_id = %s,
-                    midtrans_transaction_status = %s,
-                    payment_type = %s,
-                    bank = %s,
-                    va_number = %s,
-                    updated_at = NOW()
-                WHERE kode_pesanan = %s
-            """, (transaction_id, transaction_status, payment_type, bank, va_number, order_id))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            logger.info(f"Payment PENDING updated for order {order_id}")
-            return True
-            
-        elif transaction_status in ['deny', 'cancel', 'expire', 'failure']:
-            # Pembayaran GAGAL
-            cursor.execute("""
-                UPDATE pesanan 
-                SET status_pembayaran = 'failed',
-                    status = 'dibatalkan',
-                    midtrans_order_id = %s,
-                    midtrans_transaction_status = %s,
-                    updated_at = NOW()
-                WHERE kode_pesanan = %s
-            """, (transaction_id, transaction_status, order_id))
-            
-            # Kembalikan status mobil
-            cursor.execute("UPDATE mobil SET status = 'tersedia', updated_at = NOW() WHERE id = %s", 
-                          (order['mobil_id'],))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            logger.info(f"Payment FAILED updated for order {order_id}")
-            return True
+        conn.commit()
+        cursor.close()
+        conn.close()
+        payment_events.remember(payment_event_key(order_id, transaction_data))
+        after_payment_applied(order, outcome)
         
-        else:
-            logger.warning(f"Unknown transaction status: {transaction_status}")
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            return False
+        logger.info(f"Database updated successfully for order {order_id}: {outcome}")
+        return True
         
     except Exception as e:
         logger.error(f"Error updating payment status: {e}", exc_info=True)
@@ -504,6 +1096,237 @@ def update_payment_status(order_id, transaction_data):
             conn.close()
         return False
 
+def apply_payment_batch(cursor, notifications):
+    """Apply (order_id, transaction_data) pairs on one open transaction.
+    
+    Does not commit. Returns (outcomes, applied): one outcome per notification,
+    and the applied changes to pass to finish_payment_batch() after commit.
+    """
+    outcomes = []
+    applied = []
+    for order_id, transaction_data in notifications:
+        order, outcome = apply_payment_notification(cursor, order_id, transaction_data)
+        outcomes.append(outcome)
+        if outcome and outcome != 'duplicate':
+            applied.append((order, outcome, order_id, transaction_data))
+    
+    # executemany menulis semua log dalam satu INSERT multi-row
+    if applied:
+        cursor.executemany(MIDTRANS_LOG_INSERT, [
+            midtrans_log_row(order_id, transaction_data) for _, _, order_id, transaction_data in applied
+        ])
+    return outcomes, applied
+
+def finish_payment_batch(applied):
+    """Post-commit work for apply_payment_batch(): dedup cache and in-memory indexes"""
+    for order, outcome, order_id, transaction_data in applied:
+        payment_events.remember(payment_event_key(order_id, transaction_data))
+        after_payment_applied(order, outcome)
+
+# ============================================
+# MIDTRANS WEBHOOK QUEUE
+# ============================================
+
+def persist_webhook_event(order_id, payload):
+    """Store a notification in midtrans_inbox; returns its id"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO midtrans_inbox (order_id, transaction_status, payload)
+            VALUES (%s, %s, %s)
+        """, (order_id, payload.get('transaction_status'), json.dumps(payload)))
+        event_id = cursor.lastrowid
+        conn.commit()
+        cursor.close()
+        return event_id
+    except Error as e:
+        logger.error(f"Error storing Midtrans notification for {order_id}: {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+def load_pending_webhook_events():
+    """Inbox rows not yet processed, oldest first"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, order_id, payload FROM midtrans_inbox
+            WHERE status = 'pending' ORDER BY id
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+        return [WebhookEvent(row['id'], row['order_id'], json.loads(row['payload'])) for row in rows]
+    except Error as e:
+        logger.error(f"Error loading pending Midtrans notifications: {e}")
+        return None
+    finally:
+        conn.close()
+
+def process_webhook_batch(events):
+    """Apply a batch of notifications in one transaction (called by the queue workers)"""
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="Database connection failed")
+    
+    done = {'processed': [], 'duplicate': [], 'ignored': []}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        outcomes, applied = apply_payment_batch(cursor, [(event.order_id, event.payload) for event in events])
+        for event, outcome in zip(events, outcomes):
+            if outcome == 'duplicate':
+                done['duplicate'].append(event.id)
+            elif outcome:
+                done['processed'].append(event.id)
+            else:
+                done['ignored'].append(event.id)
+        
+        for status, ids in done.items():
+            if ids:
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(f"""
+                    UPDATE midtrans_inbox
+                    SET status = %s, attempts = attempts + 1, processed_at = NOW()
+                    WHERE id IN ({placeholders})
+                """, (status, *ids))
+        
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+    
+    finish_payment_batch(applied)
+    logger.info(f"Webhook batch applied: {len(done['processed'])} processed, "
+                f"{len(done['duplicate'])} duplicate, {len(done['ignored'])} ignored")
+
+def mark_webhook_event_failed(event, error):
+    """Park an event that kept failing so it is not retried on every restart"""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE midtrans_inbox
+            SET status = 'failed', attempts = attempts + 1, last_error = %s, processed_at = NOW()
+            WHERE id = %s
+        """, (str(error)[:1000], event.id))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+webhook_queue = WebhookQueue(
+    persist_webhook_event,
+    load_pending_webhook_events,
+    process_webhook_batch,
+    mark_webhook_event_failed,
+    workers=app.config['WEBHOOK_WORKERS'],
+    batch_size=app.config['WEBHOOK_BATCH_SIZE'],
+    batch_wait=app.config['WEBHOOK_BATCH_WAIT'],
+    max_attempts=app.config['WEBHOOK_MAX_ATTEMPTS']
+)
+# Langsung jalan saat startup: notifikasi yang sudah dibalas 200 ke Midtrans tapi belum
+# diproses sebelum crash/redeploy tidak akan dikirim ulang oleh Midtrans
+webhook_queue.start()
+
+def midtrans_signature(order_id, status_code, gross_amount):
+    """signature_key = SHA512(order_id + status_code + gross_amount + server key)"""
+    raw = f"{order_id}{status_code}{gross_amount}{app.config['MIDTRANS_SERVER_KEY']}"
+    return hashlib.sha512(raw.encode()).hexdigest()
+
+def verify_midtrans_signature(notification):
+    """Check the signature_key of a Midtrans notification"""
+    expected = midtrans_signature(notification.get('order_id', ''), notification.get('status_code', ''),
+                                  notification.get('gross_amount', ''))
+    return hmac.compare_digest(expected, str(notification.get('signature_key', '')))
+
+# ============================================
+# SEARCH (FULLTEXT NGRAM, FALLBACK LIKE)
+# ============================================
+
+USER_SEARCH_MATCH = "MATCH(nama, email, nik, no_telepon) AGAINST (%s IN BOOLEAN MODE)"
+_fulltext_indexes = None
+
+def fulltext_indexes():
+    """Names of the FULLTEXT indexes in the current database, read once per process"""
+    global _fulltext_indexes
+    if _fulltext_indexes is None:
+        conn = get_db_connection()
+        if not conn:
+            return set()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND INDEX_TYPE = 'FULLTEXT'
+            """)
+            _fulltext_indexes = {row[0] for row in cursor.fetchall()}
+            cursor.close()
+        except Error as e:
+            logger.error(f"Error reading FULLTEXT indexes: {e}")
+            return set()
+        finally:
+            conn.close()
+    return _fulltext_indexes
+
+def fulltext_term(search, *index_names):
+    """AGAINST() term if FULLTEXT can serve this search, else None (caller falls back to LIKE)"""
+    if not app.config['SEARCH_FULLTEXT']:
+        return None
+    available = fulltext_indexes()
+    if any(name not in available for name in index_names):
+        return None
+    return fulltext_query(search, app.config['SEARCH_NGRAM_TOKEN_SIZE'])
+
+def placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+# ============================================
+# PAGINATION (KEYSET)
+# ============================================
+
+# Total baris per daftar; cukup perkiraan sehingga COUNT(*) tidak dijalankan tiap halaman
+count_cache = CountCache(ttl=app.config['COUNT_CACHE_TTL'])
+
+def cached_total(cursor, scope, query, params):
+    """COUNT(*) for a FROM/WHERE query, served from count_cache when fresh"""
+    def count():
+        cursor.execute(f"SELECT COUNT(*) as total {query}", tuple(params))
+        return cursor.fetchone()['total']
+    return count_cache.get(scope, query, params, count)
+
+def apply_seek(query, params, order_columns, token):
+    """Append the keyset predicate for a ?cursor= token to a FROM ... WHERE query.
+    
+    Returns (query, params, seeking); an invalid or missing cursor leaves the query unchanged.
+    """
+    values = decode_cursor(token, len(order_columns))
+    if values is None:
+        return query, list(params), False
+    seek_sql, seek_params = seek_clause(order_columns, values)
+    return f"{query} AND {seek_sql}", list(params) + seek_params, True
+
+def fetch_page(cursor, page_query, params, limit, offset, cursor_keys):
+    """Run a *_page_query with LIMIT limit + 1; returns (rows, has_more, next cursor)"""
+    cursor.execute(page_query, tuple(params) + (limit + 1, offset))
+    rows, has_more = split_page(cursor.fetchall(), limit)
+    return rows, has_more, next_cursor(rows, cursor_keys, has_more)
+
+def api_page_limit():
+    """?limit= for infinite-scroll APIs, clamped to 1..API_PAGE_MAX_LIMIT"""
+    limit = request.args.get('limit', app.config['ITEMS_PER_PAGE'], type=int)
+    return max(1, min(limit, app.config['API_PAGE_MAX_LIMIT']))
+
 # ============================================
 # ROUTES - PUBLIC PAGES
 # ============================================
@@ -516,13 +1339,13 @@ def index():
         cursor = conn.cursor(dictionary=True)
         cursor.execute("""
             SELECT * FROM mobil 
-            WHERE status = 'tersedia' 
+            WHERE status IN (%s, %s) 
             ORDER BY created_at DESC 
             LIMIT 6
-        """)
+        """, RENTABLE_CAR_STATUSES)
         featured_cars = cursor.fetchall()
         
-        cursor.execute("SELECT COUNT(*) as total_cars FROM mobil WHERE status = 'tersedia'")
+        cursor.execute("SELECT COUNT(*) as total_cars FROM mobil WHERE status IN (%s, %s)", RENTABLE_CAR_STATUSES)
         stats = cursor.fetchone()
         
         cursor.close()
@@ -576,8 +1399,8 @@ def login():
                 
                 session['user_id'] = user['id']
                 session['user_name'] = user['nama']
-                session['user_role'] = user['role']
                 session['user_email'] = user['email']
+                stamp_role_check(user['role'])
                 session.permanent = True
                 
                 conn = get_db_connection()
@@ -647,6 +1470,7 @@ def register():
             """, (nama, email, hashed_password, nik, no_telepon, alamat, tanggal_lahir))
             
             conn.commit()
+            user_suggestions.refresh(cursor.lastrowid)
             cursor.close()
             conn.close()
             
@@ -729,7 +1553,12 @@ def user_profile():
             if 'foto_profil' in request.files:
                 file = request.files['foto_profil']
                 if file and file.filename != '':
-                    foto_profil = save_file(file, app.config['PROFILE_UPLOAD_FOLDER'])
+                    foto_profil, error = save_image(file, 'profiles')
+                    if error:
+                        cursor.close()
+                        conn.close()
+                        flash(error, 'danger')
+                        return redirect(url_for('user_profile'))
             
             update_query = "UPDATE users SET nama = %s, no_telepon = %s, alamat = %s, tanggal_lahir = %s"
             params = [nama, no_telepon, alamat, tanggal_lahir]
@@ -743,6 +1572,7 @@ def user_profile():
             
             cursor.execute(update_query, tuple(params))
             conn.commit()
+            user_suggestions.refresh(user_id)
             session['user_name'] = nama
             
             flash('Profil berhasil diperbarui!', 'success')
@@ -771,62 +1601,47 @@ def catalog():
     transmisi = request.args.get('transmisi')
     min_kapasitas = request.args.get('min_kapasitas')
     search = request.args.get('search')
+    tanggal_mulai = request.args.get('tanggal_mulai')
+    tanggal_selesai = request.args.get('tanggal_selesai')
     page = request.args.get('page', 1, type=int)
     
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        
-        query = "FROM mobil WHERE status = 'tersedia'"
-        params = []
-        
-        if tipe and tipe != 'all':
-            query += " AND tipe = %s"
-            params.append(tipe)
-        
-        if min_harga:
-            query += " AND harga_per_hari >= %s"
-            params.append(min_harga)
-        
-        if max_harga:
-            query += " AND harga_per_hari <= %s"
-            params.append(max_harga)
-        
-        if transmisi and transmisi != 'all':
-            query += " AND transmisi = %s"
-            params.append(transmisi)
-        
-        if min_kapasitas:
-            query += " AND kapasitas >= %s"
-            params.append(min_kapasitas)
-        
-        if search:
-            query += " AND (merk LIKE %s OR model LIKE %s OR plat_nomor LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
-        
-        count_query = f"SELECT COUNT(*) as total {query}"
-        cursor.execute(count_query, tuple(params))
-        total = cursor.fetchone()['total']
-        
-        offset = (page - 1) * app.config['ITEMS_PER_PAGE']
-        car_query = f"SELECT * {query} ORDER BY harga_per_hari ASC LIMIT %s OFFSET %s"
-        params.extend([app.config['ITEMS_PER_PAGE'], offset])
-        
-        cursor.execute(car_query, tuple(params))
-        cars = cursor.fetchall()
-        
-        cursor.execute("SELECT DISTINCT tipe FROM mobil WHERE status = 'tersedia'")
-        car_types = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+    # Filter tanggal: hanya mobil yang kosong di seluruh rentang (bitmap armada per hari)
+    statuses = RENTABLE_CAR_STATUSES
+    car_ids = None
+    date_filter = False
+    if tanggal_mulai and tanggal_selesai:
+        try:
+            start_date, end_date = parse_rental_range(tanggal_mulai, tanggal_selesai)
+            car_ids = availability_index.available_cars(fleet_snapshot.car_ids(statuses), start_date, end_date)
+            date_filter = True
+        except ValueError as e:
+            flash(f'Rentang tanggal tidak valid: {e}', 'warning')
+    
+    per_page = app.config['ITEMS_PER_PAGE']
+    result = fleet_snapshot.search(
+        status=statuses,
+        car_ids=car_ids,
+        tipe=tipe,
+        transmisi=transmisi,
+        min_harga=min_harga,
+        max_harga=max_harga,
+        min_kapasitas=min_kapasitas,
+        search=search,
+        offset=(page - 1) * per_page,
+        limit=per_page
+    )
+    
+    if result is not None:
+        cars, total = result
+        car_types = fleet_snapshot.car_types(RENTABLE_CAR_STATUSES)
         
-        total_pages = (total + app.config['ITEMS_PER_PAGE'] - 1) // app.config['ITEMS_PER_PAGE']
+        total_pages = (total + per_page - 1) // per_page
         
         return render_template('user/catalog.html', 
                              cars=cars, 
                              car_types=car_types,
                              filters=request.args,
+                             date_filter=date_filter,
                              page=page,
                              total_pages=total_pages,
                              total=total,
@@ -850,9 +1665,9 @@ def car_detail(car_id):
         
         cursor.execute("""
             SELECT * FROM mobil 
-            WHERE tipe = %s AND id != %s AND status = 'tersedia' 
+            WHERE tipe = %s AND id != %s AND status IN (%s, %s) 
             LIMIT 4
-        """, (car['tipe'], car_id))
+        """, (car['tipe'], car_id) + RENTABLE_CAR_STATUSES)
         similar_cars = cursor.fetchall()
         
         cursor.close()
@@ -881,7 +1696,7 @@ def booking(car_id):
         cursor.execute("SELECT * FROM mobil WHERE id = %s", (car_id,))
         car = cursor.fetchone()
         
-        if not car or car['status'] != 'tersedia':
+        if not car or car['status'] not in RENTABLE_CAR_STATUSES:
             flash('Mobil tidak tersedia untuk disewa', 'danger')
             return redirect(url_for('catalog'))
         
@@ -892,8 +1707,8 @@ def booking(car_id):
             catatan = request.form.get('catatan')
             
             try:
-                start_date = datetime.strptime(tanggal_mulai, '%Y-%m-%d')
-                end_date = datetime.strptime(tanggal_selesai, '%Y-%m-%d')
+                start_date = datetime.strptime(tanggal_mulai, '%Y-%m-%d').date()
+                end_date = datetime.strptime(tanggal_selesai, '%Y-%m-%d').date()
                 durasi_hari = (end_date - start_date).days + 1
                 
                 if durasi_hari < 1:
@@ -904,22 +1719,25 @@ def booking(car_id):
                     flash(f'Maksimal sewa adalah {app.config["MAX_RENTAL_DAYS"]} hari', 'danger')
                     return redirect(url_for('booking', car_id=car_id))
                 
-                total_harga = car['harga_per_hari'] * durasi_hari
-                kode_pesanan = generate_booking_code()
+                if not availability_index.is_available(car_id, start_date, end_date):
+                    flash('Mobil sudah dipesan pada tanggal tersebut. Silakan pilih tanggal lain.', 'danger')
+                    return redirect(url_for('booking', car_id=car_id))
+                
+                order, reason = create_booking(conn, user_id, car_id, start_date, end_date,
+                                               lokasi_penjemputan, catatan)
                 
-                cursor.execute("""
-                    INSERT INTO pesanan (
-                        kode_pesanan, user_id, mobil_id, tanggal_mulai, tanggal_selesai,
-                        durasi_hari, total_harga, lokasi_penjemputan, catatan,
-                        metode_pembayaran, status_pembayaran, status
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'midtrans', 'pending', 'pending')
-                """, (
-                    kode_pesanan, user_id, car_id, tanggal_mulai, tanggal_selesai,
-                    durasi_hari, total_harga, lokasi_penjemputan, catatan
-                ))
+                if not order:
+                    if reason == 'conflict':
+                        flash('Mobil sudah dipesan pada tanggal tersebut. Silakan pilih tanggal lain.', 'danger')
+                        return redirect(url_for('booking', car_id=car_id))
+                    flash('Mobil tidak tersedia untuk disewa', 'danger')
+                    return redirect(url_for('catalog'))
                 
-                cursor.execute("UPDATE mobil SET status = 'disewa' WHERE id = %s", (car_id,))
-                conn.commit()
+                kode_pesanan = order['kode_pesanan']
+                availability_index.add_booking(order['id'], car_id, start_date, end_date)
+                count_cache.invalidate(('user', user_id))
+                order_suggestions.refresh(order['id'])
+                snap_tokens.prefetch(kode_pesanan, lambda: build_snap_order_data(load_payment_order(kode_pesanan)))
                 
                 logger.info(f"Booking created: {kode_pesanan} for user {user_id}")
                 flash('Pesanan berhasil dibuat! Silakan lakukan pembayaran.', 'success')
@@ -975,50 +1793,20 @@ def payment(order_id):
             flash('Pesanan ini sudah dibayar', 'info')
             return redirect(url_for('order_detail', order_code=order_id))
         
-        # Generate Midtrans token if not exists
-        if not order.get('midtrans_token'):
-            customer_data = {
-                "first_name": order['nama'].split()[0] if order['nama'] else 'Customer',
-                "last_name": ' '.join(order['nama'].split()[1:]) if len(order['nama'].split()) > 1 else '',
-                "email": order['email'],
-                "phone": order['no_telepon'] or '081234567890'
-            }
-            
-            order_data = {
-                'order_id': order['kode_pesanan'],
-                'gross_amount': int(order['total_harga']),
-                'first_name': customer_data['first_name'],
-                'last_name': customer_data['last_name'],
-                'email': customer_data['email'],
-                'phone': customer_data['phone'],
-                'item_details': [
-                    {
-                        'id': str(order['mobil_id']),
-                        'price': int(order['harga_per_hari']),
-                        'quantity': order['durasi_hari'],
-                        'name': f"{order['merk']} {order['model']} Rental"
-                    }
-                ]
-            }
-            
-            snap_token = generate_midtrans_token(order_data)
-            
-            if snap_token:
-                cursor.execute("""
-                    UPDATE pesanan 
-                    SET midtrans_token = %s,
-                        updated_at = NOW()
-                    WHERE kode_pesanan = %s
-                """, (snap_token, order_id))
-                conn.commit()
-                order['midtrans_token'] = snap_token
-                
-                logger.info(f"Midtrans token generated for order {order_id}")
-            else:
-                flash('Gagal membuat token pembayaran. Coba lagi.', 'danger')
-                cursor.close()
-                conn.close()
-                return redirect(url_for('user_orders'))
+        # Token dari cache/DB bila masih berlaku; dibuat sekali per pesanan bila belum ada
+        snap_token = snap_tokens.get_token(
+            order['kode_pesanan'],
+            lambda: build_snap_order_data(order),
+            order.get('midtrans_token'),
+            order.get('midtrans_token_expires_at')
+        )
+        
+        if not snap_token:
+            flash('Gagal membuat token pembayaran. Coba lagi.', 'danger')
+            cursor.close()
+            conn.close()
+            return redirect(url_for('user_orders'))
+        order['midtrans_token'] = snap_token
         
         cursor.close()
         conn.close()
@@ -1026,6 +1814,7 @@ def payment(order_id):
         return render_template('user/payment.html', 
                              order=order, 
                              midtrans_client_key=app.config['MIDTRANS_CLIENT_KEY'],
+                             midtrans_snap_js_url=app.config['MIDTRANS_SNAP_JS_URL'],
                              midtrans_token=order['midtrans_token'],
                              midtrans_environment='sandbox' if app.config['MIDTRANS_SANDBOX'] else 'production')
     
@@ -1037,34 +1826,33 @@ def payment(order_id):
 
 @app.route('/payment/notification', methods=['POST'])
 def payment_notification():
-    """Handle Midtrans payment notification (webhook) - FIXED VERSION"""
+    """Handle Midtrans payment notification (webhook): validate, queue, acknowledge"""
     try:
-        notification = request.get_json()
-        logger.info(f"Midtrans notification received: {notification}")
+        notification = request.get_json(silent=True)
+        if not isinstance(notification, dict):
+            return jsonify({'status': 'error', 'message': 'Invalid JSON body'}), 400
         
         # Extract important data
         order_id = notification.get('order_id')
         transaction_status = notification.get('transaction_status')
         
-        if not order_id:
-            logger.error("No order_id in notification")
+        if not order_id or not transaction_status:
+            logger.error("No order_id or transaction_status in notification")
             return jsonify({'status': 'error', 'message': 'No order_id provided'}), 400
         
-        logger.info(f"Processing notification for order: {order_id}, status: {transaction_status}")
-        
-        # First update the payment status in database
-        update_success = update_payment_status(order_id, notification)
+        if app.config['MIDTRANS_VERIFY_SIGNATURE'] and not verify_midtrans_signature(notification):
+            logger.warning(f"Invalid Midtrans signature for order {order_id}")
+            return jsonify({'status': 'error', 'message': 'Invalid signature'}), 403
         
-        # Then insert log for tracking
-        if update_success:
-            insert_midtrans_log(order_id, notification)
-            logger.info(f"Notification processed successfully for order {order_id}")
-        else:
-            logger.error(f"Failed to update payment status for order {order_id}")
+        # Simpan ke inbox lalu langsung jawab; status diterapkan oleh worker antrian
+        if not webhook_queue.enqueue(order_id, notification):
+            # 503 agar Midtrans mengirim ulang notifikasi
+            return jsonify({'status': 'error', 'message': 'Notification could not be stored'}), 503
         
+        logger.info(f"Notification queued for order: {order_id}, status: {transaction_status}")
         return jsonify({
-            'status': 'success' if update_success else 'error',
-            'message': 'Notification processed successfully' if update_success else 'Failed to process notification',
+            'status': 'success',
+            'message': 'Notification queued',
             'order_id': order_id,
             'transaction_status': transaction_status
         })
@@ -1134,19 +1922,8 @@ def sync_payment_status(order_id):
                 return jsonify({'success': False, 'message': 'Order not found'}), 404
             
             # Get status from Midtrans API
-            server_key = app.config['MIDTRANS_SERVER_KEY']
-            auth_string = base64.b64encode(f"{server_key}:".encode()).decode()
-            
-            headers = {
-                'Accept': 'application/json',
-                'Authorization': f'Basic {auth_string}',
-                'Content-Type': 'application/json'
-            }
-            
-            url = f"https://api.sandbox.midtrans.com/v2/{order_id}/status"
-            
             try:
-                response = requests.get(url, headers=headers, timeout=10)
+                response = midtrans.get_status(order_id)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -1271,65 +2048,103 @@ def invoice(order_id):
     
     return redirect(url_for('user_orders'))
 
+PAYMENT_HISTORY_ORDER = ("COALESCE(p.tanggal_pembayaran, p.tanggal_pemesanan)", "p.id")
+
+def build_payment_history_query(user_id):
+    """FROM/WHERE clause and params for a user's paid orders"""
+    query = """
+        FROM pesanan p
+        JOIN mobil m ON p.mobil_id = m.id
+        WHERE p.user_id = %s AND p.status_pembayaran = 'paid'
+    """
+    return query, [user_id]
+
+def payment_history_page_query(query):
+    return f"""
+        SELECT p.*, m.merk, m.model, m.gambar,
+               COALESCE(p.tanggal_pembayaran, p.tanggal_pemesanan) as urut_pembayaran
+        {query}
+        ORDER BY urut_pembayaran DESC, p.id DESC
+        LIMIT %s OFFSET %s
+    """
+
 @app.route('/payment/history')
 @login_required
 def payment_history():
     """Riwayat pembayaran user"""
     user_id = session['user_id']
     page = request.args.get('page', 1, type=int)
+    per_page = app.config['ITEMS_PER_PAGE']
     
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor(dictionary=True)
         
-        # Get total count
-        cursor.execute("""
-            SELECT COUNT(*) as total 
-            FROM pesanan 
-            WHERE user_id = %s AND status_pembayaran = 'paid'
-        """, (user_id,))
-        total = cursor.fetchone()['total']
-        
-        # Get total amount
+        # Total, jumlah bayar dan jumlah mobil dalam satu agregat
         cursor.execute("""
-            SELECT 
+            SELECT
+                COUNT(*) as total,
                 COALESCE(SUM(total_harga), 0) as total_amount,
                 COUNT(DISTINCT mobil_id) as cars_count
-            FROM pesanan 
+            FROM pesanan
             WHERE user_id = %s AND status_pembayaran = 'paid'
         """, (user_id,))
         stats = cursor.fetchone()
+        total = stats['total'] if stats else 0
         
-        # Get payments
-        offset = (page - 1) * app.config['ITEMS_PER_PAGE']
-        
-        cursor.execute("""
-            SELECT p.*, m.merk, m.model, m.gambar
-            FROM pesanan p
-            JOIN mobil m ON p.mobil_id = m.id
-            WHERE p.user_id = %s AND p.status_pembayaran = 'paid'
-            ORDER BY COALESCE(p.tanggal_pembayaran, p.tanggal_pemesanan) DESC
-            LIMIT %s OFFSET %s
-        """, (user_id, app.config['ITEMS_PER_PAGE'], offset))
-        
-        payments = cursor.fetchall()
+        # Get payments: ?cursor= melanjutkan dari baris terakhir, ?page= saja memakai OFFSET
+        query, params = build_payment_history_query(user_id)
+        query, params, seeking = apply_seek(query, params, PAYMENT_HISTORY_ORDER, request.args.get('cursor'))
+        offset = 0 if seeking else (page - 1) * per_page
+        payments, has_more, page_cursor = fetch_page(cursor, payment_history_page_query(query), params,
+                                                     per_page, offset, ('urut_pembayaran', 'id'))
         
         cursor.close()
         conn.close()
         
-        total_pages = (total + app.config['ITEMS_PER_PAGE'] - 1) // app.config['ITEMS_PER_PAGE']
+        total_pages = (total + per_page - 1) // per_page
         
         return render_template('user/payment_history.html',
                              payments=payments,
                              page=page,
                              total_pages=total_pages,
                              total=total,
+                             next_cursor=page_cursor,
                              total_amount=stats['total_amount'] if stats else 0,
                              cars_count=stats['cars_count'] if stats else 0,
                              config=app.config)
     
     return redirect(url_for('user_dashboard'))
 
+@app.route('/api/payment/history')
+@login_required
+def api_payment_history():
+    """Paid orders of the current user, one cursor page at a time (infinite scroll)"""
+    user_id = session['user_id']
+    limit = api_page_limit()
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database error'}), 500
+    
+    cursor = conn.cursor(dictionary=True)
+    query, params = build_payment_history_query(user_id)
+    total = cached_total(cursor, ('user', user_id), query, params) if request.args.get('include_total') else None
+    
+    query, params, _ = apply_seek(query, params, PAYMENT_HISTORY_ORDER, request.args.get('cursor'))
+    payments, has_more, page_cursor = fetch_page(cursor, payment_history_page_query(query), params,
+                                                 limit, 0, ('urut_pembayaran', 'id'))
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'success': True,
+        'payments': payments,
+        'has_more': has_more,
+        'next_cursor': page_cursor,
+        'total': total
+    })
+
 # ============================================
 # MANUAL PAYMENT STATUS CHECK (FIXED)
 # ============================================
@@ -1373,19 +2188,8 @@ def check_payment_status(order_id):
             
             # Jika ada midtrans_order_id, check status dari Midtrans API
             if order.get('midtrans_order_id'):
-                server_key = app.config['MIDTRANS_SERVER_KEY']
-                auth_string = base64.b64encode(f"{server_key}:".encode()).decode()
-                
-                headers = {
-                    'Accept': 'application/json',
-                    'Authorization': f'Basic {auth_string}',
-                    'Content-Type': 'application/json'
-                }
-                
-                url = f"https://api.sandbox.midtrans.com/v2/{order['midtrans_order_id']}/status"
-                
                 try:
-                    response = requests.get(url, headers=headers, timeout=10)
+                    response = midtrans.get_status(order['midtrans_order_id'])
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -1512,14 +2316,6 @@ def force_update_payment(order_id):
             WHERE kode_pesanan = %s
         """, (new_status, new_status, new_status, new_status, payment_date_obj, order_id))
         
-        # Update mobil status
-        if new_status == 'paid':
-            cursor.execute("UPDATE mobil SET status = 'disewa', updated_at = NOW() WHERE id = %s", 
-                          (order['mobil_id'],))
-        elif new_status == 'failed':
-            cursor.execute("UPDATE mobil SET status = 'tersedia', updated_at = NOW() WHERE id = %s", 
-                          (order['mobil_id'],))
-        
         # Insert payment record if paid
         if new_status == 'paid':
             cursor.execute("""
@@ -1537,6 +2333,7 @@ def force_update_payment(order_id):
         conn.commit()
         cursor.close()
         conn.close()
+        availability_index.refresh_order(order['id'])
         
         logger.info(f"Payment status manually updated to {new_status} for order {order_id} by admin")
         
@@ -1590,14 +2387,6 @@ def admin_order_update_payment(order_code):
             WHERE kode_pesanan = %s
         """, (payment_status, status, order_code))
         
-        # Update mobil status based on payment
-        if payment_status == 'paid':
-            cursor.execute("UPDATE mobil SET status = 'disewa', updated_at = NOW() WHERE id = %s", 
-                          (order['mobil_id'],))
-        elif payment_status in ['failed', 'pending']:
-            cursor.execute("UPDATE mobil SET status = 'tersedia', updated_at = NOW() WHERE id = %s", 
-                          (order['mobil_id'],))
-        
         # Insert payment record if paid
         if payment_status == 'paid':
             cursor.execute("""
@@ -1615,6 +2404,7 @@ def admin_order_update_payment(order_code):
         conn.commit()
         cursor.close()
         conn.close()
+        availability_index.refresh_order(order['id'])
         
         flash('Status pembayaran dan pesanan berhasil diperbarui', 'success')
         
@@ -1662,6 +2452,31 @@ def admin_order_detail(order_code):
 # ROUTES - ORDERS
 # ============================================
 
+USER_ORDER_ORDER = ("p.tanggal_pemesanan", "p.id")
+
+def build_user_order_query(user_id, status='all'):
+    """FROM/WHERE clause and params for a user's orders, optionally by payment status"""
+    if status == 'all':
+        query = """
+            FROM pesanan p
+            JOIN mobil m ON p.mobil_id = m.id
+            WHERE p.user_id = %s
+        """
+        return query, [user_id]
+    query = """
+        FROM pesanan p
+        JOIN mobil m ON p.mobil_id = m.id
+        WHERE p.user_id = %s AND p.status_pembayaran = %s
+    """
+    return query, [user_id, status]
+
+def user_order_page_query(query):
+    return f"""
+        SELECT p.*, m.merk, m.model, m.gambar {query}
+        ORDER BY p.tanggal_pemesanan DESC, p.id DESC
+        LIMIT %s OFFSET %s
+    """
+
 @app.route('/orders')
 @login_required
 def user_orders():
@@ -1669,30 +2484,15 @@ def user_orders():
     user_id = session['user_id']
     status = request.args.get('status', 'all')
     page = request.args.get('page', 1, type=int)
+    per_page = app.config['ITEMS_PER_PAGE']
     
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor(dictionary=True)
         
         # Build query based on status
-        if status == 'all':
-            query = """
-                FROM pesanan p 
-                JOIN mobil m ON p.mobil_id = m.id 
-                WHERE p.user_id = %s
-            """
-            params = [user_id]
-        else:
-            query = """
-                FROM pesanan p 
-                JOIN mobil m ON p.mobil_id = m.id 
-                WHERE p.user_id = %s AND p.status_pembayaran = %s
-            """
-            params = [user_id, status]
-        
-        count_query = f"SELECT COUNT(*) as total {query}"
-        cursor.execute(count_query, tuple(params))
-        total = cursor.fetchone()['total']
+        query, params = build_user_order_query(user_id, status)
+        total = cached_total(cursor, ('user', user_id), query, params)
         
         # Get counts for each status
         cursor.execute("""
@@ -1704,33 +2504,58 @@ def user_orders():
         """, (user_id,))
         counts = cursor.fetchone()
         
-        # Build main query
-        offset = (page - 1) * app.config['ITEMS_PER_PAGE']
-        order_query = f"""
-            SELECT p.*, m.merk, m.model, m.gambar {query}
-            ORDER BY p.tanggal_pemesanan DESC 
-            LIMIT %s OFFSET %s
-        """
-        params.extend([app.config['ITEMS_PER_PAGE'], offset])
-        
-        cursor.execute(order_query, tuple(params))
-        orders = cursor.fetchall()
+        # Build main query: ?cursor= melanjutkan dari baris terakhir, ?page= saja memakai OFFSET
+        query, params, seeking = apply_seek(query, params, USER_ORDER_ORDER, request.args.get('cursor'))
+        offset = 0 if seeking else (page - 1) * per_page
+        orders, has_more, page_cursor = fetch_page(cursor, user_order_page_query(query), params,
+                                                   per_page, offset, ('tanggal_pemesanan', 'id'))
         
         cursor.close()
         conn.close()
         
-        total_pages = (total + app.config['ITEMS_PER_PAGE'] - 1) // app.config['ITEMS_PER_PAGE']
+        total_pages = (total + per_page - 1) // per_page
         
-        return render_template('user/orders.html', 
-                             orders=orders, 
+        return render_template('user/orders.html',
+                             orders=orders,
                              page=page,
                              total_pages=total_pages,
                              total=total,
+                             next_cursor=page_cursor,
                              status=status,
                              counts=counts)
     
     return redirect(url_for('user_dashboard'))
 
+@app.route('/api/orders')
+@login_required
+def api_user_orders():
+    """Orders of the current user, one cursor page at a time (infinite scroll)"""
+    user_id = session['user_id']
+    status = request.args.get('status', 'all')
+    limit = api_page_limit()
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database error'}), 500
+    
+    cursor = conn.cursor(dictionary=True)
+    query, params = build_user_order_query(user_id, status)
+    total = cached_total(cursor, ('user', user_id), query, params) if request.args.get('include_total') else None
+    
+    query, params, _ = apply_seek(query, params, USER_ORDER_ORDER, request.args.get('cursor'))
+    orders, has_more, page_cursor = fetch_page(cursor, user_order_page_query(query), params,
+                                               limit, 0, ('tanggal_pemesanan', 'id'))
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'success': True,
+        'orders': orders,
+        'has_more': has_more,
+        'next_cursor': page_cursor,
+        'total': total
+    })
+
 @app.route('/order/<string:order_code>')
 @login_required
 def order_detail(order_code):
@@ -1766,6 +2591,95 @@ def order_detail(order_code):
 # ADMIN DASHBOARD ROUTE (LENGKAP)
 # ============================================
 
+def read_dashboard_counters(cursor):
+    """Dashboard numbers from dashboard_counters (primary-key lookups, kept by triggers)"""
+    cursor.execute("""
+        SELECT IF(nama LIKE 'revenue:%', 'today_revenue', nama) AS nama, nilai
+        FROM dashboard_counters
+        WHERE nama IN ('customers', 'cars', 'active_rentals', CONCAT('revenue:', CURDATE()))
+    """)
+    return {row['nama']: row['nilai'] for row in cursor.fetchall()}
+
+def rebuild_dashboard_counters(conn):
+    """Recount dashboard_counters from users, mobil and pesanan"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO dashboard_counters (nama, nilai)
+        SELECT * FROM (
+            SELECT 'customers' AS counter_nama, COUNT(*) AS jumlah FROM users WHERE role = 'customer' AND status = 'active'
+            UNION ALL
+            SELECT 'cars', COUNT(*) FROM mobil
+            UNION ALL
+            SELECT 'active_rentals', COUNT(*) FROM pesanan WHERE status = 'dikonfirmasi'
+            UNION ALL
+            SELECT CONCAT('revenue:', DATE(tanggal_pemesanan)), SUM(total_harga)
+            FROM pesanan WHERE status_pembayaran = 'paid'
+            GROUP BY DATE(tanggal_pemesanan)
+        ) AS hitung
+        ON DUPLICATE KEY UPDATE nilai = hitung.jumlah
+    """)
+    conn.commit()
+    cursor.close()
+    logger.info("Dashboard counters rebuilt")
+
+DAILY_STATS_FIELDS = ('total_orders', 'total_customers', 'total_revenue', 'cars_rented',
+                      'paid_orders', 'pending_orders', 'failed_orders')
+
+def rebuild_daily_stats(conn, start_date=None, end_date=None):
+    """Recompute daily_stats (and its member table) from pesanan for [start_date, end_date]"""
+    where = ""
+    params = ()
+    if start_date and end_date:
+        # Rentang sargable agar index tanggal_pemesanan terpakai
+        where = "WHERE tanggal_pemesanan >= %s AND tanggal_pemesanan < %s + INTERVAL 1 DAY"
+        params = (start_date, end_date)
+    paid_where = f"{where} AND status_pembayaran = 'paid'" if where else "WHERE status_pembayaran = 'paid'"
+    
+    cursor = conn.cursor()
+    try:
+        if params:
+            cursor.execute("DELETE FROM daily_stats_members WHERE tanggal BETWEEN %s AND %s", params)
+            cursor.execute("DELETE FROM daily_stats WHERE tanggal BETWEEN %s AND %s", params)
+        else:
+            cursor.execute("DELETE FROM daily_stats_members")
+            cursor.execute("DELETE FROM daily_stats")
+        
+        cursor.execute(f"""
+            INSERT INTO daily_stats_members (tanggal, jenis, member_id, jumlah)
+            SELECT DATE(tanggal_pemesanan), 'customer', user_id, COUNT(*)
+            FROM pesanan {where} GROUP BY DATE(tanggal_pemesanan), user_id
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO daily_stats_members (tanggal, jenis, member_id, jumlah)
+            SELECT DATE(tanggal_pemesanan), 'car', mobil_id, COUNT(*)
+            FROM pesanan {paid_where}
+            GROUP BY DATE(tanggal_pemesanan), mobil_id
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO daily_stats (tanggal, total_orders, total_customers, total_revenue, cars_rented,
+                                     paid_orders, pending_orders, failed_orders)
+            SELECT 
+                DATE(tanggal_pemesanan),
+                COUNT(*),
+                COUNT(DISTINCT user_id),
+                COALESCE(SUM(CASE WHEN status_pembayaran = 'paid' THEN total_harga END), 0),
+                COUNT(DISTINCT CASE WHEN status_pembayaran = 'paid' THEN mobil_id END),
+                SUM(status_pembayaran = 'paid'),
+                SUM(status_pembayaran = 'pending'),
+                SUM(status_pembayaran = 'failed')
+            FROM pesanan {where}
+            GROUP BY DATE(tanggal_pemesanan)
+        """, params)
+        days = cursor.rowcount
+        conn.commit()
+        logger.info(f"Daily stats rebuilt: {days} days")
+        return days
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
@@ -1774,22 +2688,16 @@ def admin_dashboard():
     if conn:
         cursor = conn.cursor(dictionary=True)
         
-        cursor.execute("SELECT COUNT(*) as count FROM users WHERE role = 'customer' AND status = 'active'")
-        total_customers = cursor.fetchone()['count']
+        counters = read_dashboard_counters(cursor)
+        if 'customers' not in counters:
+            # Tabel counter masih kosong (database lama): hitung ulang sekali dari tabel dasar
+            rebuild_dashboard_counters(conn)
+            counters = read_dashboard_counters(cursor)
         
-        cursor.execute("SELECT COUNT(*) as count FROM mobil")
-        total_cars = cursor.fetchone()['count']
-        
-        cursor.execute("SELECT COUNT(*) as count FROM pesanan WHERE status = 'dikonfirmasi'")
-        active_rentals = cursor.fetchone()['count']
-        
-        cursor.execute("""
-            SELECT COALESCE(SUM(total_harga), 0) as revenue 
-            FROM pesanan 
-            WHERE status_pembayaran = 'paid' 
-            AND DATE(tanggal_pemesanan) = CURDATE()
-        """)
-        today_revenue = cursor.fetchone()['revenue']
+        total_customers = int(counters.get('customers', 0))
+        total_cars = int(counters.get('cars', 0))
+        active_rentals = int(counters.get('active_rentals', 0))
+        today_revenue = counters.get('today_revenue', 0)
         
         cursor.execute("""
             SELECT p.*, u.nama as customer_name, m.merk, m.model 
@@ -1817,6 +2725,36 @@ def admin_dashboard():
 # API ROUTES - ADMIN (LENGKAP)
 # ============================================
 
+ADMIN_USER_ORDER = ("created_at", "id")
+
+def build_admin_user_query(role='all', status='active', search=''):
+    """FROM/WHERE clause and params for the admin user list"""
+    query = "FROM users WHERE 1=1"
+    params = []
+    
+    if role != 'all':
+        query += " AND role = %s"
+        params.append(role)
+    
+    if status != 'all':
+        query += " AND status = %s"
+        params.append(status)
+    
+    if search:
+        term = fulltext_term(search, 'ft_users_search')
+        if term:
+            query += f" AND {USER_SEARCH_MATCH}"
+            params.append(term)
+        else:
+            query += " AND (nama LIKE %s OR email LIKE %s OR nik LIKE %s OR no_telepon LIKE %s)"
+            params.extend([f"%{search}%", f"%{search}%", f"%{search}%", f"%{search}%"])
+    
+    return query, params
+
+def admin_user_page_query(query):
+    return (f"SELECT id, nama, email, nik, no_telepon, role, status, foto_profil, created_at, last_login "
+            f"{query} ORDER BY created_at DESC, id DESC LIMIT %s OFFSET %s")
+
 @app.route('/admin/users')
 @admin_required
 def admin_users():
@@ -1825,53 +2763,67 @@ def admin_users():
     role = request.args.get('role', 'all')
     status = request.args.get('status', 'active')
     search = request.args.get('search', '')
+    per_page = app.config['ITEMS_PER_PAGE']
     
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor(dictionary=True)
         
-        query = "FROM users WHERE 1=1"
-        params = []
-        
-        if role != 'all':
-            query += " AND role = %s"
-            params.append(role)
-        
-        if status != 'all':
-            query += " AND status = %s"
-            params.append(status)
-        
-        if search:
-            query += " AND (nama LIKE %s OR email LIKE %s OR nik LIKE %s OR no_telepon LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%", f"%{search}%", f"%{search}%"])
-        
-        count_query = f"SELECT COUNT(*) as total {query}"
-        cursor.execute(count_query, tuple(params))
-        total = cursor.fetchone()['total']
-        
-        offset = (page - 1) * app.config['ITEMS_PER_PAGE']
-        user_query = f"SELECT id, nama, email, nik, no_telepon, role, status, foto_profil, created_at, last_login {query} ORDER BY created_at DESC LIMIT %s OFFSET %s"
-        params.extend([app.config['ITEMS_PER_PAGE'], offset])
+        query, params = build_admin_user_query(role, status, search)
+        total = cached_total(cursor, 'admin_users', query, params)
         
-        cursor.execute(user_query, tuple(params))
-        users = cursor.fetchall()
+        query, params, seeking = apply_seek(query, params, ADMIN_USER_ORDER, request.args.get('cursor'))
+        offset = 0 if seeking else (page - 1) * per_page
+        users, has_more, page_cursor = fetch_page(cursor, admin_user_page_query(query), params,
+                                                  per_page, offset, ('created_at', 'id'))
         
         cursor.close()
         conn.close()
         
-        total_pages = (total + app.config['ITEMS_PER_PAGE'] - 1) // app.config['ITEMS_PER_PAGE']
+        total_pages = (total + per_page - 1) // per_page
         
         return render_template('admin/users/list.html',
                              users=users,
                              page=page,
                              total_pages=total_pages,
                              total=total,
+                             next_cursor=page_cursor,
                              role=role,
                              status=status,
                              search=search)
     
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/api/admin/users')
+@admin_required
+def api_admin_users():
+    """Admin user list, one cursor page at a time (infinite scroll)"""
+    limit = api_page_limit()
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database error'}), 500
+    
+    cursor = conn.cursor(dictionary=True)
+    query, params = build_admin_user_query(request.args.get('role', 'all'),
+                                           request.args.get('status', 'active'),
+                                           request.args.get('search', ''))
+    total = cached_total(cursor, 'admin_users', query, params) if request.args.get('include_total') else None
+    
+    query, params, _ = apply_seek(query, params, ADMIN_USER_ORDER, request.args.get('cursor'))
+    users, has_more, page_cursor = fetch_page(cursor, admin_user_page_query(query), params,
+                                              limit, 0, ('created_at', 'id'))
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'success': True,
+        'users': users,
+        'has_more': has_more,
+        'next_cursor': page_cursor,
+        'total': total
+    })
+
 @app.route('/api/admin/users/add', methods=['POST'])
 @admin_required
 def api_admin_add_user():
@@ -1921,6 +2873,7 @@ def api_admin_add_user():
             user_id = cursor.lastrowid
             
             conn.commit()
+            user_suggestions.refresh(user_id)
             cursor.close()
             conn.close()
             
@@ -1965,6 +2918,7 @@ def admin_toggle_user(user_id):
         
         cursor.execute("UPDATE users SET status = %s WHERE id = %s", (new_status, user_id))
         conn.commit()
+        invalidate_role_cache(user_id)
         
         cursor.close()
         conn.close()
@@ -1991,6 +2945,8 @@ def admin_delete_user(user_id):
         # Delete user
         cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
         conn.commit()
+        invalidate_role_cache(user_id)
+        user_suggestions.remove(user_id)
         
         cursor.close()
         conn.close()
@@ -2025,6 +2981,8 @@ def admin_user_edit(user_id):
             """, (nama, email, nik, no_telepon, alamat, tanggal_lahir, role, status, user_id))
             
             conn.commit()
+            invalidate_role_cache(user_id)
+            user_suggestions.refresh(user_id)
             flash('Data pengguna berhasil diperbarui', 'success')
             return redirect(url_for('admin_users'))
         
@@ -2065,7 +3023,19 @@ def admin_cars():
             query += " AND status = %s"
             params.append(status)
         
-        if search:
+        order_by = "created_at DESC"
+        order_params = []
+        ranked = fleet_snapshot.match_ids(search) if search else None
+        if ranked is not None:
+            # Index trigram armada: hasil berperingkat, relevansi tertinggi dulu
+            if ranked:
+                query += f" AND id IN ({placeholders(ranked)})"
+                params.extend(ranked)
+                order_by = f"FIELD(id, {placeholders(ranked)})"
+                order_params = list(ranked)
+            else:
+                query += " AND 1=0"
+        elif search:
             query += " AND (merk LIKE %s OR model LIKE %s OR plat_nomor LIKE %s)"
             params.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
         
@@ -2074,8 +3044,8 @@ def admin_cars():
         total = cursor.fetchone()['total']
         
         offset = (page - 1) * app.config['ITEMS_PER_PAGE']
-        car_query = f"SELECT * {query} ORDER BY created_at DESC LIMIT %s OFFSET %s"
-        params.extend([app.config['ITEMS_PER_PAGE'], offset])
+        car_query = f"SELECT * {query} ORDER BY {order_by} LIMIT %s OFFSET %s"
+        params.extend(order_params + [app.config['ITEMS_PER_PAGE'], offset])
         
         cursor.execute(car_query, tuple(params))
         cars = cursor.fetchall()
@@ -2114,7 +3084,10 @@ def admin_car_add():
         if 'gambar' in request.files:
             file = request.files['gambar']
             if file and file.filename != '':
-                gambar = save_file(file, app.config['CAR_UPLOAD_FOLDER'])
+                gambar, error = save_image(file, 'cars')
+                if error:
+                    flash(error, 'danger')
+                    return redirect(url_for('admin_car_add'))
         
         conn = get_db_connection()
         if conn:
@@ -2125,10 +3098,12 @@ def admin_car_add():
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'tersedia')
             """, (merk, model, tahun, plat_nomor, tipe, transmisi, 
                   kapasitas, harga_per_hari, deskripsi, gambar))
+            car_id = cursor.lastrowid
             
             conn.commit()
             cursor.close()
             conn.close()
+            fleet_snapshot.refresh_car(car_id)
             
             flash('Mobil berhasil ditambahkan', 'success')
             return redirect(url_for('admin_cars'))
@@ -2161,7 +3136,12 @@ def admin_car_edit(car_id):
             if 'gambar' in request.files:
                 file = request.files['gambar']
                 if file and file.filename != '':
-                    gambar = save_file(file, app.config['CAR_UPLOAD_FOLDER'])
+                    gambar, error = save_image(file, 'cars')
+                    if error:
+                        cursor.close()
+                        conn.close()
+                        flash(error, 'danger')
+                        return redirect(url_for('admin_car_edit', car_id=car_id))
             
             update_query = """
                 UPDATE mobil 
@@ -2180,6 +3160,7 @@ def admin_car_edit(car_id):
             
             cursor.execute(update_query, tuple(params))
             conn.commit()
+            fleet_snapshot.refresh_car(car_id)
             
             flash('Data mobil berhasil diperbarui', 'success')
             return redirect(url_for('admin_cars'))
@@ -2215,6 +3196,7 @@ def admin_delete_car(car_id):
         # Delete car
         cursor.execute("DELETE FROM mobil WHERE id = %s", (car_id,))
         conn.commit()
+        fleet_snapshot.remove_car(car_id)
         
         cursor.close()
         conn.close()
@@ -2227,6 +3209,81 @@ def admin_delete_car(car_id):
 # ROUTES - ADMIN ORDERS (LENGKAP) - IMPROVED
 # ============================================
 
+def parse_filter_date(value):
+    """YYYY-MM-DD filter value as a datetime at midnight, or None if empty/invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+def build_admin_order_query(status='all', payment_status='all', start_date=None, end_date=None, search=''):
+    """FROM/WHERE clause and params for the admin order list.
+    
+    Predicates are written against bare pesanan columns so the composite
+    (status_pembayaran, status, tanggal_pemesanan) style indexes apply: equality
+    filters first, then a half-open tanggal_pemesanan range. Text search uses the
+    FULLTEXT/trigram indexes; users and mobil are only joined for the LIKE fallback.
+    """
+    clauses = []
+    params = []
+    joins = ""
+    
+    if status != 'all':
+        clauses.append("p.status = %s")
+        params.append(status)
+    
+    if payment_status != 'all':
+        clauses.append("p.status_pembayaran = %s")
+        params.append(payment_status)
+    
+    start = parse_filter_date(start_date)
+    if start:
+        clauses.append("p.tanggal_pemesanan >= %s")
+        params.append(start)
+    
+    end = parse_filter_date(end_date)
+    if end:
+        # Rentang setengah terbuka: < hari berikutnya, bukan DATE(...) <= end
+        clauses.append("p.tanggal_pemesanan < %s")
+        params.append(end + timedelta(days=1))
+    
+    if search:
+        term = fulltext_term(search, 'ft_users_search', 'ft_pesanan_kode')
+        car_ids = fleet_snapshot.match_ids(search) if term else None
+        if car_ids is not None:
+            # Tiap sumber dicari lewat index-nya sendiri: FULLTEXT users, FULLTEXT kode_pesanan, trigram armada
+            matches = [f"p.user_id IN (SELECT id FROM users WHERE {USER_SEARCH_MATCH})",
+                       "MATCH(p.kode_pesanan) AGAINST (%s IN BOOLEAN MODE)"]
+            params.extend([term, term])
+            if car_ids:
+                matches.append(f"p.mobil_id IN ({placeholders(car_ids)})")
+                params.extend(car_ids)
+            clauses.append("(" + " OR ".join(matches) + ")")
+        else:
+            joins = "JOIN users u ON p.user_id = u.id JOIN mobil m ON p.mobil_id = m.id"
+            clauses.append("(u.nama LIKE %s OR m.merk LIKE %s OR m.model LIKE %s OR p.kode_pesanan LIKE %s OR u.email LIKE %s)")
+            params.extend([f"%{search}%"] * 5)
+    
+    where = " AND ".join(clauses) if clauses else "1=1"
+    return f"FROM pesanan p {joins} WHERE {where}", params
+
+ADMIN_ORDER_ORDER = ("p.tanggal_pemesanan", "p.id")
+
+def admin_order_page_query(query):
+    """Deferred join: page over pesanan ids first, then join the display columns for that page only"""
+    return f"""
+        SELECT p.*, u.nama as customer_name, u.email as customer_email, u.no_telepon, 
+               m.merk, m.model, m.plat_nomor, m.gambar as car_image
+        FROM (
+            SELECT p.id {query}
+            ORDER BY p.tanggal_pemesanan DESC, p.id DESC LIMIT %s OFFSET %s
+        ) AS halaman
+        JOIN pesanan p ON p.id = halaman.id
+        JOIN users u ON p.user_id = u.id 
+        JOIN mobil m ON p.mobil_id = m.id 
+        ORDER BY p.tanggal_pemesanan DESC, p.id DESC
+    """
+
 @app.route('/admin/orders')
 @admin_required
 def admin_orders():
@@ -2237,64 +3294,31 @@ def admin_orders():
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     search = request.args.get('search', '')
+    per_page = app.config['ITEMS_PER_PAGE']
     
     conn = get_db_connection()
     if conn:
         cursor = conn.cursor(dictionary=True)
         
-        query = """
-            FROM pesanan p 
-            JOIN users u ON p.user_id = u.id 
-            JOIN mobil m ON p.mobil_id = m.id 
-            WHERE 1=1
-        """
-        params = []
-        
-        if status != 'all':
-            query += " AND p.status = %s"
-            params.append(status)
-        
-        if payment_status != 'all':
-            query += " AND p.status_pembayaran = %s"
-            params.append(payment_status)
-        
-        if start_date:
-            query += " AND DATE(p.tanggal_pemesanan) >= %s"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND DATE(p.tanggal_pemesanan) <= %s"
-            params.append(end_date)
-        
-        if search:
-            query += " AND (u.nama LIKE %s OR m.merk LIKE %s OR m.model LIKE %s OR p.kode_pesanan LIKE %s OR u.email LIKE %s)"
-            params.extend([f"%{search}%", f"%{search}%", f"%{search}%", f"%{search}%", f"%{search}%"])
-        
-        count_query = f"SELECT COUNT(*) as total {query}"
-        cursor.execute(count_query, tuple(params))
-        total = cursor.fetchone()['total']
-        
-        offset = (page - 1) * app.config['ITEMS_PER_PAGE']
-        order_query = f"""
-            SELECT p.*, u.nama as customer_name, u.email as customer_email, u.no_telepon, 
-                   m.merk, m.model, m.plat_nomor, m.gambar as car_image {query}
-            ORDER BY p.tanggal_pemesanan DESC LIMIT %s OFFSET %s
-        """
-        params.extend([app.config['ITEMS_PER_PAGE'], offset])
+        query, params = build_admin_order_query(status, payment_status, start_date, end_date, search)
+        total = cached_total(cursor, 'admin_orders', query, params)
         
-        cursor.execute(order_query, tuple(params))
-        orders = cursor.fetchall()
+        query, params, seeking = apply_seek(query, params, ADMIN_ORDER_ORDER, request.args.get('cursor'))
+        offset = 0 if seeking else (page - 1) * per_page
+        orders, has_more, page_cursor = fetch_page(cursor, admin_order_page_query(query), params,
+                                                   per_page, offset, ('tanggal_pemesanan', 'id'))
         
         cursor.close()
         conn.close()
         
-        total_pages = (total + app.config['ITEMS_PER_PAGE'] - 1) // app.config['ITEMS_PER_PAGE']
+        total_pages = (total + per_page - 1) // per_page
         
         return render_template('admin/orders/list.html',
                              orders=orders,
                              page=page,
                              total_pages=total_pages,
                              total=total,
+                             next_cursor=page_cursor,
                              status=status,
                              payment_status=payment_status,
                              start_date=start_date,
@@ -2303,6 +3327,38 @@ def admin_orders():
     
     return redirect(url_for('admin_dashboard'))
 
+@app.route('/api/admin/orders')
+@admin_required
+def api_admin_orders():
+    """Admin order list with the /admin/orders filters, one cursor page at a time (infinite scroll)"""
+    limit = api_page_limit()
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database error'}), 500
+    
+    cursor = conn.cursor(dictionary=True)
+    query, params = build_admin_order_query(request.args.get('status', 'all'),
+                                            request.args.get('payment_status', 'all'),
+                                            request.args.get('start_date'),
+                                            request.args.get('end_date'),
+                                            request.args.get('search', ''))
+    total = cached_total(cursor, 'admin_orders', query, params) if request.args.get('include_total') else None
+    
+    query, params, _ = apply_seek(query, params, ADMIN_ORDER_ORDER, request.args.get('cursor'))
+    orders, has_more, page_cursor = fetch_page(cursor, admin_order_page_query(query), params,
+                                               limit, 0, ('tanggal_pemesanan', 'id'))
+    cursor.close()
+    conn.close()
+    
+    return jsonify({
+        'success': True,
+        'orders': orders,
+        'has_more': has_more,
+        'next_cursor': page_cursor,
+        'total': total
+    })
+
 @app.route('/admin/order/<string:order_code>/update', methods=['POST'])
 @admin_required
 def admin_order_update(order_code):
@@ -2322,6 +3378,7 @@ def admin_order_update(order_code):
         conn.commit()
         cursor.close()
         conn.close()
+        availability_index.invalidate()
         
         flash('Status pesanan berhasil diperbarui', 'success')
     
@@ -2448,6 +3505,168 @@ def health_check():
         'midtrans': 'sandbox' if app.config['MIDTRANS_SANDBOX'] else 'production'
     })
 
+@app.route('/api/availability')
+def api_availability():
+    """Availability of one car or the whole fleet for a date range"""
+    car_id = request.args.get('car_id', type=int)
+    tanggal_mulai = request.args.get('tanggal_mulai')
+    tanggal_selesai = request.args.get('tanggal_selesai')
+    
+    try:
+        start_date, end_date = parse_rental_range(tanggal_mulai, tanggal_selesai)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    if car_id:
+        car = fleet_snapshot.get(car_id) if fleet_snapshot.ensure_loaded() else None
+        if not car:
+            return jsonify({'success': False, 'message': 'Car not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'car_id': car_id,
+            'available': car.status in RENTABLE_CAR_STATUSES and availability_index.is_available(car_id, start_date, end_date),
+            'booked_ranges': [
+                {'tanggal_mulai': start.isoformat(), 'tanggal_selesai': end.isoformat()}
+                for start, end in availability_index.booked_ranges(car_id)
+            ]
+        })
+    
+    car_ids = fleet_snapshot.car_ids(RENTABLE_CAR_STATUSES)
+    return jsonify({
+        'success': True,
+        'tanggal_mulai': start_date.isoformat(),
+        'tanggal_selesai': end_date.isoformat(),
+        'available_car_ids': sorted(availability_index.available_cars(car_ids, start_date, end_date))
+    })
+
+# Scope saran: (sumber, hanya admin)
+SUGGEST_SCOPES = {
+    'cars': (fleet_snapshot, False),
+    'users': (user_suggestions, True),
+    'orders': (order_suggestions, True),
+}
+
+@app.route('/api/suggest')
+def api_suggest():
+    """Typeahead completions; scope cars is public, users and orders are admin-only"""
+    scope = request.args.get('scope', 'cars')
+    if scope not in SUGGEST_SCOPES:
+        return jsonify({'success': False, 'message': 'Scope tidak dikenal'}), 400
+    
+    source, admin_only = SUGGEST_SCOPES[scope]
+    if admin_only and not is_active_admin():
+        return jsonify({'success': False, 'message': 'Akses ditolak'}), 403
+    
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 8, type=int), app.config['SUGGEST_MAX_LIMIT']))
+    return jsonify({
+        'success': True,
+        'scope': scope,
+        'query': query,
+        'suggestions': source.suggest(query, limit)
+    })
+
+@app.route('/api/admin/daily-stats')
+@admin_required
+def api_admin_daily_stats():
+    """Daily order/revenue rollup for a date range (default: last 30 days)"""
+    try:
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() \
+            if request.args.get('end') else datetime.now().date()
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() \
+            if request.args.get('start') else end_date - timedelta(days=29)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Format tanggal harus YYYY-MM-DD'}), 400
+    
+    if start_date > end_date:
+        return jsonify({'success': False, 'message': 'Tanggal mulai harus sebelum tanggal akhir'}), 400
+    if (end_date - start_date).days >= 3660:
+        return jsonify({'success': False, 'message': 'Rentang maksimal 10 tahun'}), 400
+    
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({'success': False, 'message': 'Database error'}), 500
+    
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"""
+        SELECT tanggal, {', '.join(DAILY_STATS_FIELDS)}
+        FROM daily_stats
+        WHERE tanggal BETWEEN %s AND %s
+    """, (start_date, end_date))
+    rows = {row['tanggal']: row for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    
+    # Hari tanpa pesanan tidak punya baris; isi nol agar deret tanggal tetap utuh
+    days = []
+    # Pelanggan unik per hari tidak bisa dijumlahkan antar hari
+    totals = {field: 0 for field in DAILY_STATS_FIELDS if field != 'total_customers'}
+    day = start_date
+    while day <= end_date:
+        row = rows.get(day)
+        entry = {'tanggal': day.isoformat()}
+        for field in DAILY_STATS_FIELDS:
+            value = row[field] if row else 0
+            entry[field] = float(value) if field == 'total_revenue' else int(value)
+            if field in totals:
+                totals[field] += entry[field]
+        days.append(entry)
+        day += timedelta(days=1)
+    
+    return jsonify({
+        'success': True,
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'days': days,
+        'totals': totals
+    })
+
+@app.route('/api/admin/system-stats')
+@admin_required
+def api_admin_system_stats():
+    """Runtime statistics for monitoring dashboards"""
+    return jsonify({
+        'success': True,
+        'timestamp': datetime.now().isoformat(),
+        'db_pool': db_pool.stats(),
+        'webhook_queue': webhook_queue.stats(),
+        'payment_event_cache': payment_events.stats(),
+        'midtrans': midtrans.stats(),
+        'snap_tokens': snap_tokens.stats(),
+        'count_cache': count_cache.stats(),
+        'suggestions': {'users': user_suggestions.stats(), 'orders': order_suggestions.stats()},
+        'logging': log_pipeline.stats(),
+        'slow_queries': slow_query_log.stats(),
+        'images': image_pipeline.stats()
+    })
+
+@app.route('/admin/slow-queries')
+@admin_required
+def admin_slow_queries():
+    """Slow statements grouped by fingerprint, with the EXPLAIN of the first occurrence"""
+    sort = request.args.get('sort', 'total')
+    return render_template('admin/slow_queries.html',
+                         entries=slow_query_log.entries(sort),
+                         stats=slow_query_log.stats(),
+                         sort=sort)
+
+@app.route('/admin/slow-queries/reset', methods=['POST'])
+@admin_required
+def admin_slow_queries_reset():
+    """Clear the slow query log, e.g. after deploying an index"""
+    slow_query_log.reset()
+    flash('Slow query log dikosongkan', 'success')
+    return redirect(url_for('admin_slow_queries'))
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text exposition of request, DB, Midtrans and template metrics"""
+    token = app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return app.response_class('Unauthorized\n', status=401, mimetype='text/plain')
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # ============================================
 # ERROR HANDLERS (LENGKAP)
 # ============================================
@@ -2533,19 +3752,22 @@ def setup_placeholder_images():
 # TEST WEBHOOK FUNCTION
 # ============================================
 
-def test_midtrans_webhook(order_id):
-    """Test Midtrans webhook manually"""
+def test_midtrans_webhook(order_id, gross_amount='1750000.00'):
+    """Test Midtrans webhook manually (signed like a real notification)"""
     import json
     
+    # gross_amount berupa string dengan 2 desimal, persis seperti yang dikirim Midtrans
     test_data = {
         "order_id": order_id,
+        "status_code": "200",
         "transaction_status": "settlement",
         "transaction_id": f"TEST-{datetime.now().strftime('%Y%m%d%H%M%S')}",
         "payment_type": "qris",
-        "gross_amount": 1750000,
+        "gross_amount": gross_amount,
         "settlement_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         "fraud_status": "accept"
     }
+    test_data["signature_key"] = midtrans_signature(order_id, test_data["status_code"], gross_amount)
     
     # Simulate webhook call
     with app.test_client() as client:
@@ -0,0 +1,210 @@
+"""
+AVAILABILITY INDEX
+Bitmap hari per mobil dari pesanan aktif (tanggal_mulai s/d tanggal_selesai) untuk cek ketersediaan
+"""
+
+import time
+import logging
+import threading
+from datetime import date, datetime
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def _ordinal(value):
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d')
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+class AvailabilityIndex:
+    """Day bitmaps of booked days, per car and per day for the whole fleet.
+
+    Bit i of a car's bitmap is set when the car is booked on day origin + i, so a
+    date-range check is one shift-and-mask instead of an overlap query on pesanan.
+    Each day also has a fleet bitmap with one bit per car slot; the cars free for a
+    range are the AND of the per-day free bitmaps, i.e. NOT (OR of the booked ones).
+    Days before the origin (the load date) are in the past and are not tracked;
+    queries are clamped to [origin, last booked day], so the work per query is
+    bounded by the booking window rather than by the requested range.
+    """
+
+    def __init__(self, loader, max_age=300):
+        # loader(order_id=None) -> rows (id, mobil_id, tanggal_mulai, tanggal_selesai) of
+        # orders that still block their car, or None when the database is unavailable
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        self._reset(date.today().toordinal())
+
+    def _reset(self, origin):
+        self._origin = origin
+        self._orders = {}                    # order_id -> (car_id, start_ord, end_ord)
+        self._car_orders = defaultdict(set)  # car_id -> {order_id}
+        self._car_bits = {}                  # car_id -> bitmap (bit = hari)
+        self._car_slots = {}                 # car_id -> posisi bit di bitmap armada
+        self._slot_cars = []                 # posisi bit -> car_id
+        self._day_bits = {}                  # offset hari -> bitmap armada (bit = mobil)
+        self._last_day = -1                  # offset hari terakhir yang pernah terisi
+
+    # ----------------------------------------
+    # Loading & maintenance
+    # ----------------------------------------
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    def ensure_loaded(self):
+        if self._is_fresh():
+            return True
+        with self._load_lock:
+            if self._is_fresh():
+                return True
+            rows = self._loader()
+            if rows is None:
+                return self._loaded_at is not None
+            with self._lock:
+                self._reset(date.today().toordinal())
+                for row in rows:
+                    self._add(row['id'], row['mobil_id'], row['tanggal_mulai'], row['tanggal_selesai'])
+                self._loaded_at = time.monotonic()
+            logger.info(f"Availability index loaded: {len(rows)} active bookings")
+        return True
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def add_booking(self, order_id, car_id, start, end):
+        """Record a new blocking order"""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            self._add(order_id, car_id, start, end)
+
+    def remove_booking(self, order_id):
+        """Forget an order that no longer blocks its car (cancelled, failed, finished)"""
+        with self._lock:
+            self._remove(order_id)
+
+    def refresh_order(self, order_id):
+        """Re-read one order after a payment or status change"""
+        if self._loaded_at is None:
+            return
+        rows = self._loader(order_id)
+        if rows is None:
+            self.invalidate()
+            return
+        with self._lock:
+            self._remove(order_id)
+            for row in rows:
+                self._add(row['id'], row['mobil_id'], row['tanggal_mulai'], row['tanggal_selesai'])
+
+    def _offsets(self, start_ord, end_ord):
+        return max(start_ord - self._origin, 0), end_ord - self._origin
+
+    def _mask(self, start_ord, end_ord):
+        lo, hi = self._offsets(start_ord, end_ord)
+        if hi < lo:
+            return 0
+        return ((1 << (hi - lo + 1)) - 1) << lo
+
+    def _window(self, start, end):
+        """Query offsets clamped to the tracked days; nothing is booked outside them"""
+        lo, hi = self._offsets(_ordinal(start), _ordinal(end))
+        return lo, min(hi, self._last_day)
+
+    def _slot(self, car_id):
+        slot = self._car_slots.get(car_id)
+        if slot is None:
+            slot = self._car_slots[car_id] = len(self._slot_cars)
+            self._slot_cars.append(car_id)
+        return slot
+
+    def _add(self, order_id, car_id, start, end):
+        self._remove(order_id)
+        start_ord, end_ord = _ordinal(start), _ordinal(end)
+        self._orders[order_id] = (car_id, start_ord, end_ord)
+        self._car_orders[car_id].add(order_id)
+        self._car_bits[car_id] = self._car_bits.get(car_id, 0) | self._mask(start_ord, end_ord)
+
+        car_bit = 1 << self._slot(car_id)
+        lo, hi = self._offsets(start_ord, end_ord)
+        self._last_day = max(self._last_day, hi)
+        for day in range(lo, hi + 1):
+            self._day_bits[day] = self._day_bits.get(day, 0) | car_bit
+
+    def _remove(self, order_id):
+        entry = self._orders.pop(order_id, None)
+        if entry is None:
+            return
+        car_id, removed_start, removed_end = entry
+        self._car_orders[car_id].discard(order_id)
+        # Susun ulang bitmap mobil dari pesanan yang tersisa (bisa saja tumpang tindih)
+        bits = 0
+        for other_id in self._car_orders[car_id]:
+            _, start_ord, end_ord = self._orders[other_id]
+            bits |= self._mask(start_ord, end_ord)
+        self._car_bits[car_id] = bits
+
+        # Hapus bit mobil dari hari yang tidak lagi tertutup pesanan lain
+        car_bit = 1 << self._car_slots[car_id]
+        lo, hi = self._offsets(removed_start, removed_end)
+        for day in range(lo, hi + 1):
+            if not (bits >> day) & 1 and day in self._day_bits:
+                remaining = self._day_bits[day] & ~car_bit
+                if remaining:
+                    self._day_bits[day] = remaining
+                else:
+                    del self._day_bits[day]
+
+    # ----------------------------------------
+    # Queries
+    # ----------------------------------------
+
+    def is_available(self, car_id, start, end):
+        """True if the car has no blocking order on any day in [start, end]"""
+        if not self.ensure_loaded():
+            return False
+        with self._lock:
+            lo, hi = self._window(start, end)
+            if hi < lo:
+                return True
+            return not (self._car_bits.get(car_id, 0) >> lo) & ((1 << (hi - lo + 1)) - 1)
+
+    def booked_cars(self, start, end):
+        """Ids of cars booked on at least one day in [start, end], from the fleet day bitmaps"""
+        with self._lock:
+            lo, hi = self._window(start, end)
+            booked = 0
+            for day in range(lo, hi + 1):
+                booked |= self._day_bits.get(day, 0)
+            slot_cars = self._slot_cars
+
+            # Ambil posisi bit yang menyala lewat str.find (loop hanya sebanyak bit yang menyala)
+            bits = bin(booked)[:1:-1]
+            result = set()
+            pos = bits.find('1')
+            while pos != -1:
+                result.add(slot_cars[pos])
+                pos = bits.find('1', pos + 1)
+        return result
+
+    def available_cars(self, car_ids, start, end):
+        """Subset of car_ids that are free for the whole range"""
+        if not self.ensure_loaded():
+            return set()
+        return set(car_ids) - self.booked_cars(start, end)
+
+    def booked_ranges(self, car_id):
+        """Sorted (start, end) date ranges of blocking orders for one car"""
+        if not self.ensure_loaded():
+            return []
+        with self._lock:
+            ranges = sorted(self._orders[order_id][1:] for order_id in self._car_orders.get(car_id, ()))
+        return [(date.fromordinal(start), date.fromordinal(end)) for start, end in ranges]
@@ -0,0 +1,52 @@
+"""
+BACKFILL DAILY STATS
+Hitung ulang rollup daily_stats dari tabel pesanan (seluruh data atau rentang tanggal)
+
+Contoh:
+    python backfill_daily_stats.py
+    python backfill_daily_stats.py --start 2024-01-01 --end 2024-12-31
+
+Jalankan saat trafik rendah: pesanan yang berubah selama backfill pada rentang
+yang sama bisa tidak ikut terhitung.
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime
+
+from app import get_db_connection, rebuild_daily_stats
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily_stats rollup from pesanan")
+    parser.add_argument('--start', type=parse_date, help="tanggal awal (YYYY-MM-DD)")
+    parser.add_argument('--end', type=parse_date, help="tanggal akhir (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    if bool(args.start) != bool(args.end):
+        print("❌ --start dan --end harus diisi bersamaan")
+        sys.exit(2)
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Gagal terhubung ke database")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("BACKFILL DAILY STATS")
+    print("=" * 60)
+    print(f"Rentang: {args.start} s/d {args.end}" if args.start else "Rentang: semua data")
+
+    started = time.perf_counter()
+    try:
+        days = rebuild_daily_stats(conn, args.start, args.end)
+    finally:
+        conn.close()
+
+    print(f"✅ {days} hari dihitung ulang dalam {time.perf_counter() - started:.2f} s")
+    print("=" * 60)
@@ -0,0 +1,143 @@
+"""
+BENCH SEARCH
+Bandingkan pencarian lama (LIKE '%kata%') dengan index pencarian baru
+
+Contoh:
+    python bench_search.py                          # di memori: TrigramIndex vs scan linear, 100k user sintetis
+    python bench_search.py --users 20000 --terms budi 0812
+    python bench_search.py --db --terms budi gmail RNT-2024   # MySQL: LIKE vs FULLTEXT pada query admin
+
+Mode --db memakai database dari konfigurasi app; isi dulu dengan volume yang
+ingin diuji (mis. 100k users dan 1 juta pesanan) dan pastikan index FULLTEXT
+dari rental_mobil.sql sudah dibuat.
+"""
+
+import sys
+import time
+import random
+import argparse
+import statistics
+
+from search_index import TrigramIndex, search_words
+
+FIRST_NAMES = ('Budi', 'Siti', 'Andi', 'Dewi', 'Rizky', 'Putri', 'Agus', 'Rina', 'Joko', 'Ayu',
+               'Hendra', 'Lestari', 'Fajar', 'Indah', 'Bayu', 'Wulan', 'Dimas', 'Sari', 'Eko', 'Nur')
+LAST_NAMES = ('Santoso', 'Wijaya', 'Saputra', 'Hidayat', 'Pratama', 'Kusuma', 'Nugroho', 'Lubis',
+              'Siregar', 'Setiawan', 'Halim', 'Gunawan', 'Permana', 'Hakim', 'Utami', 'Rahman')
+DOMAINS = ('gmail.com', 'yahoo.co.id', 'outlook.com', 'mail.id')
+DEFAULT_TERMS = ('budi', 'santoso', 'wijaya@gmail', '0812', '3201', 'xyzq')
+
+
+def synthetic_users(count, seed=42):
+    rng = random.Random(seed)
+    users = []
+    for user_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        users.append((
+            user_id,
+            f"{first} {last}",
+            f"{first.lower()}.{last.lower()}{user_id}@{rng.choice(DOMAINS)}",
+            f"{rng.randint(3100, 3699)}{rng.randint(10**11, 10**12 - 1)}",
+            f"08{rng.randint(11, 99)}{rng.randint(10**7, 10**8 - 1)}",
+        ))
+    return users
+
+
+def timed(fn, repeat):
+    """Median wall time in ms and the last result"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def like_scan(rows, term):
+    """Semantik query lama per kata: setiap kata harus muncul di salah satu kolom"""
+    words = search_words(term)
+    return [row[0] for row in rows
+            if all(any(word in value.lower() for value in row[1:]) for word in words)]
+
+
+def bench_memory(args):
+    print(f"Membuat {args.users} user sintetis...")
+    users = synthetic_users(args.users)
+
+    index = TrigramIndex()
+    started = time.perf_counter()
+    for row in users:
+        index.add(row[0], *row[1:])
+    build = time.perf_counter() - started
+    print(f"Index dibangun dalam {build:.2f} s ({len(index)} dokumen)")
+    print("-" * 60)
+    print(f"{'kata':<16}{'hasil':>8}{'LIKE ms':>12}{'index ms':>12}{'speedup':>10}")
+
+    mismatches = 0
+    for term in args.terms:
+        like_ms, expected = timed(lambda: like_scan(users, term), args.repeat)
+        index_ms, found = timed(lambda: index.search(term), args.repeat)
+        if sorted(found) != sorted(expected):
+            mismatches += 1
+        speedup = like_ms / index_ms if index_ms else float('inf')
+        print(f"{term:<16}{len(found):>8}{like_ms:>12.2f}{index_ms:>12.3f}{speedup:>9.0f}x")
+    return mismatches
+
+
+def bench_db(args):
+    from app import app, get_db_connection, build_admin_user_query, build_admin_order_query
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Gagal terhubung ke database")
+        sys.exit(1)
+    cursor = conn.cursor(dictionary=True)
+
+    def run(build):
+        query, params = build()
+        cursor.execute(f"SELECT COUNT(*) as total {query}", tuple(params))
+        return cursor.fetchone()['total']
+
+    builders = (
+        ('users', lambda term: build_admin_user_query('all', 'all', term)),
+        ('orders', lambda term: build_admin_order_query(search=term)),
+    )
+
+    print(f"{'daftar':<8}{'kata':<16}{'LIKE':>8}{'LIKE ms':>11}{'FT':>8}{'FT ms':>10}")
+    mismatches = 0
+    for name, builder in builders:
+        for term in args.terms:
+            app.config['SEARCH_FULLTEXT'] = False
+            like_ms, like_total = timed(lambda: run(lambda: builder(term)), args.repeat)
+            app.config['SEARCH_FULLTEXT'] = True
+            ft_ms, ft_total = timed(lambda: run(lambda: builder(term)), args.repeat)
+            # FULLTEXT mencocokkan per kata (dan nik/no_telepon di pesanan), jadi boleh lebih banyak
+            if ft_total < like_total:
+                mismatches += 1
+            print(f"{name:<8}{term:<16}{like_total:>8}{like_ms:>11.1f}{ft_total:>8}{ft_ms:>10.1f}")
+
+    cursor.close()
+    conn.close()
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LIKE search against the search indexes")
+    parser.add_argument('--users', type=int, default=100000, help="jumlah user sintetis (mode memori)")
+    parser.add_argument('--terms', nargs='+', default=list(DEFAULT_TERMS), help="kata yang dicari")
+    parser.add_argument('--repeat', type=int, default=5, help="ulangan per kata (median)")
+    parser.add_argument('--db', action='store_true', help="uji query admin di MySQL, bukan di memori")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCH SEARCH")
+    print("=" * 60)
+
+    mismatches = bench_db(args) if args.db else bench_memory(args)
+
+    print("=" * 60)
+    if mismatches:
+        print(f"❌ {mismatches} kata memberi hasil berbeda dari LIKE")
+        sys.exit(1)
+    print("✅ Hasil index sama dengan LIKE")
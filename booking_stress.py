@@ -0,0 +1,129 @@
+"""
+BOOKING STRESS TEST
+Tembakkan ratusan booking bersamaan ke satu mobil dan pastikan hanya satu yang berhasil
+
+Contoh:
+    python booking_stress.py --car-id 1 --user-id 2 --threads 200
+"""
+
+import sys
+import time
+import argparse
+import threading
+from datetime import date, timedelta
+
+import mysql.connector
+
+from app import app, create_booking
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_stress(car_id, user_id, threads, start_date, days, keep=False):
+    """Jalankan booking bersamaan; return True jika tepat satu booking menang"""
+    end_date = start_date + timedelta(days=days - 1)
+
+    print("=" * 60)
+    print("BOOKING STRESS TEST")
+    print("=" * 60)
+    print(f"Mobil ID : {car_id}")
+    print(f"User ID  : {user_id}")
+    print(f"Tanggal  : {start_date} s/d {end_date}")
+    print(f"Threads  : {threads}")
+    print("-" * 60)
+
+    # Satu koneksi per thread, dibuka sebelum start agar handshake tidak ikut diukur
+    connections = [
+        mysql.connector.connect(
+            host=app.config['DB_HOST'],
+            user=app.config['DB_USER'],
+            password=app.config['DB_PASSWORD'],
+            database=app.config['DB_NAME'],
+            autocommit=False
+        )
+        for _ in range(threads)
+    ]
+
+    barrier = threading.Barrier(threads + 1)
+    results = [None] * threads
+    latencies = [0.0] * threads
+
+    def worker(index):
+        conn = connections[index]
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            order, reason = create_booking(conn, user_id, car_id, start_date, end_date,
+                                           'Stress test', 'booking_stress.py')
+            results[index] = order['kode_pesanan'] if order else reason
+        except Exception as e:
+            results[index] = f"error: {e}"
+        latencies[index] = time.perf_counter() - started
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+
+    barrier.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    winners = [r for r in results if r and r.startswith('RENT-')]
+    conflicts = results.count('conflict')
+    unavailable = results.count('unavailable')
+    errors = [r for r in results if r and r.startswith('error')]
+
+    print(f"Berhasil     : {len(winners)} {winners}")
+    print(f"Konflik      : {conflicts}")
+    print(f"Tidak tersedia: {unavailable}")
+    print(f"Error        : {len(errors)}")
+    for error in errors[:5]:
+        print(f"   {error}")
+    print("-" * 60)
+    print(f"Waktu total  : {elapsed:.3f} s")
+    print(f"Throughput   : {threads / elapsed:.1f} booking/s")
+    print(f"Latency p50  : {percentile(latencies, 50) * 1000:.1f} ms")
+    print(f"Latency p95  : {percentile(latencies, 95) * 1000:.1f} ms")
+    print(f"Latency p99  : {percentile(latencies, 99) * 1000:.1f} ms")
+
+    if winners and not keep:
+        conn = connections[0]
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM pesanan WHERE kode_pesanan = %s", (winners[0],))
+        conn.commit()
+        cursor.close()
+        print(f"Pesanan uji {winners[0]} dihapus")
+
+    for conn in connections:
+        conn.close()
+
+    ok = len(winners) == 1 and not errors
+    print("=" * 60)
+    print("✅ LULUS: tepat satu booking berhasil" if ok else "❌ GAGAL: hasil tidak sesuai harapan")
+    print("=" * 60)
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test for one car")
+    parser.add_argument('--car-id', type=int, required=True)
+    parser.add_argument('--user-id', type=int, required=True)
+    parser.add_argument('--threads', type=int, default=200)
+    parser.add_argument('--days', type=int, default=3, help="durasi sewa (hari)")
+    parser.add_argument('--start-offset', type=int, default=365,
+                        help="tanggal mulai = hari ini + N hari (pilih tanggal yang masih kosong)")
+    parser.add_argument('--keep', action='store_true', help="jangan hapus pesanan pemenang")
+    args = parser.parse_args()
+
+    start = date.today() + timedelta(days=args.start_offset)
+    ok = run_stress(args.car_id, args.user_id, args.threads, start, args.days, keep=args.keep)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,221 @@
+"""
+DATABASE CONNECTION POOL
+Pool koneksi MySQL: ukuran tetap, umur maksimal koneksi, validasi saat dipinjam, dan statistik
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Error):
+    """Tidak ada koneksi yang kosong sebelum batas waktu tunggu habis"""
+
+
+class PooledConnection:
+    """Koneksi pinjaman dari pool; close() mengembalikan koneksi ke pool"""
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        # Koneksi yang terikat ke request baru dikembalikan saat teardown
+        self.request_bound = False
+
+    def cursor(self, *args, **kwargs):
+        """Buffered cursor agar beberapa cursor aman berbagi satu koneksi"""
+        kwargs.setdefault('buffered', True)
+        cursor = self._raw.cursor(*args, **kwargs)
+        wrapper = self._pool.cursor_wrapper
+        return wrapper(cursor) if wrapper else cursor
+
+    def close(self):
+        """Kembalikan ke pool (diabaikan untuk koneksi milik request)"""
+        if not self.request_bound:
+            self.release()
+
+    def release(self):
+        """Kembalikan koneksi ke pool"""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw, self._created_at)
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise Error(msg="Connection already returned to the pool")
+        return getattr(raw, name)
+
+    def __bool__(self):
+        return True
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool"""
+
+    def __init__(self, size=10, max_lifetime=1800, timeout=10.0, validate_idle=5, cursor_wrapper=None,
+                 **connect_kwargs):
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.validate_idle = validate_idle
+        # cursor_wrapper(cursor) -> cursor, mis. untuk mengukur waktu query
+        self.cursor_wrapper = cursor_wrapper
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw, created_at, last_used)
+        self._open = 0
+        self._in_use = 0
+        self._waiters = 0
+
+        self._borrows = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._created = 0
+        self._recycled = 0
+        self._validation_failures = 0
+        self._timeouts = 0
+
+    def acquire(self):
+        """Pinjam koneksi; menunggu paling lama `timeout` detik bila pool penuh"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        entry = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO: pakai koneksi yang paling baru dipakai (paling "hangat")
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhausted(msg=f"No free connection after {self.timeout}s "
+                                            f"(pool size {self.size})")
+                waited = True
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            self._in_use += 1
+            self._borrows += 1
+            if waited:
+                wait_time = time.monotonic() - start
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        try:
+            raw, created_at = self._checkout(entry)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw, created_at)
+
+    def _checkout(self, entry):
+        """Validasi koneksi idle atau buka koneksi baru (di luar lock)"""
+        if entry is not None:
+            raw, created_at, last_used = entry
+            now = time.monotonic()
+
+            if self.max_lifetime and now - created_at > self.max_lifetime:
+                self._discard(raw)
+                with self._cond:
+                    self._recycled += 1
+            elif now - last_used >= self.validate_idle and not self._is_alive(raw):
+                self._discard(raw)
+                with self._cond:
+                    self._validation_failures += 1
+            else:
+                return raw, created_at
+
+        raw = mysql.connector.connect(**self._connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return raw, time.monotonic()
+
+    def _release(self, raw, created_at):
+        discard = False
+        try:
+            # Akhiri transaksi yang masih terbuka agar request berikutnya melihat data terbaru
+            raw.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding pooled connection after failed rollback: {e}")
+            discard = True
+
+        if self.max_lifetime and time.monotonic() - created_at > self.max_lifetime:
+            discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+
+        if discard:
+            self._discard(raw)
+
+    @staticmethod
+    def _is_alive(raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """Tutup semua koneksi idle"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        """Statistik pool untuk dashboard"""
+        with self._cond:
+            return {
+                'size': self.size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'waiters': self._waiters,
+                'borrows': self._borrows,
+                'waits': self._waits,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 3),
+                'wait_time_avg_ms': round(self._wait_time_total * 1000 / self._waits, 3) if self._waits else 0.0,
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 3),
+                'created': self._created,
+                'recycled': self._recycled,
+                'validation_failures': self._validation_failures,
+                'timeouts': self._timeouts,
+            }
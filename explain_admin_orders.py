@@ -0,0 +1,89 @@
+"""
+EXPLAIN ADMIN ORDERS
+Pastikan setiap kombinasi filter halaman admin pesanan memakai index pada tabel pesanan
+
+Contoh:
+    python explain_admin_orders.py
+
+Jalankan pada database dengan data yang realistis (mis. setelah seed data); pada
+tabel yang sangat kecil MySQL bisa memilih full scan karena lebih murah.
+Pencarian teks (LIKE '%...%') tidak bisa memakai B-tree dan hanya dicek bersama
+filter lain.
+"""
+
+import sys
+import itertools
+
+from app import get_db_connection, build_admin_order_query, admin_order_page_query
+
+STATUSES = ('all', 'dikonfirmasi')
+PAYMENT_STATUSES = ('all', 'paid')
+DATE_RANGES = ((None, None), ('2024-01-01', None), (None, '2024-12-31'), ('2024-01-01', '2024-12-31'))
+
+
+def explain(cursor, sql, params):
+    cursor.execute(f"EXPLAIN {sql}", params)
+    return cursor.fetchall()
+
+
+def pesanan_rows(plan):
+    """Baris EXPLAIN yang membaca tabel pesanan (alias p)"""
+    return [row for row in plan if row['table'] == 'p']
+
+
+def check(cursor, status, payment_status, start_date, end_date, search=''):
+    """Return list of problems (empty = index dipakai)"""
+    query, params = build_admin_order_query(status, payment_status, start_date, end_date, search)
+    problems = []
+    statements = (
+        ('count', f"SELECT COUNT(*) as total {query}", tuple(params)),
+        ('page', admin_order_page_query(query), tuple(params) + (10, 0)),
+    )
+    for name, sql, sql_params in statements:
+        for row in pesanan_rows(explain(cursor, sql, sql_params)):
+            # Baris join balik (eq_ref lewat PRIMARY) selalu aman; yang dicek adalah scan filternya
+            if row['type'] == 'ALL' or not row['key']:
+                problems.append(f"{name}: type={row['type']} key={row['key']} rows={row['rows']}")
+    return problems
+
+
+if __name__ == "__main__":
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Gagal terhubung ke database")
+        sys.exit(1)
+    cursor = conn.cursor(dictionary=True)
+
+    print("=" * 60)
+    print("EXPLAIN ADMIN ORDERS")
+    print("=" * 60)
+
+    combinations = [
+        (status, payment_status, start_date, end_date, '')
+        for status, payment_status, (start_date, end_date)
+        in itertools.product(STATUSES, PAYMENT_STATUSES, DATE_RANGES)
+    ]
+    # Pencarian teks dikombinasikan dengan filter yang bisa memakai index
+    combinations.append(('dikonfirmasi', 'paid', '2024-01-01', '2024-12-31', 'avanza'))
+
+    failures = 0
+    for combination in combinations:
+        problems = check(cursor, *combination)
+        label = (f"status={combination[0]:<13} bayar={combination[1]:<5} "
+                 f"mulai={combination[2] or '-':<10} akhir={combination[3] or '-':<10}"
+                 f"{' cari=' + combination[4] if combination[4] else ''}")
+        if problems:
+            failures += 1
+            print(f"❌ {label}")
+            for problem in problems:
+                print(f"      {problem}")
+        else:
+            print(f"✅ {label}")
+
+    cursor.close()
+    conn.close()
+
+    print("=" * 60)
+    print(f"{len(combinations) - failures}/{len(combinations)} kombinasi memakai index")
+    print("=" * 60)
+    sys.exit(1 if failures else 0)
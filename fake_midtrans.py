@@ -0,0 +1,479 @@
+"""
+FAKE MIDTRANS
+Stand-in lokal Midtrans untuk pengujian offline dan benchmark: Snap create_transaction,
+status API /v2/<order_id>/status, injeksi latency/error/timeout, dan pengirim webhook
+settlement/expire ke /payment/notification dengan laju yang bisa diatur
+
+Contoh:
+    python fake_midtrans.py                                   # port 5055, webhook ke localhost:5000
+    python fake_midtrans.py --latency 120 --jitter 80 --error-rate 0.02 --timeout-rate 0.01
+    python fake_midtrans.py --settle-after 5 --settle-ratio 0.7 --webhook-rate 50
+    python fake_midtrans.py --no-webhooks                     # hanya Snap + status API
+
+Arahkan app ke stand-in lewat environment sebelum menjalankan app.py:
+    MIDTRANS_API_URL=http://localhost:5055/snap/v1/transactions
+    MIDTRANS_API_BASE_URL=http://localhost:5055
+    MIDTRANS_SNAP_JS_URL=http://localhost:5055/snap/snap.js
+(loadtest.py mode in-process cukup --midtrans-url http://localhost:5055)
+
+Setiap transaksi Snap langsung berstatus pending. Setelah --settle-after detik
+stand-in memutuskan settlement (peluang --settle-ratio) atau expire, lalu
+mengirim notifikasi bertanda tangan (server key sama dengan app) ke --notify-url.
+snap.js tiruan membayar transaksi seketika saat tombol bayar ditekan.
+
+Endpoint kontrol:
+    GET  /_fake/stats                              ringkasan transaksi, fault dan webhook
+    POST /_fake/faults        {"endpoint": "status", "latency_ms": 300, "error_rate": 0.1}
+    POST /_fake/transactions/<order_id>/<settle|expire|deny|cancel>
+"""
+
+import os
+import sys
+import time
+import uuid
+import heapq
+import queue
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+import requests
+from flask import Flask, Response, jsonify, request
+
+from midtrans_client import auth_header
+
+logger = logging.getLogger(__name__)
+
+# transaction_status -> status_code seperti di notifikasi/status API Midtrans
+STATUS_CODES = {'settlement': '200', 'capture': '200', 'pending': '201',
+                'deny': '202', 'cancel': '202', 'expire': '407'}
+FAULT_FIELDS = ('latency_ms', 'jitter_ms', 'error_rate', 'timeout_rate', 'timeout_seconds')
+EXPIRY_UNITS = {'minutes': 1, 'minute': 1, 'hours': 60, 'hour': 60, 'days': 1440, 'day': 1440}
+PAYMENT_TYPES = ('bank_transfer', 'qris', 'gopay', 'credit_card')
+
+SNAP_JS = """(function () {
+    // Snap tiruan: pay() langsung membayar transaksi di stand-in lalu memanggil callback
+    var base = '%s';
+    window.snap = {
+        pay: function (token, options) {
+            options = options || {};
+            fetch(base + '/snap/v1/transactions/' + token + '/pay', {method: 'POST'})
+                .then(function (response) { return response.json(); })
+                .then(function (result) {
+                    var status = result.transaction_status;
+                    var callback = (status === 'settlement' || status === 'capture') ? options.onSuccess
+                        : status === 'pending' ? options.onPending : options.onError;
+                    if (callback) { callback(result); }
+                })
+                .catch(function (error) {
+                    if (options.onError) { options.onError({status_message: String(error)}); }
+                });
+        },
+        hide: function () {}
+    };
+})();
+"""
+
+
+def signature_key(order_id, status_code, gross_amount, server_key):
+    """SHA512(order_id + status_code + gross_amount + server key), as Midtrans signs notifications"""
+    return hashlib.sha512(f"{order_id}{status_code}{gross_amount}{server_key}".encode()).hexdigest()
+
+
+class FaultInjector:
+    """Latency, error and timeout injection for one endpoint"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, timeout_rate=0.0, timeout_seconds=30):
+        self._lock = threading.Lock()
+        self.configure(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate,
+                       timeout_rate=timeout_rate, timeout_seconds=timeout_seconds)
+        self._errors = 0
+        self._timeouts = 0
+
+    def configure(self, **values):
+        with self._lock:
+            for field in FAULT_FIELDS:
+                if values.get(field) is not None:
+                    setattr(self, field, float(values[field]))
+
+    def apply(self):
+        """Sleep the injected latency; returns an error Response to send instead, or None"""
+        delay = (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000
+        if delay > 0:
+            time.sleep(delay)
+        roll = random.random()
+        if roll < self.timeout_rate:
+            with self._lock:
+                self._timeouts += 1
+            # Lebih lama dari read timeout klien; klien menyerah sebelum jawaban ini tiba
+            time.sleep(self.timeout_seconds)
+            return jsonify({'status_code': '504', 'status_message': 'Injected timeout'}), 504
+        if roll < self.timeout_rate + self.error_rate:
+            with self._lock:
+                self._errors += 1
+            status = random.choice((500, 502, 503))
+            return jsonify({'status_code': str(status), 'status_message': 'Injected error'}), status
+        return None
+
+    def stats(self):
+        with self._lock:
+            stats = {field: getattr(self, field) for field in FAULT_FIELDS}
+            stats.update(errors=self._errors, timeouts=self._timeouts)
+            return stats
+
+
+class WebhookEmitter:
+    """Send signed notifications to the app from worker threads, paced to `rate` per second"""
+
+    def __init__(self, notify_url, rate=20, workers=4, max_attempts=5, timeout=10, duplicate_ratio=0.0):
+        self.notify_url = notify_url
+        self.interval = 1 / rate if rate > 0 else 0
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.duplicate_ratio = duplicate_ratio
+        self.session = requests.Session()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+        self._sent = 0
+        self._failed = 0
+        self._retried = 0
+        self._duplicates = 0
+        self._statuses = {}
+        for index in range(workers):
+            threading.Thread(target=self._run, name=f'fake-webhook-{index}', daemon=True).start()
+
+    def push(self, notification):
+        self._queue.put((notification, 1))
+        if self.duplicate_ratio and random.random() < self.duplicate_ratio:
+            # Midtrans kadang mengirim notifikasi yang sama lebih dari sekali
+            with self._lock:
+                self._duplicates += 1
+            self._queue.put((notification, 1))
+
+    def _pace(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _run(self):
+        while True:
+            notification, attempt = self._queue.get()
+            self._pace()
+            try:
+                response = self.session.post(self.notify_url, json=notification, timeout=self.timeout)
+                outcome = str(response.status_code)
+                delivered = response.status_code == 200
+            except requests.exceptions.RequestException as e:
+                outcome = type(e).__name__
+                delivered = False
+            with self._lock:
+                self._statuses[outcome] = self._statuses.get(outcome, 0) + 1
+                if delivered:
+                    self._sent += 1
+                elif attempt >= self.max_attempts:
+                    self._failed += 1
+                else:
+                    self._retried += 1
+            if not delivered:
+                logger.warning(f"Notification {notification['order_id']} {notification['transaction_status']} "
+                               f"attempt {attempt} failed: {outcome}")
+                if attempt < self.max_attempts:
+                    # Backoff bertahap seperti retry notifikasi Midtrans
+                    timer = threading.Timer(min(2 ** attempt, 60), self._queue.put, ((notification, attempt + 1),))
+                    timer.daemon = True
+                    timer.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'notify_url': self.notify_url,
+                'queued': self._queue.qsize(),
+                'sent': self._sent,
+                'failed': self._failed,
+                'retried': self._retried,
+                'duplicates': self._duplicates,
+                'responses': dict(self._statuses),
+            }
+
+
+class FakeMidtrans:
+    """In-memory Snap transactions and their lifecycle (pending -> settlement/expire/...)"""
+
+    def __init__(self, server_key, emitter=None, settle_after=3.0, settle_ratio=0.8, token_ttl=1440):
+        self.server_key = server_key
+        self.emitter = emitter
+        self.settle_after = settle_after
+        self.settle_ratio = settle_ratio
+        self.token_ttl = token_ttl
+        self._lock = threading.Lock()
+        self._transactions = {}   # order_id -> transaksi
+        self._by_token = {}       # token -> order_id
+        self._by_id = {}          # transaction_id -> order_id
+        self._due = []            # heap (waktu jatuh tempo, order_id) transaksi pending
+        self._wakeup = threading.Event()
+        if settle_after >= 0:
+            threading.Thread(target=self._resolve_loop, name='fake-midtrans-resolver', daemon=True).start()
+
+    def create(self, param, base_url):
+        """Snap create_transaction; returns (body, http status)"""
+        details = param.get('transaction_details') or {}
+        order_id = details.get('order_id')
+        gross_amount = details.get('gross_amount')
+        if not order_id or gross_amount is None:
+            return {'error_messages': ['transaction_details.order_id and gross_amount are required']}, 400
+
+        now = datetime.now()
+        with self._lock:
+            existing = self._transactions.get(order_id)
+            if existing and existing['transaction_status'] != 'pending':
+                return {'error_messages': ['transaction_details.order_id sudah digunakan']}, 400
+            token = str(uuid.uuid4())
+            expiry = param.get('expiry') or {}
+            minutes = expiry.get('duration', self.token_ttl) * EXPIRY_UNITS.get(expiry.get('unit', 'minutes'), 1)
+            if existing:
+                self._by_token[token] = order_id
+                existing['token'] = token
+                existing['expires_at'] = now + timedelta(minutes=minutes)
+            else:
+                payment_type = random.choice(PAYMENT_TYPES)
+                transaction = {
+                    'order_id': order_id,
+                    'transaction_id': str(uuid.uuid4()),
+                    'gross_amount': f"{float(gross_amount):.2f}",
+                    'payment_type': payment_type,
+                    'bank': 'bca' if payment_type == 'bank_transfer' else None,
+                    'va_number': f"{random.randrange(10**10, 10**11)}" if payment_type == 'bank_transfer' else None,
+                    'transaction_status': 'pending',
+                    'transaction_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+                    'settlement_time': None,
+                    'token': token,
+                    'expires_at': now + timedelta(minutes=minutes),
+                }
+                self._transactions[order_id] = transaction
+                self._by_token[token] = order_id
+                self._by_id[transaction['transaction_id']] = order_id
+                if self.settle_after >= 0:
+                    heapq.heappush(self._due, (time.monotonic() + self.settle_after, order_id))
+                    self._wakeup.set()
+        return {'token': token, 'redirect_url': f"{base_url}/snap/v2/vtweb/{token}"}, 201
+
+    def find(self, key):
+        """Transaction by order_id, transaction_id or Snap token"""
+        with self._lock:
+            order_id = key if key in self._transactions else self._by_id.get(key) or self._by_token.get(key)
+            transaction = self._transactions.get(order_id)
+            return dict(transaction) if transaction else None
+
+    def status_body(self, transaction):
+        status = transaction['transaction_status']
+        status_code = STATUS_CODES[status]
+        body = {
+            'status_code': status_code,
+            'status_message': 'Success, transaction is found',
+            'transaction_id': transaction['transaction_id'],
+            'order_id': transaction['order_id'],
+            'gross_amount': transaction['gross_amount'],
+            'currency': 'IDR',
+            'payment_type': transaction['payment_type'],
+            'transaction_time': transaction['transaction_time'],
+            'transaction_status': status,
+            'fraud_status': 'accept',
+            'signature_key': signature_key(transaction['order_id'], status_code,
+                                           transaction['gross_amount'], self.server_key),
+        }
+        if transaction['va_number']:
+            body['va_numbers'] = [{'bank': transaction['bank'], 'va_number': transaction['va_number']}]
+            body['bank'] = transaction['bank']
+        if transaction['settlement_time']:
+            body['settlement_time'] = transaction['settlement_time']
+        return body
+
+    def transition(self, key, status):
+        """Move a transaction to `status` and emit its notification; returns the status body or None"""
+        with self._lock:
+            order_id = key if key in self._transactions else self._by_id.get(key) or self._by_token.get(key)
+            transaction = self._transactions.get(order_id)
+            if not transaction:
+                return None
+            if transaction['transaction_status'] == 'pending' or status == transaction['transaction_status']:
+                transaction['transaction_status'] = status
+                if status in ('settlement', 'capture'):
+                    transaction['settlement_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            body = self.status_body(transaction)
+        if self.emitter is not None and status != 'pending':
+            self.emitter.push(body)
+        return body
+
+    def _resolve_loop(self):
+        while True:
+            with self._lock:
+                wait = self._due[0][0] - time.monotonic() if self._due else None
+                due = []
+                while self._due and self._due[0][0] <= time.monotonic():
+                    due.append(heapq.heappop(self._due)[1])
+            for order_id in due:
+                transaction = self.find(order_id)
+                if transaction and transaction['transaction_status'] == 'pending':
+                    self.transition(order_id, 'settlement' if random.random() < self.settle_ratio else 'expire')
+            if not due:
+                self._wakeup.wait(timeout=wait if wait is not None else 1)
+                self._wakeup.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for transaction in self._transactions.values():
+                status = transaction['transaction_status']
+                counts[status] = counts.get(status, 0) + 1
+            return {'transactions': len(self._transactions), 'by_status': counts, 'scheduled': len(self._due)}
+
+
+def create_app(fake, faults):
+    """Flask app exposing the Snap/Core API subset the rental app uses"""
+    app = Flask(__name__)
+
+    def authorized():
+        return request.headers.get('Authorization') == auth_header(fake.server_key)
+
+    def unauthorized():
+        return jsonify({'status_code': '401', 'error_messages': [
+            'Access denied due to unauthorized transaction, please check client or server key']}), 401
+
+    @app.route('/snap/v1/transactions', methods=['POST'])
+    def snap_create():
+        if not authorized():
+            return unauthorized()
+        injected = faults['snap'].apply()
+        if injected:
+            return injected
+        body, status = fake.create(request.get_json(silent=True) or {}, request.host_url.rstrip('/'))
+        return jsonify(body), status
+
+    @app.route('/v2/<string:order_id>/status')
+    def transaction_status(order_id):
+        if not authorized():
+            return unauthorized()
+        injected = faults['status'].apply()
+        if injected:
+            return injected
+        transaction = fake.find(order_id)
+        if not transaction:
+            return jsonify({'status_code': '404', 'status_message': "Transaction doesn't exist."}), 404
+        return jsonify(fake.status_body(transaction))
+
+    @app.route('/snap/snap.js')
+    def snap_js():
+        return Response(SNAP_JS % request.host_url.rstrip('/'), mimetype='application/javascript')
+
+    @app.route('/snap/v1/transactions/<string:token>/pay', methods=['POST'])
+    def snap_pay(token):
+        """Dipanggil snap.js tiruan / halaman redirect: pelanggan membayar"""
+        status = request.args.get('status', 'settlement')
+        if status not in STATUS_CODES:
+            return jsonify({'status_message': f'Unknown status {status}'}), 400
+        body = fake.transition(token, status)
+        if body is None:
+            return jsonify({'status_code': '404', 'status_message': 'Token not found'}), 404
+        response = jsonify(body)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+
+    @app.route('/snap/v2/vtweb/<string:token>')
+    def snap_redirect(token):
+        transaction = fake.find(token)
+        if not transaction:
+            return "Token tidak ditemukan", 404
+        return (f"<h3>Fake Midtrans</h3><p>{transaction['order_id']} - Rp {transaction['gross_amount']} - "
+                f"{transaction['transaction_status']}</p>"
+                f"<form method='post' action='/snap/v1/transactions/{token}/pay'><button>Bayar</button></form>"
+                f"<form method='post' action='/snap/v1/transactions/{token}/pay?status=expire'>"
+                f"<button>Biarkan kedaluwarsa</button></form>")
+
+    @app.route('/_fake/transactions/<string:order_id>/<string:action>', methods=['POST'])
+    def fake_transition(order_id, action):
+        status = {'settle': 'settlement', 'expire': 'expire', 'deny': 'deny', 'cancel': 'cancel'}.get(action)
+        if not status:
+            return jsonify({'message': f'Unknown action {action}'}), 400
+        body = fake.transition(order_id, status)
+        if body is None:
+            return jsonify({'message': 'Transaction not found'}), 404
+        return jsonify(body)
+
+    @app.route('/_fake/faults', methods=['POST'])
+    def fake_faults():
+        values = request.get_json(silent=True) or {}
+        endpoint = values.pop('endpoint', None)
+        targets = [faults[endpoint]] if endpoint in faults else list(faults.values())
+        for injector in targets:
+            injector.configure(**values)
+        return jsonify({name: injector.stats() for name, injector in faults.items()})
+
+    @app.route('/_fake/stats')
+    def fake_stats():
+        return jsonify({
+            'midtrans': fake.stats(),
+            'faults': {name: injector.stats() for name, injector in faults.items()},
+            'webhooks': fake.emitter.stats() if fake.emitter else None,
+        })
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Midtrans stand-in for offline testing and benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--server-key', default=os.environ.get('MIDTRANS_SERVER_KEY'),
+                        help="server key untuk auth & signature (default dari konfigurasi app)")
+    parser.add_argument('--latency', type=float, default=0, help="latency dasar tiap panggilan API (ms)")
+    parser.add_argument('--jitter', type=float, default=0, help="tambahan latency acak maksimal (ms)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="peluang jawaban 5xx")
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help="peluang jawaban ditahan --timeout-seconds")
+    parser.add_argument('--timeout-seconds', type=float, default=30, help="lama jawaban yang ditahan (detik)")
+    parser.add_argument('--notify-url', default='http://localhost:5000/payment/notification')
+    parser.add_argument('--no-webhooks', action='store_true', help="jangan kirim notifikasi ke app")
+    parser.add_argument('--settle-after', type=float, default=3, help="detik sebelum transaksi pending diputuskan (-1 = manual)")
+    parser.add_argument('--settle-ratio', type=float, default=0.8, help="peluang settlement (sisanya expire)")
+    parser.add_argument('--webhook-rate', type=float, default=20, help="notifikasi per detik maksimal (0 = tanpa batas)")
+    parser.add_argument('--webhook-workers', type=int, default=4)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.0, help="peluang notifikasi dikirim dua kali")
+    parser.add_argument('--verbose', action='store_true', help="tampilkan log tiap request")
+    args = parser.parse_args()
+
+    if args.server_key is None:
+        from app import Config
+        args.server_key = Config.MIDTRANS_SERVER_KEY
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    fault_config = dict(latency_ms=args.latency, jitter_ms=args.jitter, error_rate=args.error_rate,
+                        timeout_rate=args.timeout_rate, timeout_seconds=args.timeout_seconds)
+    faults = {'snap': FaultInjector(**fault_config), 'status': FaultInjector(**fault_config)}
+    emitter = None if args.no_webhooks else WebhookEmitter(
+        args.notify_url, rate=args.webhook_rate, workers=args.webhook_workers,
+        duplicate_ratio=args.duplicate_ratio)
+    fake = FakeMidtrans(args.server_key, emitter, settle_after=args.settle_after, settle_ratio=args.settle_ratio)
+
+    base_url = f"http://{args.host}:{args.port}"
+    print("=" * 60)
+    print("FAKE MIDTRANS")
+    print("=" * 60)
+    print(f"MIDTRANS_API_URL={base_url}/snap/v1/transactions")
+    print(f"MIDTRANS_API_BASE_URL={base_url}")
+    print(f"MIDTRANS_SNAP_JS_URL={base_url}/snap/snap.js")
+    print(f"Webhook: {'nonaktif' if emitter is None else args.notify_url}")
+    print("=" * 60)
+    sys.stdout.flush()
+
+    create_app(fake, faults).run(host=args.host, port=args.port, threaded=True)
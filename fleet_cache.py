@@ -0,0 +1,257 @@
+"""
+FLEET SNAPSHOT
+Salinan tabel mobil di memori dengan index sekunder untuk melayani katalog tanpa query MySQL
+"""
+
+import time
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from search_index import TrigramIndex
+from suggest import PrefixTrie
+
+logger = logging.getLogger(__name__)
+
+CAR_FIELDS = ('id', 'merk', 'model', 'tahun', 'plat_nomor', 'tipe', 'transmisi', 'kapasitas',
+              'harga_per_hari', 'deskripsi', 'gambar', 'status', 'created_at', 'updated_at')
+
+
+class CarRecord:
+    """Satu baris mobil; mendukung akses atribut dan akses dict seperti row cursor"""
+
+    __slots__ = CAR_FIELDS
+
+    def __init__(self, row):
+        for field in CAR_FIELDS:
+            setattr(self, field, row.get(field))
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in CAR_FIELDS}
+
+
+def _to_decimal(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _to_int(value):
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class FleetSnapshot:
+    """In-process indexed copy of the mobil table"""
+
+    def __init__(self, loader, max_age=300):
+        # loader(car_id=None) -> list of row dicts, or None when the database is unavailable
+        self._loader = loader
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self._cars = {}
+        self._by_status = defaultdict(set)
+        self._by_tipe = defaultdict(set)
+        self._by_transmisi = defaultdict(set)
+        self._by_harga = []      # sorted (harga_per_hari, id)
+        self._by_kapasitas = []  # sorted (kapasitas, id)
+        self._text = TrigramIndex()  # merk, model, plat_nomor
+        self._suggest = PrefixTrie(whole_kinds=('plate',))
+
+    # ----------------------------------------
+    # Loading & incremental refresh
+    # ----------------------------------------
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    def ensure_loaded(self):
+        """Load (or reload after max_age) the full snapshot; False if the database is unavailable"""
+        if self._is_fresh():
+            return True
+        with self._load_lock:
+            if self._is_fresh():
+                return True
+            rows = self._loader()
+            if rows is None:
+                return self._loaded_at is not None
+            with self._lock:
+                self._reset()
+                for row in rows:
+                    self._add(CarRecord(row))
+                self._loaded_at = time.monotonic()
+            logger.info(f"Fleet snapshot loaded: {len(rows)} cars")
+        return True
+
+    def invalidate(self):
+        """Force a full reload on the next query"""
+        with self._lock:
+            self._loaded_at = None
+
+    def refresh_car(self, car_id):
+        """Re-read one car after a write to mobil"""
+        if self._loaded_at is None:
+            return
+        rows = self._loader(car_id)
+        if rows is None:
+            self.invalidate()
+            return
+        with self._lock:
+            self._remove(car_id)
+            for row in rows:
+                self._add(CarRecord(row))
+
+    def remove_car(self, car_id):
+        with self._lock:
+            self._remove(car_id)
+
+    def _add(self, car):
+        self._cars[car.id] = car
+        self._by_status[car.status].add(car.id)
+        self._by_tipe[car.tipe].add(car.id)
+        self._by_transmisi[car.transmisi].add(car.id)
+        insort(self._by_harga, (car.harga_per_hari, car.id))
+        insort(self._by_kapasitas, (car.kapasitas, car.id))
+        self._text.add(car.id, car.merk, car.model, car.plat_nomor)
+        for text, kind in self._suggestion_items(car):
+            self._suggest.add(text, kind)
+
+    @staticmethod
+    def _suggestion_items(car):
+        items = [(car.merk, 'brand'), (car.plat_nomor, 'plate')]
+        if car.merk and car.model:
+            items.append((f"{car.merk} {car.model}", 'model'))
+        return [(text, kind) for text, kind in items if text]
+
+    def _remove(self, car_id):
+        car = self._cars.pop(car_id, None)
+        if car is None:
+            return
+        self._by_status[car.status].discard(car_id)
+        self._by_tipe[car.tipe].discard(car_id)
+        self._by_transmisi[car.transmisi].discard(car_id)
+        self._text.remove(car_id)
+        for text, kind in self._suggestion_items(car):
+            self._suggest.remove(text, kind)
+        for index, key in ((self._by_harga, (car.harga_per_hari, car_id)),
+                           (self._by_kapasitas, (car.kapasitas, car_id))):
+            pos = bisect_left(index, key)
+            if pos < len(index) and index[pos] == key:
+                del index[pos]
+
+    # ----------------------------------------
+    # Queries
+    # ----------------------------------------
+
+    def get(self, car_id):
+        return self._cars.get(car_id)
+
+    def search(self, status='tersedia', tipe=None, transmisi=None, min_harga=None, max_harga=None,
+               min_kapasitas=None, search=None, car_ids=None, offset=0, limit=None):
+        """Filter, count and paginate in memory, ordered by harga_per_hari ascending.
+
+        With a search term, cars are ranked by relevance first (see TrigramIndex),
+        then by price. status may be one status or a tuple of statuses. Returns
+        (cars, total) or None if the snapshot could not be loaded.
+        """
+        if not self.ensure_loaded():
+            return None
+
+        statuses = (status,) if isinstance(status, str) else status
+        with self._lock:
+            candidates = set().union(*(self._by_status.get(s, set()) for s in statuses))
+            if tipe and tipe != 'all':
+                candidates = candidates & self._by_tipe.get(tipe, set())
+            if transmisi and transmisi != 'all':
+                candidates = candidates & self._by_transmisi.get(transmisi, set())
+            if car_ids is not None:
+                candidates = candidates & car_ids
+            scores = None
+            if search:
+                scores = self._text.match(search, candidates)
+                candidates = set(scores)
+
+            min_kapasitas = _to_int(min_kapasitas)
+            if min_kapasitas is not None:
+                start = bisect_left(self._by_kapasitas, (min_kapasitas,))
+                candidates = candidates & {car_id for _, car_id in self._by_kapasitas[start:]}
+
+            # Rentang harga lewat bisect; hasilnya sudah terurut berdasarkan harga
+            low = _to_decimal(min_harga)
+            high = _to_decimal(max_harga)
+            lo = bisect_left(self._by_harga, (low,)) if low is not None else 0
+            hi = bisect_right(self._by_harga, (high, float('inf'))) if high is not None else len(self._by_harga)
+
+            if len(candidates) < hi - lo:
+                ordered = sorted(
+                    (self._cars[car_id].harga_per_hari, car_id) for car_id in candidates
+                    if (low is None or self._cars[car_id].harga_per_hari >= low)
+                    and (high is None or self._cars[car_id].harga_per_hari <= high)
+                )
+            else:
+                ordered = [entry for entry in self._by_harga[lo:hi] if entry[1] in candidates]
+
+            if scores is not None:
+                # sorted() stabil: urutan harga dipertahankan di antara skor yang sama
+                ordered = sorted(ordered, key=lambda entry: -scores[entry[1]])
+            cars = [self._cars[car_id] for _, car_id in ordered]
+
+        total = len(cars)
+        offset = max(offset, 0)
+        page = cars[offset:offset + limit] if limit is not None else cars[offset:]
+        return page, total
+
+    def match_ids(self, search, statuses=None):
+        """Ids of cars matching a search term, best match first; None if the snapshot is unavailable"""
+        if not self.ensure_loaded():
+            return None
+        with self._lock:
+            candidates = None
+            if statuses is not None:
+                candidates = set().union(*(self._by_status.get(status, set()) for status in statuses))
+            return self._text.search(search, candidates)
+
+    def suggest(self, prefix, limit=10):
+        """Typeahead completions (brand, brand + model, plate) for prefix"""
+        if not self.ensure_loaded():
+            return []
+        with self._lock:
+            return self._suggest.suggest(prefix, limit)
+
+    def car_ids(self, statuses):
+        """Ids of cars whose status is one of statuses"""
+        if not self.ensure_loaded():
+            return set()
+        with self._lock:
+            return set().union(*(self._by_status.get(status, set()) for status in statuses))
+
+    def car_types(self, statuses=('tersedia',)):
+        """Distinct tipe values among cars whose status is one of statuses"""
+        if not self.ensure_loaded():
+            return []
+        with self._lock:
+            ids = set().union(*(self._by_status.get(status, set()) for status in statuses))
+            return [{'tipe': tipe} for tipe in sorted(t for t, members in self._by_tipe.items() if members & ids)]
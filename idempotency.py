@@ -0,0 +1,53 @@
+"""
+EVENT DEDUP
+Cache LRU untuk event Midtrans yang sudah diterapkan, di depan unique key midtrans_events
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def event_key(order_id, transaction_id, transaction_status):
+    """Dedup key of one Midtrans status transition"""
+    return (str(order_id), str(transaction_id or ''), str(transaction_status or ''))
+
+
+class EventDedup:
+    """Bounded LRU set of event keys known to be committed.
+
+    Only a fast path: a miss falls through to the UNIQUE constraint in the
+    database, which stays the source of truth across processes and restarts.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def seen(self, key):
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self._hits += 1
+                return True
+            self._misses += 1
+            return False
+
+    def remember(self, key):
+        """Record a key after its transaction has committed"""
+        with self._lock:
+            self._keys[key] = True
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._keys),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
@@ -0,0 +1,214 @@
+"""
+IMAGE PIPELINE
+Normalisasi gambar upload (orientasi EXIF, sRGB, tanpa metadata) dan varian JPEG/WebP per lebar untuk srcset
+
+Contoh (buat varian untuk gambar yang sudah ada sebelum pipeline ini):
+    python image_pipeline.py static/uploads/cars
+    python image_pipeline.py static/uploads/profiles --widths 96 256
+
+Varian disimpan di samping file utama: <nama>_w<lebar>.jpg dan <nama>_w<lebar>.webp.
+Lebar yang lebih besar dari gambar asli tidak dibuat, kecuali satu lebar terkecil
+di atasnya (disimpan pada ukuran asli) agar srcset selalu punya varian teratas.
+"""
+
+import io
+import os
+import re
+import sys
+import logging
+import argparse
+import threading
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+VARIANT_RE = re.compile(r'_w\d+\.(jpg|webp)$')
+
+
+class ImageRejected(ValueError):
+    """Upload tidak bisa dibaca sebagai gambar atau resolusinya terlalu besar"""
+
+
+def variant_name(filename, width, fmt):
+    """Variant file name for a stored image, e.g. abc_mobil.jpg -> abc_mobil_w640.webp"""
+    return f"{os.path.splitext(filename)[0]}_w{width}.{fmt}"
+
+
+def srcset(filename, widths, fmt, url):
+    """srcset value for the given variant widths; url(name) builds each variant URL"""
+    return ", ".join(f"{url(variant_name(filename, width, fmt))} {width}w" for width in widths)
+
+
+def target_widths(actual, widths):
+    """Widths to generate for an image `actual` pixels wide (never upscaled)"""
+    widths = sorted(widths)
+    targets = [width for width in widths if width < actual]
+    larger = [width for width in widths if width >= actual]
+    if larger:
+        targets.append(larger[0])
+    return targets
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+class ImagePipeline:
+    """Normalise an upload once and write width-bounded JPEG + WebP variants next to it"""
+
+    def __init__(self, max_width=1600, jpeg_quality=82, webp_quality=80, max_pixels=40_000_000,
+                 background=(255, 255, 255), cache_size=10000):
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self.max_pixels = max_pixels
+        self.background = background
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._variants = {}  # path file utama -> lebar varian yang ada
+        self._processed = 0
+        self._rejected = 0
+
+    def open(self, source):
+        """Decode an upload (path or file object), upright and converted to sRGB"""
+        try:
+            image = Image.open(source)
+            if image.width * image.height > self.max_pixels:
+                raise ImageRejected(f"resolusi {image.width}x{image.height} melebihi batas")
+            image.load()  # GIF animasi: hanya frame pertama
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            with self._lock:
+                self._rejected += 1
+            raise ImageRejected(str(e)) from e
+        except ImageRejected:
+            with self._lock:
+                self._rejected += 1
+            raise
+
+        # Putar sesuai tag Orientation; hasilnya tidak lagi membawa tag tersebut
+        image = ImageOps.exif_transpose(image)
+        icc = image.info.get('icc_profile')
+        if icc:
+            image = self._to_srgb(image, icc)
+        return image
+
+    def _to_srgb(self, image, icc):
+        # Profil warna dibuang bersama metadata lain, jadi piksel dikonversi ke sRGB dulu
+        try:
+            from PIL import ImageCms
+            source = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+            mode = 'RGBA' if has_alpha(image) else 'RGB'
+            return ImageCms.profileToProfile(image.convert(mode), source, ImageCms.createProfile('sRGB'),
+                                             outputMode=mode)
+        except Exception as e:
+            logger.debug(f"ICC conversion skipped: {e}")
+            return image
+
+    def _flatten(self, image):
+        """RGB copy for JPEG; transparent areas become the background colour"""
+        if has_alpha(image):
+            rgba = image.convert('RGBA')
+            flat = Image.new('RGB', rgba.size, self.background)
+            flat.paste(rgba, mask=rgba.getchannel('A'))
+            return flat
+        return image.convert('RGB')
+
+    @staticmethod
+    def _resize(image, width):
+        if image.width <= width:
+            return image
+        height = max(1, round(image.height * width / image.width))
+        return image.resize((width, height), Image.LANCZOS)
+
+    def _save_jpeg(self, image, path):
+        # Tanpa exif=/icc_profile= Pillow tidak menulis metadata apa pun
+        image.save(path, 'JPEG', quality=self.jpeg_quality, optimize=True, progressive=True)
+
+    def write_variants(self, image, folder, filename, widths):
+        """Write <name>_w<width>.jpg/.webp for `image`; returns the widths written"""
+        flat = self._flatten(image)
+        webp_source = image.convert('RGBA') if has_alpha(image) else flat
+        written = target_widths(min(image.width, self.max_width), widths)
+        for width in written:
+            self._save_jpeg(self._resize(flat, width), os.path.join(folder, variant_name(filename, width, 'jpg')))
+            self._resize(webp_source, width).save(os.path.join(folder, variant_name(filename, width, 'webp')),
+                                                  'WEBP', quality=self.webp_quality, method=4)
+        self._remember(os.path.join(folder, filename), tuple(written))
+        return written
+
+    def save(self, source, folder, filename, widths):
+        """Store an upload as a normalised JPEG plus its variants; returns the stored file name.
+
+        The stored file is capped at max_width and is what existing templates keep
+        linking to; the variants are only referenced through srcset.
+        """
+        image = self.open(source)
+        stored = f"{os.path.splitext(filename)[0]}.jpg"
+        self._save_jpeg(self._resize(self._flatten(image), self.max_width), os.path.join(folder, stored))
+        self.write_variants(image, folder, stored, widths)
+        with self._lock:
+            self._processed += 1
+        return stored
+
+    def _remember(self, path, widths):
+        with self._lock:
+            if len(self._variants) >= self.cache_size:
+                self._variants.clear()
+            self._variants[path] = widths
+
+    def variants(self, folder, filename, widths):
+        """Widths whose variants exist for a stored image (cached per file).
+
+        An empty result is not cached, so variants written later by a backfill
+        run in another process show up without restarting the app.
+        """
+        path = os.path.join(folder, filename)
+        with self._lock:
+            found = self._variants.get(path)
+        if found is None:
+            found = tuple(width for width in sorted(widths)
+                          if os.path.exists(os.path.join(folder, variant_name(filename, width, 'jpg'))))
+            if found:
+                self._remember(path, found)
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {
+                'processed': self._processed,
+                'rejected': self._rejected,
+                'cached_files': len(self._variants),
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate JPEG/WebP width variants for existing uploads")
+    parser.add_argument('folder', help="folder upload, mis. static/uploads/cars")
+    parser.add_argument('--widths', type=int, nargs='+', default=[320, 640, 1024])
+    parser.add_argument('--max-width', type=int, default=1600)
+    parser.add_argument('--force', action='store_true', help="buat ulang walau varian sudah ada")
+    args = parser.parse_args()
+
+    pipeline = ImagePipeline(max_width=args.max_width)
+    done = skipped = failed = 0
+    print("=" * 60)
+    print(f"BACKFILL VARIAN GAMBAR: {args.folder}")
+    print("=" * 60)
+    for name in sorted(os.listdir(args.folder)):
+        path = os.path.join(args.folder, name)
+        if not os.path.isfile(path) or VARIANT_RE.search(name):
+            continue
+        if not args.force and pipeline.variants(args.folder, name, args.widths):
+            skipped += 1
+            continue
+        try:
+            widths = pipeline.write_variants(pipeline.open(path), args.folder, name, args.widths)
+            done += 1
+            print(f"✅ {name}: {', '.join(map(str, widths))}")
+        except ImageRejected as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print("-" * 60)
+    print(f"Dibuat: {done}  Dilewati: {skipped}  Gagal: {failed}")
+    sys.exit(1 if failed else 0)
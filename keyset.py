@@ -0,0 +1,131 @@
+"""
+KEYSET PAGINATION
+Paginasi berbasis cursor (nilai kolom urut dari baris terakhir) dan cache jumlah total untuk daftar panjang
+"""
+
+import json
+import time
+import base64
+import threading
+from datetime import datetime, date
+from collections import OrderedDict
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    # Hanya tipe yang bisa dihasilkan _encode_value; bool/null/list/objek lain berarti cursor rusak
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        raise ValueError("unknown cursor value")
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError("unsupported cursor value")
+    return value
+
+
+def encode_cursor(values):
+    """Opaque URL-safe cursor for the sort-key values of the last row"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Sort-key values from a cursor, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        decoded = json.loads(raw)
+        if not isinstance(decoded, list):
+            return None
+        values = [_decode_value(v) for v in decoded]
+    except (ValueError, TypeError):
+        return None
+    if len(values) != size:
+        return None
+    return values
+
+
+def seek_clause(columns, values):
+    """WHERE fragment selecting rows after `values` in ORDER BY columns DESC.
+
+    Ditulis sebagai OR bertingkat, bukan (a, b) < (x, y), agar MySQL tetap
+    memakai range scan pada index (a, b).
+    """
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        parts = [f"{prev} = %s" for prev in columns[:i]] + [f"{column} < %s"]
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+def split_page(rows, limit):
+    """Rows fetched with LIMIT limit + 1 -> (page rows, has_more)"""
+    return rows[:limit], len(rows) > limit
+
+
+def next_cursor(rows, keys, has_more):
+    """Cursor for the page after `rows` (None on the last page)"""
+    if not has_more or not rows:
+        return None
+    return encode_cursor([rows[-1][key] for key in keys])
+
+
+class CountCache:
+    """TTL cache of COUNT(*) results, keyed by (scope, query, params).
+
+    Total di halaman daftar cukup perkiraan: nilai boleh basi sampai `ttl`
+    detik, atau dibuang lebih awal lewat invalidate(scope).
+    """
+
+    def __init__(self, ttl=30, max_entries=2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (total, stored_at)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, scope, query, params, compute):
+        key = (scope, query, tuple(params))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        total = compute()
+        with self._lock:
+            self._entries[key] = (total, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def invalidate(self, scope):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == scope]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+            }
@@ -0,0 +1,393 @@
+"""
+LOAD TEST
+Jalankan alur pelanggan & pembayaran secara paralel, laporkan throughput dan p50/p95/p99 per endpoint,
+simpan hasil sebagai baseline JSON dan gagal bila ada regresi
+
+Contoh:
+    python loadtest.py --users 20 --duration 60                          # in-process (Flask test client)
+    python loadtest.py --url http://localhost:5000 --users 50 --duration 120
+    python loadtest.py --duration 60 --save baselines/main.json          # simpan baseline
+    python loadtest.py --duration 60 --baseline baselines/main.json --max-regression 15
+
+Alur tiap pengunjung virtual (sesi baru tiap iterasi):
+    index -> catalog (filter acak) -> car_detail -> login -> booking (GET + POST)
+    -> payment (Snap token) -> payment_notification (settlement bertanda tangan)
+
+Prasyarat: database lokal berisi data seed dengan akun pelanggan
+--email-pattern / --password (lihat seed_data.py), dan Midtrans diarahkan ke
+stand-in lokal fake_midtrans.py agar booking & payment tidak menyentuh sandbox:
+    python fake_midtrans.py --notify-url http://localhost:5000/payment/notification
+    python loadtest.py --midtrans-url http://localhost:5055 ...        # in-process
+Untuk mode --url, jalankan app dengan MIDTRANS_API_URL / MIDTRANS_API_BASE_URL
+yang menunjuk ke stand-in (lihat docstring fake_midtrans.py).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+
+import requests
+
+STEPS = ('index', 'catalog', 'car_detail', 'login', 'booking', 'payment', 'payment_notification')
+
+CAR_LINK_RE = re.compile(r'/car/(\d+)')
+ORDER_REDIRECT_RE = re.compile(r'/payment/([^/?#]+)$')
+TOTAL_RE = re.compile(r'Total Harga:</strong><br>Rp ([\d,.]+)')
+
+CATALOG_FILTERS = (
+    {},
+    {'tipe': 'suv'},
+    {'tipe': 'mpv', 'transmisi': 'automatic'},
+    {'transmisi': 'manual', 'max_harga': '500000'},
+    {'min_kapasitas': '7'},
+    {'min_harga': '300000', 'max_harga': '1000000'},
+    {'search': 'toyota'},
+    {'search': 'avanza', 'transmisi': 'automatic'},
+)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+# ============================================
+# TRANSPORT
+# ============================================
+
+class HttpTransport:
+    """One cookie session against a running instance"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, method, path, data=None, json_body=None):
+        response = self.session.request(method, self.base_url + path, data=data, json=json_body,
+                                        timeout=self.timeout, allow_redirects=False)
+        return response.status_code, response.headers.get('Location', ''), response.text
+
+
+class InProcessTransport:
+    """One Flask test client (own cookie jar) against the imported app"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None, json_body=None):
+        response = self.client.open(path, method=method, data=data, json=json_body, follow_redirects=False)
+        return response.status_code, response.headers.get('Location', ''), response.get_data(as_text=True)
+
+
+# ============================================
+# RECORDER
+# ============================================
+
+class Recorder:
+    """Latency samples and error counts per step (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {step: [] for step in STEPS}
+        self.errors = {step: 0 for step in STEPS}
+        self.booking_conflicts = 0
+        self.failures = {}  # pesan StepFailed -> jumlah
+        self.visits = 0
+        self.recording = False
+
+    def timed(self, step, transport, method, path, data=None, json_body=None):
+        started = time.perf_counter()
+        try:
+            status, location, body = transport.request(method, path, data=data, json_body=json_body)
+        except requests.exceptions.RequestException as e:
+            self.add(step, time.perf_counter() - started, ok=False)
+            raise StepFailed(f"{step}: {e}")
+        ok = status < 400
+        self.add(step, time.perf_counter() - started, ok)
+        if not ok:
+            raise StepFailed(f"{step}: HTTP {status}")
+        return status, location, body
+
+    def add(self, step, seconds, ok=True):
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def visited(self, failure=None):
+        if not self.recording:
+            return
+        with self._lock:
+            self.visits += 1
+            if failure:
+                self.failures[failure] = self.failures.get(failure, 0) + 1
+
+    def conflict(self):
+        if self.recording:
+            with self._lock:
+                self.booking_conflicts += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for step in STEPS:
+            values = self.samples[step]
+            if not values:
+                continue
+            endpoints[step] = {
+                'requests': len(values),
+                'errors': self.errors[step],
+                'error_rate': round(self.errors[step] / len(values), 4),
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'mean_ms': round(sum(values) * 1000 / len(values), 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'max_ms': round(max(values) * 1000, 2),
+            }
+        return endpoints
+
+
+class StepFailed(Exception):
+    """A step returned an error; the visit is abandoned"""
+
+
+# ============================================
+# VIRTUAL VISITOR
+# ============================================
+
+def notification_payload(order_id, gross_amount, server_key):
+    """Settlement notification signed like Midtrans does"""
+    status_code = '200'
+    signature = hashlib.sha512(f"{order_id}{status_code}{gross_amount}{server_key}".encode()).hexdigest()
+    return {
+        'order_id': order_id,
+        'status_code': status_code,
+        'gross_amount': gross_amount,
+        'signature_key': signature,
+        'transaction_status': 'settlement',
+        'transaction_id': f"LOADTEST-{order_id}",
+        'payment_type': 'qris',
+        'fraud_status': 'accept',
+        'transaction_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'settlement_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def visit(transport, recorder, rng, args):
+    """One visitor session through the customer and payment flow"""
+    def think():
+        if args.think:
+            time.sleep(rng.uniform(0, args.think / 1000.0))
+
+    recorder.timed('index', transport, 'GET', '/')
+    think()
+
+    query = urlencode(rng.choice(CATALOG_FILTERS))
+    _, _, body = recorder.timed('catalog', transport, 'GET', '/catalog' + (f'?{query}' if query else ''))
+    car_ids = CAR_LINK_RE.findall(body)
+    if not car_ids:
+        # Filter tidak menemukan mobil; ambil dari katalog tanpa filter
+        _, _, body = recorder.timed('catalog', transport, 'GET', '/catalog')
+        car_ids = CAR_LINK_RE.findall(body)
+        if not car_ids:
+            raise StepFailed("catalog: no cars (database belum di-seed?)")
+    car_id = rng.choice(car_ids)
+    think()
+
+    recorder.timed('car_detail', transport, 'GET', f'/car/{car_id}')
+    think()
+
+    email = args.email_pattern.format(n=rng.randint(1, args.accounts))
+    status, location, _ = recorder.timed('login', transport, 'POST', '/login',
+                                         data={'email': email, 'password': args.password})
+    # Login berhasil selalu redirect ke dashboard; gagal = form dirender ulang atau kembali ke /login
+    if status != 302 or '/login' in location:
+        raise StepFailed(f"login: rejected for {email}")
+    think()
+
+    recorder.timed('booking', transport, 'GET', f'/booking/{car_id}')
+    # Tanggal acak jauh ke depan agar pengunjung jarang berebut mobil yang sama
+    start = date.today() + timedelta(days=rng.randint(30, 30 + args.date_spread))
+    end = start + timedelta(days=rng.randint(0, 3))
+    _, location, _ = recorder.timed('booking', transport, 'POST', f'/booking/{car_id}', data={
+        'tanggal_mulai': start.isoformat(),
+        'tanggal_selesai': end.isoformat(),
+        'lokasi_penjemputan': 'Load test',
+        'catatan': '',
+    })
+    match = ORDER_REDIRECT_RE.search(location)
+    if not match:
+        recorder.conflict()
+        return
+    order_id = match.group(1)
+    think()
+
+    _, _, body = recorder.timed('payment', transport, 'GET', f'/payment/{order_id}')
+    total = TOTAL_RE.search(body)
+    gross_amount = f"{total.group(1).replace(',', '').replace('.', '')}.00" if total else '0.00'
+
+    recorder.timed('payment_notification', transport, 'POST', '/payment/notification',
+                   json_body=notification_payload(order_id, gross_amount, args.server_key))
+
+
+def worker(index, make_transport, recorder, deadline, args):
+    rng = random.Random(args.seed + index)
+    while time.monotonic() < deadline:
+        try:
+            visit(make_transport(), recorder, rng, args)
+        except StepFailed as e:
+            recorder.visited(str(e))
+        else:
+            recorder.visited()
+
+
+# ============================================
+# BASELINE
+# ============================================
+
+def compare(result, baseline, max_regression):
+    """Regressions vs baseline: p95 up or throughput down by more than max_regression percent"""
+    regressions = []
+    limit = max_regression / 100.0
+    for step, base in baseline.get('endpoints', {}).items():
+        current = result['endpoints'].get(step)
+        if current is None:
+            regressions.append(f"{step}: tidak ada request (baseline {base['requests']})")
+            continue
+        if base['p95_ms'] and current['p95_ms'] > base['p95_ms'] * (1 + limit):
+            regressions.append(f"{step}: p95 {current['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if base['throughput_rps'] and current['throughput_rps'] < base['throughput_rps'] * (1 - limit):
+            regressions.append(f"{step}: throughput {current['throughput_rps']} rps < baseline "
+                               f"{base['throughput_rps']} rps")
+    return regressions
+
+
+def print_table(endpoints):
+    print(f"{'endpoint':<22}{'req':>7}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step in STEPS:
+        row = endpoints.get(step)
+        if row:
+            print(f"{step:<22}{row['requests']:>7}{row['errors']:>6}{row['throughput_rps']:>9.1f}"
+                  f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+
+
+def run(args):
+    if args.url:
+        make_transport = lambda: HttpTransport(args.url, args.timeout)
+        target = args.url
+    else:
+        from app import app, midtrans
+        if args.midtrans_url:
+            midtrans.api_base_url = args.midtrans_url.rstrip('/')
+            midtrans.snap_url = f"{args.midtrans_url.rstrip('/')}/snap/v1/transactions"
+        make_transport = lambda: InProcessTransport(app)
+        target = 'in-process'
+    if args.server_key is None:
+        from app import Config
+        args.server_key = Config.MIDTRANS_SERVER_KEY
+
+    print("=" * 60)
+    print("LOAD TEST")
+    print("=" * 60)
+    print(f"Target   : {target}")
+    print(f"Users    : {args.users} virtual")
+    print(f"Durasi   : {args.duration}s (+{args.warmup}s warmup)")
+    print("-" * 60)
+
+    recorder = Recorder()
+    deadline = time.monotonic() + args.warmup + args.duration
+    threads = [threading.Thread(target=worker, args=(i, make_transport, recorder, deadline, args),
+                                daemon=True)
+               for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.monotonic()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'target': target,
+            'users': args.users,
+            'duration_s': round(elapsed, 2),
+            'think_ms': args.think,
+            'seed': args.seed,
+        },
+        'endpoints': recorder.summary(elapsed),
+        'visits': recorder.visits,
+        'booking_conflicts': recorder.booking_conflicts,
+        'failures': recorder.failures,
+    }
+    print_table(result['endpoints'])
+    print(f"Kunjungan: {recorder.visits}, gagal: {sum(recorder.failures.values())}, "
+          f"booking bentrok tanggal: {recorder.booking_conflicts}")
+    for message, count in sorted(recorder.failures.items(), key=lambda item: -item[1])[:10]:
+        print(f"   {count:>5}x {message}")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the customer booking and payment flow")
+    parser.add_argument('--url', help="base URL instance yang berjalan; kosong = in-process test client")
+    parser.add_argument('--users', type=int, default=10, help="jumlah pengunjung virtual paralel")
+    parser.add_argument('--duration', type=float, default=30, help="detik pengukuran")
+    parser.add_argument('--warmup', type=float, default=5, help="detik awal yang tidak diukur")
+    parser.add_argument('--think', type=int, default=0, help="jeda acak maksimal antar langkah (ms)")
+    parser.add_argument('--timeout', type=float, default=30, help="timeout HTTP (detik, mode --url)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--email-pattern', default='seed{n}@example.com', help="email akun pelanggan, {n} = 1..accounts")
+    parser.add_argument('--accounts', type=int, default=1000, help="jumlah akun pelanggan seed yang dipakai")
+    parser.add_argument('--password', default='password123', help="password akun seed")
+    parser.add_argument('--date-spread', type=int, default=365, help="rentang hari acak tanggal booking")
+    parser.add_argument('--server-key', default=os.environ.get('MIDTRANS_SERVER_KEY'),
+                        help="server key untuk signature notifikasi (default dari konfigurasi app)")
+    parser.add_argument('--midtrans-url', help="base URL fake_midtrans.py (mode in-process)")
+    parser.add_argument('--save', help="simpan hasil ke file JSON (baseline)")
+    parser.add_argument('--baseline', help="bandingkan dengan baseline JSON")
+    parser.add_argument('--max-regression', type=float, default=20, help="persen regresi p95/throughput yang ditoleransi")
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help="rasio error maksimal per endpoint")
+    args = parser.parse_args()
+
+    result = run(args)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Hasil disimpan ke {args.save}")
+
+    problems = [f"{step}: error rate {row['error_rate']:.2%}" for step, row in result['endpoints'].items()
+                if row['error_rate'] > args.max_error_rate]
+    failed_visits = sum(result['failures'].values())
+    if not result['visits'] or failed_visits > result['visits'] * args.max_error_rate:
+        problems.append(f"{failed_visits} dari {result['visits']} kunjungan gagal")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            problems.extend(compare(result, json.load(f), args.max_regression))
+
+    print("=" * 60)
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        sys.exit(1)
+    print("✅ Tidak ada regresi" if args.baseline else "✅ Load test selesai")
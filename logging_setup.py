@@ -0,0 +1,140 @@
+"""
+LOGGING SETUP
+Pipeline logging non-blocking: thread request hanya memasukkan record ke antrean, satu thread menulis ke file berotasi
+"""
+
+import os
+import sys
+import gzip
+import queue
+import atexit
+import shutil
+import logging
+import itertools
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def parse_mapping(value):
+    """'a=1,b=2' -> {'a': '1', 'b': '2'} (entri kosong/tanpa '=' diabaikan)"""
+    mapping = {}
+    for item in (value or '').split(','):
+        key, sep, val = item.rpartition('=')
+        if sep and key.strip():
+            mapping[key.strip()] = val.strip()
+    return mapping
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only 1 of every N records whose message starts with a configured prefix"""
+
+    def __init__(self, rules):
+        super().__init__()
+        # prefix pesan -> (N, penghitung)
+        self._rules = {prefix: (rate, itertools.count()) for prefix, rate in rules.items() if rate > 1}
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not isinstance(record.msg, str):
+            return True
+        for prefix, (rate, counter) in self._rules.items():
+            if record.msg.startswith(prefix):
+                if next(counter) % rate == 0:
+                    return True
+                self.sampled_out += 1
+                return False
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: when the queue is full the record is dropped and counted"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.queued = 0
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            self.queued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def file_handler(path, max_bytes=10 * 1024 * 1024, rotate_when='', backup_count=10, compress=True):
+    """Rotating file handler: by time if rotate_when is set (e.g. 'midnight'), else by size"""
+    if rotate_when:
+        handler = TimedRotatingFileHandler(path, when=rotate_when, backupCount=backup_count,
+                                           encoding='utf-8', delay=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                      encoding='utf-8', delay=True)
+    if compress:
+        handler.namer = lambda name: name + '.gz'
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+class LoggingPipeline:
+    """Root QueueHandler + QueueListener thread feeding the file and console handlers"""
+
+    def __init__(self, handler, listener, sampler, log_queue):
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+        self.queue = log_queue
+
+    def stop(self):
+        """Flush the queue and stop the writer thread"""
+        self.listener.stop()
+
+    def stats(self):
+        return {
+            'queued': self.handler.queued,
+            'dropped': self.handler.dropped,
+            'sampled_out': self.sampler.sampled_out,
+            'backlog': self.queue.qsize(),
+        }
+
+
+def setup_logging(log_file='app.log', level='INFO', levels=None, sample=None, max_bytes=10 * 1024 * 1024,
+                  rotate_when='', backup_count=10, compress=True, queue_size=10000, console=True):
+    """Replace the root handlers with the queue pipeline; returns the LoggingPipeline.
+
+    levels: {logger name: level} (mis. {'mysql.connector': 'WARNING'})
+    sample: {prefix pesan: N} untuk baris INFO bervolume tinggi
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    targets = [file_handler(log_file, max_bytes, rotate_when, backup_count, compress)]
+    if console:
+        targets.append(logging.StreamHandler(sys.stdout))
+    for target in targets:
+        target.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    sampler = SamplingFilter({prefix: int(rate) for prefix, rate in (sample or {}).items()})
+    handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+        old.close()
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    for name, logger_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level.upper())
+
+    listener = QueueListener(log_queue, *targets, respect_handler_level=True)
+    listener.start()
+    pipeline = LoggingPipeline(handler, listener, sampler, log_queue)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,226 @@
+"""
+MIDTRANS CLIENT
+Satu klien HTTP untuk semua panggilan Midtrans: koneksi keep-alive, timeout ketat, retry dengan jitter, circuit breaker
+"""
+
+import time
+import base64
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class MidtransError(requests.exceptions.RequestException):
+    """Midtrans answered with an unexpected HTTP status"""
+
+    def __init__(self, status_code, body=None):
+        super().__init__(f"Midtrans API error: {status_code}")
+        self.status_code = status_code
+        self.body = body
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """Midtrans dianggap sedang bermasalah; panggilan ditolak tanpa menunggu timeout"""
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe after reset_timeout"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """True if a call may go out; in half-open only one probe at a time"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    self._trips += 1
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Give up a half-open probe slot without recording an outcome"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._state(),
+                'consecutive_failures': self._failures,
+                'trips': self._trips,
+                'rejected': self._rejected,
+            }
+
+
+def auth_header(server_key):
+    """Basic auth header value for a Midtrans server key"""
+    return "Basic " + base64.b64encode(f"{server_key}:".encode()).decode()
+
+
+class MidtransClient:
+    """Thread-safe Midtrans API client sharing one pooled requests.Session"""
+
+    # Status yang layak dicoba ulang: Midtrans/gateway sedang sibuk atau error sementara
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, server_key, api_base_url, snap_url, connect_timeout=3.05, read_timeout=5,
+                 max_retries=2, backoff=0.2, pool_maxsize=20, breaker=None, observer=None):
+        self.api_base_url = api_base_url.rstrip('/')
+        self.snap_url = snap_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        # observer(method, outcome, seconds) per percobaan; outcome = status HTTP atau nama exception
+        self.observer = observer
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Content-Type': 'application/json',
+            'Authorization': auth_header(server_key),
+        })
+
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter: acak di [0, backoff * 2^attempt] agar retry tidak serempak
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, idempotent=True, **kwargs):
+        """Send one request with retries; raises CircuitOpen when the breaker is open.
+
+        Non-idempotent calls are only retried on a connect timeout, i.e. when the
+        request never reached Midtrans.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpen(f"Midtrans circuit open, {method} {url} rejected")
+
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            return self._send(method, url, idempotent, kwargs)
+        finally:
+            # Exception tak terduga (bug, argumen salah) tidak boleh mengunci probe half-open
+            self.breaker.release()
+
+    def _send(self, method, url, idempotent, kwargs):
+        attempt = 0
+        while True:
+            with self._stats_lock:
+                self._requests += 1
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # ConnectTimeout pasti belum terkirim; error koneksi lain bisa terjadi setelah terkirim
+                self._observe(method, type(e).__name__, started)
+                retryable = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                error = e
+            except requests.exceptions.Timeout as e:
+                self._observe(method, type(e).__name__, started)
+                retryable = idempotent
+                error = e
+            except requests.exceptions.RequestException as e:
+                # Redirect berlebih, body terpotong, dsb.: dihitung gagal tapi tidak dicoba ulang
+                self._observe(method, type(e).__name__, started)
+                retryable = False
+                error = e
+            else:
+                self._observe(method, str(response.status_code), started)
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                retryable = idempotent
+                error = None
+
+            if not retryable or attempt >= self.max_retries:
+                self.breaker.record_failure()
+                with self._stats_lock:
+                    self._failures += 1
+                if error is not None:
+                    raise error
+                return response
+
+            with self._stats_lock:
+                self._retries += 1
+            logger.warning(f"Midtrans {method} {url} failed (attempt {attempt + 1}), retrying: "
+                           f"{error or response.status_code}")
+            self._sleep_before_retry(attempt)
+            attempt += 1
+
+    def _observe(self, method, outcome, started):
+        if self.observer is not None:
+            self.observer(method, outcome, time.perf_counter() - started)
+
+    def get_status(self, order_id):
+        """GET /v2/<order_id>/status; returns the Response (200, 404, ...)"""
+        return self.request('GET', f"{self.api_base_url}/v2/{order_id}/status")
+
+    def create_snap_transaction(self, param):
+        """Create a Snap transaction; returns the response JSON (token, redirect_url)"""
+        response = self.request('POST', self.snap_url, idempotent=False, json=param)
+        if response.status_code not in (200, 201):
+            raise MidtransError(response.status_code, response.text)
+        try:
+            return response.json()
+        except ValueError:
+            raise MidtransError(response.status_code, response.text)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {
+                'requests': self._requests,
+                'retries': self._retries,
+                'failures': self._failures,
+            }
+        stats['circuit'] = self.breaker.stats()
+        return stats
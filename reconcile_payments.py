@@ -0,0 +1,200 @@
+"""
+RECONCILE PAYMENTS
+Cocokkan semua pesanan berstatus pembayaran 'pending' dengan status di Midtrans secara paralel
+
+Contoh:
+    python reconcile_payments.py --workers 8 --rate 20
+    python reconcile_payments.py --midtrans-url http://127.0.0.1:8089   # stand-in lokal
+"""
+
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from app import (app, midtrans, get_db_connection, apply_payment_batch, finish_payment_batch,
+                 logger)
+from midtrans_client import MidtransClient
+
+
+class RateLimiter:
+    """Token bucket: rata-rata `rate` permintaan per detik, burst sebesar `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_pending_orders(limit=None):
+    """Kode pesanan dengan status_pembayaran 'pending', paling lama dulu"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection failed")
+    try:
+        cursor = conn.cursor()
+        query = "SELECT kode_pesanan FROM pesanan WHERE status_pembayaran = 'pending' ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        cursor.execute(query)
+        orders = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        return orders
+    finally:
+        conn.close()
+
+
+def fetch_status(client, limiter, order_id):
+    """Return (order_id, kind, data): kind = 'ok', 'not_found' atau 'error'"""
+    limiter.acquire()
+    try:
+        response = client.get_status(order_id)
+    except requests.exceptions.RequestException as e:
+        return order_id, 'error', str(e)
+    if response.status_code == 200:
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            # Mis. halaman HTML dari gateway dengan HTTP 200
+            return order_id, 'error', 'invalid JSON'
+        # Midtrans juga menjawab HTTP 200 dengan status_code 404 di body
+        if str(data.get('status_code')) == '404':
+            return order_id, 'not_found', data
+        return order_id, 'ok', data
+    if response.status_code == 404:
+        return order_id, 'not_found', None
+    return order_id, 'error', f"HTTP {response.status_code}"
+
+
+def apply_results(results, report):
+    """Terapkan satu batch status Midtrans dalam satu transaksi"""
+    notifications = [(order_id, data) for order_id, data in results
+                     if data.get('transaction_status') != 'pending']
+    report['unchanged'] += len(results) - len(notifications)
+    if not notifications:
+        return
+
+    conn = get_db_connection()
+    if not conn:
+        report['errors'] += len(notifications)
+        return
+    cursor = conn.cursor(dictionary=True)
+    try:
+        outcomes, applied = apply_payment_batch(cursor, notifications)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Reconciliation batch failed: {e}")
+        report['errors'] += len(notifications)
+        return
+    finally:
+        cursor.close()
+        conn.close()
+
+    finish_payment_batch(applied)
+    for (order_id, data), outcome in zip(notifications, outcomes):
+        if outcome in ('paid', 'failed'):
+            report['changed'] += 1
+            report['changes'].append((order_id, data.get('transaction_status'), outcome))
+        else:
+            report['unchanged'] += 1
+
+
+def reconcile(client, workers=8, rate=20.0, batch_size=50, limit=None):
+    """Cek semua pesanan pending ke Midtrans; return dict laporan"""
+    started = time.perf_counter()
+    report = {'checked': 0, 'changed': 0, 'unchanged': 0, 'not_found': 0, 'errors': 0,
+              'changes': [], 'error_details': []}
+
+    orders = load_pending_orders(limit)
+    limiter = RateLimiter(rate)
+    batch = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fetch_status, client, limiter, order_id) for order_id in orders]
+        for future in as_completed(futures):
+            order_id, kind, data = future.result()
+            report['checked'] += 1
+            if kind == 'ok':
+                batch.append((order_id, data))
+                if len(batch) >= batch_size:
+                    apply_results(batch, report)
+                    batch = []
+            elif kind == 'not_found':
+                report['not_found'] += 1
+            else:
+                report['errors'] += 1
+                report['error_details'].append((order_id, data))
+
+    if batch:
+        apply_results(batch, report)
+
+    report['elapsed'] = time.perf_counter() - started
+    return report
+
+
+def print_report(report):
+    print("=" * 60)
+    print("LAPORAN REKONSILIASI PEMBAYARAN")
+    print("=" * 60)
+    print(f"Dicek        : {report['checked']}")
+    print(f"Berubah      : {report['changed']}")
+    print(f"Tetap        : {report['unchanged']}")
+    print(f"Tidak ada di Midtrans: {report['not_found']}")
+    print(f"Error        : {report['errors']}")
+    print(f"Waktu        : {report['elapsed']:.2f} s")
+    if report['changes']:
+        print("-" * 60)
+        for order_id, remote_status, outcome in report['changes']:
+            print(f"   {order_id}: {remote_status} -> {outcome}")
+    if report['error_details']:
+        print("-" * 60)
+        for order_id, error in report['error_details'][:20]:
+            print(f"   {order_id}: {error}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile pending payments against Midtrans")
+    parser.add_argument('--workers', type=int, default=8, help="jumlah request Midtrans paralel")
+    parser.add_argument('--rate', type=float, default=20.0, help="maksimal request per detik")
+    parser.add_argument('--batch-size', type=int, default=50, help="status per transaksi database")
+    parser.add_argument('--limit', type=int, help="batasi jumlah pesanan yang dicek")
+    parser.add_argument('--midtrans-url', help="base URL API Midtrans (mis. stand-in lokal untuk uji)")
+    args = parser.parse_args()
+
+    client = midtrans
+    if args.midtrans_url:
+        client = MidtransClient(
+            server_key=app.config['MIDTRANS_SERVER_KEY'],
+            api_base_url=args.midtrans_url,
+            snap_url=app.config['MIDTRANS_API_URL'],
+            connect_timeout=app.config['MIDTRANS_CONNECT_TIMEOUT'],
+            read_timeout=app.config['MIDTRANS_READ_TIMEOUT'],
+            max_retries=app.config['MIDTRANS_MAX_RETRIES'],
+            pool_maxsize=max(args.workers, 20)
+        )
+
+    report = reconcile(client, workers=args.workers, rate=args.rate,
+                       batch_size=args.batch_size, limit=args.limit)
+    print_report(report)
+    sys.exit(1 if report['errors'] else 0)
@@ -76,6 +76,7 @@ CREATE TABLE IF NOT EXISTS pesanan (
     
     -- Midtrans fields
     midtrans_token VARCHAR(255),
+    midtrans_token_expires_at TIMESTAMP NULL,
     midtrans_order_id VARCHAR(100),
     midtrans_transaction_status VARCHAR(50),
     payment_type VARCHAR(50),
@@ -135,7 +136,10 @@ CREATE TABLE IF NOT EXISTS pembayaran (
     INDEX idx_pesanan_id (pesanan_id),
     INDEX idx_status (status),
     INDEX idx_transaction_id (transaction_id),
-    INDEX idx_tanggal_pembayaran (tanggal_pembayaran)
+    INDEX idx_tanggal_pembayaran (tanggal_pembayaran),
+    
+    -- Satu baris pembayaran per transaksi Midtrans (INSERT IGNORE benar-benar dedup)
+    UNIQUE KEY uq_pembayaran_transaction (pesanan_id, transaction_id)
 );
 
 -- ============================================
@@ -195,6 +199,70 @@ CREATE TABLE IF NOT EXISTS midtrans_logs (
     INDEX idx_created_at (created_at)
 );
 
+-- ============================================
+-- TABEL: midtrans_inbox (antrian notifikasi webhook yang durable)
+-- ============================================
+CREATE TABLE IF NOT EXISTS midtrans_inbox (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    order_id VARCHAR(100) NOT NULL,
+    transaction_status VARCHAR(50),
+    payload JSON NOT NULL,
+    status ENUM('pending', 'processed', 'duplicate', 'ignored', 'failed') DEFAULT 'pending',
+    attempts INT DEFAULT 0,
+    last_error TEXT,
+    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP NULL,
+    INDEX idx_inbox_status (status, id),
+    INDEX idx_inbox_order (order_id)
+);
+
+-- ============================================
+-- TABEL: midtrans_events (idempotensi: satu baris per transisi status yang sudah diterapkan)
+-- ============================================
+CREATE TABLE IF NOT EXISTS midtrans_events (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    order_id VARCHAR(100) NOT NULL,
+    transaction_id VARCHAR(100) NOT NULL DEFAULT '',
+    transaction_status VARCHAR(50) NOT NULL DEFAULT '',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_midtrans_event (order_id, transaction_id, transaction_status)
+);
+
+-- ============================================
+-- TABEL: dashboard_counters (angka dashboard admin, dijaga oleh trigger)
+-- ============================================
+-- nama: 'customers', 'cars', 'active_rentals', 'revenue:YYYY-MM-DD'
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    nama VARCHAR(64) PRIMARY KEY,
+    nilai DECIMAL(15,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- ============================================
+-- TABEL: daily_stats (rollup harian pesanan per tanggal_pemesanan, dijaga oleh trigger)
+-- ============================================
+CREATE TABLE IF NOT EXISTS daily_stats (
+    tanggal DATE PRIMARY KEY,
+    total_orders INT NOT NULL DEFAULT 0,
+    total_customers INT NOT NULL DEFAULT 0,
+    total_revenue DECIMAL(15,2) NOT NULL DEFAULT 0,
+    cars_rented INT NOT NULL DEFAULT 0,
+    paid_orders INT NOT NULL DEFAULT 0,
+    pending_orders INT NOT NULL DEFAULT 0,
+    failed_orders INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Anggota unik per hari (customer = user_id, car = mobil_id pesanan paid) untuk
+-- total_customers dan cars_rented; jumlah = banyaknya pesanan anggota tersebut
+CREATE TABLE IF NOT EXISTS daily_stats_members (
+    tanggal DATE NOT NULL,
+    jenis ENUM('customer', 'car') NOT NULL,
+    member_id INT NOT NULL,
+    jumlah INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tanggal, jenis, member_id)
+);
+
 -- ============================================
 -- DATA AWAL (DUMMY DATA - DIPERBARUI)
 -- ============================================
@@ -331,25 +399,10 @@ BEGIN
     END IF;
 END //
 
--- Trigger untuk update mobil status ketika pesanan dibuat
-CREATE TRIGGER after_insert_pesanan
-AFTER INSERT ON pesanan
-FOR EACH ROW
-BEGIN
-    IF NEW.status = 'pending' OR NEW.status = 'dikonfirmasi' THEN
-        UPDATE mobil SET status = 'disewa' WHERE id = NEW.mobil_id;
-    END IF;
-END //
-
--- Trigger untuk update mobil status ketika pesanan selesai/dibatalkan
-CREATE TRIGGER after_update_pesanan
-AFTER UPDATE ON pesanan
-FOR EACH ROW
-BEGIN
-    IF NEW.status IN ('selesai', 'dibatalkan') AND OLD.status NOT IN ('selesai', 'dibatalkan') THEN
-        UPDATE mobil SET status = 'tersedia' WHERE id = NEW.mobil_id;
-    END IF;
-END //
+-- Catatan: pesanan dan pembayaran TIDAK mengubah mobil.status ('disewa'/'tersedia').
+-- Ketersediaan per tanggal dihitung dari pesanan aktif (lihat CheckCarAvailability
+-- dan AvailabilityIndex di aplikasi), sehingga satu pesanan tidak memblokir
+-- mobil untuk semua tanggal. mobil.status hanya diubah admin (mis. 'maintenance').
 
 -- ============================================
 -- TRIGGER UTAMA: Update status pembayaran dari Midtrans logs (FIXED)
@@ -362,10 +415,10 @@ BEGIN
     DECLARE v_mobil_id INT;
     DECLARE v_user_id INT;
     
-    -- Cari pesanan berdasarkan order_id
+    -- Cari pesanan berdasarkan order_id (tidak dicari saat muat massal, lihat @skip_triggers)
     SELECT id, mobil_id, user_id INTO v_pesanan_id, v_mobil_id, v_user_id
     FROM pesanan 
-    WHERE kode_pesanan = NEW.order_id;
+    WHERE kode_pesanan = NEW.order_id AND @skip_triggers IS NULL;
     
     IF v_pesanan_id IS NOT NULL THEN
         -- Update status berdasarkan transaction_status
@@ -388,10 +441,6 @@ BEGIN
                 updated_at = NOW()
             WHERE id = v_pesanan_id;
             
-            -- Update status mobil menjadi DISEWA
-            UPDATE mobil SET status = 'disewa', updated_at = NOW() 
-            WHERE id = v_mobil_id;
-            
             -- Insert ke tabel pembayaran JIKA belum ada
             INSERT INTO pembayaran (
                 pesanan_id, 
@@ -451,16 +500,223 @@ BEGIN
                 midtrans_transaction_status = NEW.transaction_status,
                 updated_at = NOW()
             WHERE id = v_pesanan_id;
-            
-            -- Kembalikan status mobil menjadi TERSEDIA
-            UPDATE mobil SET status = 'tersedia', updated_at = NOW() 
-            WHERE id = v_mobil_id;
         END IF;
     END IF;
 END //
 
+-- ============================================
+-- TRIGGER DASHBOARD COUNTERS
+-- ============================================
+-- Berjalan di transaksi yang sama dengan perubahan datanya, sehingga
+-- dashboard admin cukup membaca dashboard_counters lewat primary key.
+-- Trigger INSERT dilewati bila sesi men-set @skip_triggers = 1 (muat massal
+-- seed_data.py); counter dan rollup lalu dihitung ulang sekali di akhir.
+
+CREATE PROCEDURE AddDashboardCounter(IN p_nama VARCHAR(64), IN p_delta DECIMAL(15,2))
+BEGIN
+    IF p_delta <> 0 THEN
+        INSERT INTO dashboard_counters (nama, nilai) VALUES (p_nama, p_delta)
+        ON DUPLICATE KEY UPDATE nilai = nilai + p_delta;
+    END IF;
+END //
+
+-- Tambah/kurangi satu anggota unik harian; p_delta = perubahan jumlah anggota unik (-1, 0, 1)
+CREATE PROCEDURE AddDailyMember(
+    IN p_tanggal DATE,
+    IN p_jenis VARCHAR(10),
+    IN p_member_id INT,
+    IN p_sign INT,
+    OUT p_delta INT
+)
+BEGIN
+    DECLARE v_jumlah INT DEFAULT 0;
+    
+    INSERT INTO daily_stats_members (tanggal, jenis, member_id, jumlah)
+    VALUES (p_tanggal, p_jenis, p_member_id, p_sign)
+    ON DUPLICATE KEY UPDATE jumlah = jumlah + p_sign;
+    
+    SELECT jumlah INTO v_jumlah FROM daily_stats_members
+    WHERE tanggal = p_tanggal AND jenis = p_jenis AND member_id = p_member_id;
+    
+    SET p_delta = CASE
+        WHEN p_sign > 0 AND v_jumlah = 1 THEN 1
+        WHEN p_sign < 0 AND v_jumlah = 0 THEN -1
+        ELSE 0
+    END;
+    
+    IF v_jumlah <= 0 THEN
+        DELETE FROM daily_stats_members
+        WHERE tanggal = p_tanggal AND jenis = p_jenis AND member_id = p_member_id;
+    END IF;
+END //
+
+-- Masukkan (p_sign = 1) atau keluarkan (p_sign = -1) satu pesanan dari rollup harian
+CREATE PROCEDURE ApplyDailyStats(
+    IN p_tanggal DATE,
+    IN p_user_id INT,
+    IN p_mobil_id INT,
+    IN p_status_pembayaran VARCHAR(20),
+    IN p_total_harga DECIMAL(10,2),
+    IN p_sign INT
+)
+BEGIN
+    DECLARE v_customer_delta INT DEFAULT 0;
+    DECLARE v_car_delta INT DEFAULT 0;
+    DECLARE v_paid INT DEFAULT 0;
+    
+    SET p_status_pembayaran = IFNULL(p_status_pembayaran, '');
+    SET v_paid = (p_status_pembayaran = 'paid');
+    CALL AddDailyMember(p_tanggal, 'customer', p_user_id, p_sign, v_customer_delta);
+    IF v_paid THEN
+        CALL AddDailyMember(p_tanggal, 'car', p_mobil_id, p_sign, v_car_delta);
+    END IF;
+    
+    INSERT INTO daily_stats (tanggal, total_orders, total_customers, total_revenue, cars_rented,
+                             paid_orders, pending_orders, failed_orders)
+    VALUES (p_tanggal, p_sign, v_customer_delta, IF(v_paid, p_total_harga * p_sign, 0), v_car_delta,
+            v_paid * p_sign,
+            (p_status_pembayaran = 'pending') * p_sign,
+            (p_status_pembayaran = 'failed') * p_sign)
+    ON DUPLICATE KEY UPDATE
+        total_orders = total_orders + VALUES(total_orders),
+        total_customers = total_customers + VALUES(total_customers),
+        total_revenue = total_revenue + VALUES(total_revenue),
+        cars_rented = cars_rented + VALUES(cars_rented),
+        paid_orders = paid_orders + VALUES(paid_orders),
+        pending_orders = pending_orders + VALUES(pending_orders),
+        failed_orders = failed_orders + VALUES(failed_orders);
+END //
+
+CREATE TRIGGER users_counters_insert
+AFTER INSERT ON users
+FOR EACH ROW
+BEGIN
+    IF @skip_triggers IS NULL THEN
+        CALL AddDashboardCounter('customers', NEW.role = 'customer' AND NEW.status = 'active');
+    END IF;
+END //
+
+CREATE TRIGGER users_counters_update
+AFTER UPDATE ON users
+FOR EACH ROW
+BEGIN
+    CALL AddDashboardCounter('customers',
+        (NEW.role = 'customer' AND NEW.status = 'active') - (OLD.role = 'customer' AND OLD.status = 'active'));
+END //
+
+CREATE TRIGGER users_counters_delete
+AFTER DELETE ON users
+FOR EACH ROW
+BEGIN
+    CALL AddDashboardCounter('customers', -(OLD.role = 'customer' AND OLD.status = 'active'));
+END //
+
+CREATE TRIGGER mobil_counters_insert
+AFTER INSERT ON mobil
+FOR EACH ROW
+BEGIN
+    IF @skip_triggers IS NULL THEN
+        CALL AddDashboardCounter('cars', 1);
+    END IF;
+END //
+
+CREATE TRIGGER mobil_counters_delete
+AFTER DELETE ON mobil
+FOR EACH ROW
+BEGIN
+    CALL AddDashboardCounter('cars', -1);
+END //
+
+CREATE TRIGGER pesanan_counters_insert
+AFTER INSERT ON pesanan
+FOR EACH ROW
+BEGIN
+    IF @skip_triggers IS NULL THEN
+        CALL AddDashboardCounter('active_rentals', NEW.status = 'dikonfirmasi');
+        IF NEW.status_pembayaran = 'paid' THEN
+            CALL AddDashboardCounter(CONCAT('revenue:', DATE(NEW.tanggal_pemesanan)), NEW.total_harga);
+        END IF;
+        CALL ApplyDailyStats(DATE(NEW.tanggal_pemesanan), NEW.user_id, NEW.mobil_id,
+                             NEW.status_pembayaran, NEW.total_harga, 1);
+    END IF;
+END //
+
+CREATE TRIGGER pesanan_counters_update
+AFTER UPDATE ON pesanan
+FOR EACH ROW
+BEGIN
+    CALL AddDashboardCounter('active_rentals', (NEW.status = 'dikonfirmasi') - (OLD.status = 'dikonfirmasi'));
+    
+    -- Pendapatan dan rollup harian dihitung per tanggal_pemesanan
+    IF NOT (OLD.status_pembayaran <=> NEW.status_pembayaran
+            AND OLD.total_harga <=> NEW.total_harga
+            AND DATE(OLD.tanggal_pemesanan) <=> DATE(NEW.tanggal_pemesanan)
+            AND OLD.user_id <=> NEW.user_id
+            AND OLD.mobil_id <=> NEW.mobil_id) THEN
+        IF OLD.status_pembayaran = 'paid' THEN
+            CALL AddDashboardCounter(CONCAT('revenue:', DATE(OLD.tanggal_pemesanan)), -OLD.total_harga);
+        END IF;
+        IF NEW.status_pembayaran = 'paid' THEN
+            CALL AddDashboardCounter(CONCAT('revenue:', DATE(NEW.tanggal_pemesanan)), NEW.total_harga);
+        END IF;
+        CALL ApplyDailyStats(DATE(OLD.tanggal_pemesanan), OLD.user_id, OLD.mobil_id,
+                             OLD.status_pembayaran, OLD.total_harga, -1);
+        CALL ApplyDailyStats(DATE(NEW.tanggal_pemesanan), NEW.user_id, NEW.mobil_id,
+                             NEW.status_pembayaran, NEW.total_harga, 1);
+    END IF;
+END //
+
+CREATE TRIGGER pesanan_counters_delete
+AFTER DELETE ON pesanan
+FOR EACH ROW
+BEGIN
+    CALL AddDashboardCounter('active_rentals', -(OLD.status = 'dikonfirmasi'));
+    IF OLD.status_pembayaran = 'paid' THEN
+        CALL AddDashboardCounter(CONCAT('revenue:', DATE(OLD.tanggal_pemesanan)), -OLD.total_harga);
+    END IF;
+    CALL ApplyDailyStats(DATE(OLD.tanggal_pemesanan), OLD.user_id, OLD.mobil_id,
+                         OLD.status_pembayaran, OLD.total_harga, -1);
+END //
+
 DELIMITER ;
 
+-- Isi awal dashboard_counters dari data yang sudah ada (setelah ini dijaga trigger)
+INSERT INTO dashboard_counters (nama, nilai)
+SELECT * FROM (
+    SELECT 'customers' AS counter_nama, COUNT(*) AS jumlah FROM users WHERE role = 'customer' AND status = 'active'
+    UNION ALL
+    SELECT 'cars', COUNT(*) FROM mobil
+    UNION ALL
+    SELECT 'active_rentals', COUNT(*) FROM pesanan WHERE status = 'dikonfirmasi'
+    UNION ALL
+    SELECT CONCAT('revenue:', DATE(tanggal_pemesanan)), SUM(total_harga)
+    FROM pesanan WHERE status_pembayaran = 'paid'
+    GROUP BY DATE(tanggal_pemesanan)
+) AS hitung
+ON DUPLICATE KEY UPDATE nilai = hitung.jumlah;
+
+-- Isi awal rollup harian (sama dengan backfill_daily_stats.py untuk seluruh rentang)
+INSERT INTO daily_stats_members (tanggal, jenis, member_id, jumlah)
+SELECT DATE(tanggal_pemesanan), 'customer', user_id, COUNT(*)
+FROM pesanan GROUP BY DATE(tanggal_pemesanan), user_id
+UNION ALL
+SELECT DATE(tanggal_pemesanan), 'car', mobil_id, COUNT(*)
+FROM pesanan WHERE status_pembayaran = 'paid' GROUP BY DATE(tanggal_pemesanan), mobil_id;
+
+INSERT INTO daily_stats (tanggal, total_orders, total_customers, total_revenue, cars_rented,
+                         paid_orders, pending_orders, failed_orders)
+SELECT 
+    DATE(tanggal_pemesanan),
+    COUNT(*),
+    COUNT(DISTINCT user_id),
+    COALESCE(SUM(CASE WHEN status_pembayaran = 'paid' THEN total_harga END), 0),
+    COUNT(DISTINCT CASE WHEN status_pembayaran = 'paid' THEN mobil_id END),
+    SUM(status_pembayaran = 'paid'),
+    SUM(status_pembayaran = 'pending'),
+    SUM(status_pembayaran = 'failed')
+FROM pesanan
+GROUP BY DATE(tanggal_pemesanan);
+
 -- ============================================
 -- STORED PROCEDURES (DIPERBAIKI)
 -- ============================================
@@ -470,45 +726,39 @@ DELIMITER //
 -- Procedure untuk mendapatkan statistik harian dengan Midtrans
 CREATE PROCEDURE GetDailyStats(IN p_date DATE)
 BEGIN
+    -- Dibaca dari rollup daily_stats (satu lookup primary key)
     SELECT 
-        COUNT(DISTINCT p.id) as total_orders,
-        COUNT(DISTINCT p.user_id) as total_customers,
-        COALESCE(SUM(CASE WHEN p.status_pembayaran = 'paid' THEN p.total_harga ELSE 0 END), 0) as total_revenue,
-        COUNT(DISTINCT CASE WHEN p.status_pembayaran = 'paid' THEN p.mobil_id END) as cars_rented,
-        COUNT(DISTINCT CASE WHEN p.status_pembayaran = 'pending' THEN p.id END) as pending_payments,
-        COUNT(DISTINCT CASE WHEN p.status_pembayaran = 'failed' THEN p.id END) as failed_payments
-    FROM pesanan p
-    WHERE DATE(p.tanggal_pemesanan) = p_date;
+        COALESCE(s.total_orders, 0) as total_orders,
+        COALESCE(s.total_customers, 0) as total_customers,
+        COALESCE(s.total_revenue, 0) as total_revenue,
+        COALESCE(s.cars_rented, 0) as cars_rented,
+        COALESCE(s.pending_orders, 0) as pending_payments,
+        COALESCE(s.failed_orders, 0) as failed_payments
+    FROM (SELECT p_date AS tanggal) d
+    LEFT JOIN daily_stats s ON s.tanggal = d.tanggal;
 END //
 
 -- Procedure untuk mendapatkan pendapatan bulanan dengan detail Midtrans
 CREATE PROCEDURE GetMonthlyRevenue(IN p_year INT, IN p_month INT)
 BEGIN
+    -- Range scan primary key daily_stats untuk satu bulan
     SELECT 
-        DAY(tanggal_pemesanan) as day,
-        COUNT(*) as order_count,
-        COALESCE(SUM(CASE WHEN status_pembayaran = 'paid' THEN total_harga ELSE 0 END), 0) as daily_revenue,
-        COUNT(CASE WHEN status_pembayaran = 'paid' THEN 1 END) as successful_payments,
-        COUNT(CASE WHEN status_pembayaran = 'pending' THEN 1 END) as pending_payments,
-        COUNT(CASE WHEN status_pembayaran = 'failed' THEN 1 END) as failed_payments
-    FROM pesanan 
-    WHERE YEAR(tanggal_pemesanan) = p_year
-    AND MONTH(tanggal_pemesanan) = p_month
-    GROUP BY DAY(tanggal_pemesanan)
-    ORDER BY day;
+        DAY(tanggal) as day,
+        total_orders as order_count,
+        total_revenue as daily_revenue,
+        paid_orders as successful_payments,
+        pending_orders as pending_payments,
+        failed_orders as failed_payments
+    FROM daily_stats 
+    WHERE tanggal BETWEEN MAKEDATE(p_year, 1) + INTERVAL (p_month - 1) MONTH
+                      AND LAST_DAY(MAKEDATE(p_year, 1) + INTERVAL (p_month - 1) MONTH)
+    AND total_orders > 0
+    ORDER BY tanggal;
 END //
 
--- Procedure untuk update status mobil otomatis
+-- Procedure untuk update status pesanan otomatis (mobil.status tidak disentuh)
 CREATE PROCEDURE UpdateCarStatus()
 BEGIN
-    -- Update mobil yang sudah selesai disewa
-    UPDATE mobil m
-    JOIN pesanan p ON m.id = p.mobil_id
-    SET m.status = 'tersedia',
-        m.updated_at = NOW()
-    WHERE p.status = 'selesai'
-    AND p.tanggal_selesai < CURDATE();
-    
     -- Update pesanan yang sudah lewat tanggal selesai
     UPDATE pesanan
     SET status = 'selesai',
@@ -523,20 +773,12 @@ BEGIN
         updated_at = NOW()
     WHERE status_pembayaran = 'pending'
     AND created_at < DATE_SUB(NOW(), INTERVAL 24 HOUR);
-    
-    -- Update mobil untuk pesanan yang expired
-    UPDATE mobil m
-    JOIN pesanan p ON m.id = p.mobil_id
-    SET m.status = 'tersedia',
-        m.updated_at = NOW()
-    WHERE p.status_pembayaran = 'expired'
-    AND p.status = 'dibatalkan';
 END //
 
 -- Procedure untuk mendapatkan token Midtrans untuk pesanan
 CREATE PROCEDURE GetMidtransToken(IN p_order_id VARCHAR(100))
 BEGIN
-    SELECT midtrans_token, status_pembayaran, total_harga, midtrans_order_id
+    SELECT midtrans_token, midtrans_token_expires_at, status_pembayaran, total_harga, midtrans_order_id
     FROM pesanan 
     WHERE kode_pesanan = p_order_id;
 END //
@@ -616,15 +858,6 @@ BEGIN
             WHERE pb.pesanan_id = v_pesanan_id 
             AND pb.transaction_id = p_transaction_id
         );
-        
-        -- Update mobil status if payment successful
-        UPDATE mobil SET status = 'disewa', updated_at = NOW() 
-        WHERE id = v_mobil_id;
-        
-    ELSEIF p_transaction_status IN ('deny', 'cancel', 'expire', 'failure') THEN
-        -- Update mobil status if payment failed
-        UPDATE mobil SET status = 'tersedia', updated_at = NOW() 
-        WHERE id = v_mobil_id;
     END IF;
     
     -- Insert into midtrans_logs
@@ -695,13 +928,6 @@ BEGIN
         updated_at = NOW()
     WHERE kode_pesanan = p_order_id;
     
-    -- Update mobil status
-    IF p_new_status = 'paid' THEN
-        UPDATE mobil SET status = 'disewa', updated_at = NOW() WHERE id = v_mobil_id;
-    ELSEIF p_new_status = 'failed' THEN
-        UPDATE mobil SET status = 'tersedia', updated_at = NOW() WHERE id = v_mobil_id;
-    END IF;
-    
     -- Insert payment record if paid
     IF p_new_status = 'paid' THEN
         INSERT INTO pembayaran (pesanan_id, jumlah, metode, status, tanggal_pembayaran, created_at)
@@ -833,9 +1059,19 @@ CREATE INDEX idx_users_last_login ON users(last_login);
 CREATE INDEX idx_mobil_created ON mobil(created_at);
 CREATE INDEX idx_mobil_harga ON mobil(harga_per_hari);
 CREATE INDEX idx_pesanan_dates ON pesanan(tanggal_mulai, tanggal_selesai);
+CREATE INDEX idx_pesanan_mobil_dates ON pesanan(mobil_id, tanggal_mulai, tanggal_selesai);
 CREATE INDEX idx_pesanan_midtrans ON pesanan(midtrans_token, midtrans_order_id);
-CREATE INDEX idx_pesanan_payment_status ON pesanan(status_pembayaran, status);
+-- Filter admin_orders: kolom kesamaan dulu, tanggal_pemesanan terakhir (range + ORDER BY)
+CREATE INDEX idx_pesanan_payment_status ON pesanan(status_pembayaran, status, tanggal_pemesanan);
+CREATE INDEX idx_pesanan_status_date ON pesanan(status, tanggal_pemesanan);
+CREATE INDEX idx_pesanan_payment_date ON pesanan(status_pembayaran, tanggal_pemesanan);
 CREATE INDEX idx_pesanan_user_date ON pesanan(user_id, tanggal_pemesanan);
+-- Pencarian admin: FULLTEXT parser ngram (cocok substring mulai ngram_token_size = 2 karakter).
+-- Stopword dimatikan saat membuat index: dengan ngram, token yang memuat stopword (mis. 'a') ikut dibuang.
+SET SESSION innodb_ft_enable_stopword = OFF;
+CREATE FULLTEXT INDEX ft_users_search ON users(nama, email, nik, no_telepon) WITH PARSER ngram;
+CREATE FULLTEXT INDEX ft_pesanan_kode ON pesanan(kode_pesanan) WITH PARSER ngram;
+SET SESSION innodb_ft_enable_stopword = ON;
 CREATE INDEX idx_pembayaran_transaction ON pembayaran(transaction_id, status);
 CREATE INDEX idx_pembayaran_date ON pembayaran(tanggal_pembayaran);
 CREATE INDEX idx_midtrans_order_status ON midtrans_logs(order_id, transaction_status);
@@ -892,7 +1128,7 @@ BEGIN
     RETURN new_code;
 END //
 
--- Function untuk cek ketersediaan mobil
+-- Function untuk cek ketersediaan mobil (aplikasi memakai AvailabilityIndex di memori)
 CREATE FUNCTION CheckCarAvailability(
     p_mobil_id INT,
     p_start_date DATE,
@@ -901,17 +1137,14 @@ CREATE FUNCTION CheckCarAvailability(
 BEGIN
     DECLARE is_available BOOLEAN;
     
+    -- Sama dengan AvailabilityIndex di aplikasi: pesanan pending juga memblokir
     SELECT COUNT(*) = 0 INTO is_available
     FROM pesanan p
     WHERE p.mobil_id = p_mobil_id
     AND p.status NOT IN ('dibatalkan', 'selesai')
-    AND p.status_pembayaran = 'paid'
-    AND (
-        (p.tanggal_mulai BETWEEN p_start_date AND p_end_date) OR
-        (p.tanggal_selesai BETWEEN p_start_date AND p_end_date) OR
-        (p_start_date BETWEEN p.tanggal_mulai AND p.tanggal_selesai) OR
-        (p_end_date BETWEEN p.tanggal_mulai AND p.tanggal_selesai)
-    );
+    AND p.status_pembayaran NOT IN ('failed', 'expired')
+    AND p.tanggal_mulai <= p_end_date
+    AND p.tanggal_selesai >= p_start_date;
     
     RETURN is_available;
 END //
@@ -0,0 +1,421 @@
+"""
+REPLAY TRAFFIC
+Ubah access log (baris werkzeug atau logger 'access') menjadi campuran request berbobot dengan jeda antar
+kedatangan yang realistis, lalu putar ulang 1x-50x ke instance yang berjalan
+
+Contoh:
+    python replay_traffic.py app.log --profile-only                    # lihat campuran request dari log
+    python replay_traffic.py app.log app.log.1.gz --url http://localhost:5000 --speed 10 --duration 120
+    python replay_traffic.py app.log --url http://localhost:5000 --speed 50 --db --admin-email admin@rental.com
+
+Log dibaca per baris (boleh .gz hasil rotasi), jadi ukuran log tidak dibatasi memori.
+ID mobil, user, dan kode pesanan di path ditulis ulang ke dataset sintetis:
+--cars/--users (id berurutan dari seed) atau --db untuk mengambil id & kode
+pesanan yang benar-benar ada. Hanya GET dan POST yang aman (cek/sinkron
+pembayaran) yang diputar ulang; POST lain tidak punya body di log dan bisa
+mengubah data.
+"""
+
+import re
+import sys
+import gzip
+import time
+import random
+import argparse
+import threading
+from bisect import bisect_right
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import accumulate
+
+import requests
+
+from loadtest import HttpTransport, percentile
+
+LogRequest = namedtuple('LogRequest', 'timestamp method path status')
+
+ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+WERKZEUG_RE = re.compile(
+    r'^(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - werkzeug - \w+ - \S+ - - \[[^\]]+\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})'
+)
+ACCESS_RE = re.compile(
+    r'^(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - access - \w+ - '
+    r'method=(?P<method>[A-Z]+) path=(?P<path>\S+) .*?status=(?P<status>\d{3})'
+)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+
+# Identifier di path/query -> jenis dataset
+ORDER_CODE_RE = re.compile(r'RENT-\d{8}-[0-9A-Fa-f]{6}')
+CAR_PATH_RE = re.compile(r'^(/(?:admin/)?(?:car|cars|booking)(?:/edit)?/)(\d+)')
+USER_PATH_RE = re.compile(r'^(/(?:api/)?(?:admin/)?users?(?:/edit)?/)(\d+)')
+USER_QUERY_RE = re.compile(r'([?&](?:customer_id|user_id)=)(\d+)')
+
+# Aset statis, logout, dan fitur yang sudah dihapus (chat/socket.io, laporan) tidak diputar
+DEFAULT_EXCLUDE = r'^/(static|uploads|socket\.io)/|^/(logout|metrics|favicon\.ico)|^/(admin/)?(chat|reports)\b'
+SAFE_POSTS = r'^/api/(check|sync)-payment/'
+
+
+# ============================================
+# LOG PARSING
+# ============================================
+
+def open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def read_requests(paths):
+    """Yield LogRequest per access line; once 'access' lines appear, werkzeug lines are skipped.
+
+    Keduanya mencatat request yang sama setelah instrumentasi aktif; baris
+    'access' lebih lengkap, jadi dipakai sebagai sumber utama.
+    """
+    has_access = False
+    for path in paths:
+        with open_log(path) as f:
+            for line in f:
+                match = ACCESS_RE.match(line)
+                if match:
+                    has_access = True
+                elif has_access:
+                    continue
+                else:
+                    match = WERKZEUG_RE.match(ANSI_RE.sub('', line))
+                    if not match:
+                        continue
+                yield LogRequest(
+                    datetime.strptime(match.group('ts'), TIMESTAMP_FORMAT),
+                    match.group('method'),
+                    match.group('path'),
+                    int(match.group('status')),
+                )
+
+
+def template_of(method, path):
+    """Request template: identifiers replaced by placeholders, query string reduced to its keys"""
+    route, _, query = path.partition('?')
+    route = ORDER_CODE_RE.sub('{order}', route)
+    route = CAR_PATH_RE.sub(r'\1{car}', route)
+    route = USER_PATH_RE.sub(r'\1{user}', route)
+    route = re.sub(r'/\d+(?=/|$)', '/{n}', route)
+    keys = sorted({item.partition('=')[0] for item in query.split('&') if item})
+    return f"{method} {route}" + (f"?{'&'.join(keys)}" if keys else '')
+
+
+# ============================================
+# TRAFFIC PROFILE
+# ============================================
+
+class TrafficProfile:
+    """Weighted request templates + empirical inter-arrival gaps, built in one streaming pass.
+
+    Tiap template menyimpan reservoir contoh path asli (variasi query string);
+    jeda antar request juga disampel reservoir sehingga memori tetap kecil.
+    """
+
+    def __init__(self, examples_per_template=50, gap_samples=10000, max_gap=5.0, seed=42):
+        self.examples_per_template = examples_per_template
+        self.gap_samples = gap_samples
+        self.max_gap = max_gap
+        self._rng = random.Random(seed)
+        self.counts = {}    # template -> jumlah
+        self.examples = {}  # template -> [(method, path)]
+        self.gaps = []
+        self._gaps_seen = 0
+        self.skipped = {}   # alasan -> jumlah
+        self.first = None
+        self.last = None
+
+    def _skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def _reservoir(self, pool, seen, item, size):
+        if len(pool) < size:
+            pool.append(item)
+        else:
+            slot = self._rng.randrange(seen)
+            if slot < size:
+                pool[slot] = item
+
+    def add(self, entry, exclude, allow_post, keep_404):
+        if exclude.search(entry.path):
+            self._skip('excluded')
+            return
+        if entry.status == 404 and not keep_404:
+            self._skip('404')
+            return
+        if entry.method != 'GET' and not (entry.method == 'POST' and allow_post.search(entry.path)):
+            self._skip(f'{entry.method} tanpa body')
+            return
+
+        if self.last is not None:
+            gap = (entry.timestamp - self.last).total_seconds()
+            # Jeda panjang = server sepi / sesi berbeda; dipotong agar replay tidak menganggur
+            if gap >= 0:
+                self._gaps_seen += 1
+                self._reservoir(self.gaps, self._gaps_seen, min(gap, self.max_gap), self.gap_samples)
+        if self.first is None:
+            self.first = entry.timestamp
+        self.last = entry.timestamp
+
+        template = template_of(entry.method, entry.path)
+        count = self.counts.get(template, 0) + 1
+        self.counts[template] = count
+        self._reservoir(self.examples.setdefault(template, []), count, (entry.method, entry.path),
+                        self.examples_per_template)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def mean_rate(self):
+        """Requests per second of the (gap-capped) original traffic"""
+        if not self.gaps:
+            return 0.0
+        mean_gap = sum(self.gaps) / len(self.gaps)
+        return 1 / mean_gap if mean_gap else float('inf')
+
+    def sampler(self, seed):
+        """Function returning (template, method, example path, gap seconds) drawn from the profile"""
+        rng = random.Random(seed)
+        templates = list(self.counts)
+        cumulative = list(accumulate(self.counts[template] for template in templates))
+        gaps = self.gaps or [0.0]
+
+        def draw():
+            template = templates[bisect_right(cumulative, rng.random() * cumulative[-1])]
+            method, path = rng.choice(self.examples[template])
+            return template, method, path, rng.choice(gaps)
+        return draw
+
+    def print_summary(self, top=25):
+        span = (self.last - self.first).total_seconds() if self.first else 0
+        print(f"Request    : {self.total} dalam {span / 3600:.1f} jam log, {len(self.counts)} template")
+        print(f"Laju asli  : {self.mean_rate():.2f} req/s (jeda dipotong di {self.max_gap}s)")
+        for reason, count in sorted(self.skipped.items(), key=lambda item: -item[1]):
+            print(f"Dilewati   : {count} ({reason})")
+        print("-" * 60)
+        for template, count in sorted(self.counts.items(), key=lambda item: -item[1])[:top]:
+            print(f"{count / self.total:>7.1%}  {template}")
+
+
+# ============================================
+# IDENTIFIER REWRITING
+# ============================================
+
+class Rewriter:
+    """Map original car/user ids and order codes consistently onto the synthetic dataset"""
+
+    def __init__(self, car_ids, user_ids, order_codes, seed=42):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pools = {'car': list(car_ids), 'user': list(user_ids), 'order': list(order_codes)}
+        self._mapping = {kind: {} for kind in self._pools}
+
+    def _map(self, kind, original):
+        pool = self._pools[kind]
+        if not pool:
+            return original
+        with self._lock:
+            mapped = self._mapping[kind].get(original)
+            if mapped is None:
+                mapped = self._mapping[kind][original] = str(self._rng.choice(pool))
+            return mapped
+
+    def rewrite(self, path):
+        path = ORDER_CODE_RE.sub(lambda m: self._map('order', m.group(0)), path)
+        path = CAR_PATH_RE.sub(lambda m: m.group(1) + self._map('car', m.group(2)), path)
+        path = USER_PATH_RE.sub(lambda m: m.group(1) + self._map('user', m.group(2)), path)
+        return USER_QUERY_RE.sub(lambda m: m.group(1) + self._map('user', m.group(2)), path)
+
+
+def load_dataset_ids(limit):
+    """Car ids, customer ids and recent order codes from the app's database"""
+    from app import get_db_connection
+
+    conn = get_db_connection()
+    if not conn:
+        print("❌ Gagal terhubung ke database")
+        sys.exit(1)
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM mobil ORDER BY id LIMIT %s", (limit,))
+    car_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT id FROM users WHERE role = 'customer' ORDER BY id DESC LIMIT %s", (limit,))
+    user_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT kode_pesanan FROM pesanan ORDER BY id DESC LIMIT %s", (limit,))
+    order_codes = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return car_ids, user_ids, order_codes
+
+
+# ============================================
+# REPLAY
+# ============================================
+
+def login(transport, email, password):
+    try:
+        status, location, _ = transport.request('POST', '/login', data={'email': email, 'password': password})
+    except requests.exceptions.RequestException:
+        return False
+    return status == 302 and '/login' not in location
+
+
+class ReplayStats:
+    """Latency per template measured from the scheduled send time, plus dispatch lag.
+
+    Mengukur dari jadwal (bukan saat request benar-benar berangkat) menghindari
+    coordinated omission: bila server lambat dan antrean pool menumpuk, waktu
+    tunggu di antrean ikut terhitung sebagai latensi yang dirasakan pengguna.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}  # template -> [detik sejak jadwal]
+        self.errors = {}
+        self.lags = []     # detik antara jadwal dan request benar-benar dikirim
+
+    def add(self, template, seconds, lag, ok):
+        with self._lock:
+            self.samples.setdefault(template, []).append(seconds)
+            self.lags.append(lag)
+            if not ok:
+                self.errors[template] = self.errors.get(template, 0) + 1
+
+
+def replay(profile, args):
+    if args.db:
+        car_ids, user_ids, order_codes = load_dataset_ids(args.dataset_limit)
+    else:
+        car_ids, user_ids, order_codes = range(1, args.cars + 1), range(2, args.users + 2), []
+    rewriter = Rewriter(car_ids, user_ids, order_codes, seed=args.seed)
+
+    customers = []
+    for n in range(1, args.sessions + 1):
+        transport = HttpTransport(args.url, args.timeout)
+        if login(transport, args.email_pattern.format(n=n), args.password):
+            customers.append(transport)
+    admin = None
+    if args.admin_email:
+        admin = HttpTransport(args.url, args.timeout)
+        if not login(admin, args.admin_email, args.admin_password):
+            print("❌ Login admin gagal; halaman admin diputar tanpa sesi admin")
+            admin = None
+    anonymous = HttpTransport(args.url, args.timeout)
+    print(f"Sesi       : {len(customers)} pelanggan, admin {'ya' if admin else 'tidak'}")
+    print(f"Kecepatan  : {args.speed}x (~{profile.mean_rate() * args.speed:.1f} req/s)")
+    print("-" * 60)
+
+    stats = ReplayStats()
+    draw = profile.sampler(args.seed)
+    rng = random.Random(args.seed)
+
+    def send(template, method, path, scheduled):
+        if path.startswith(('/admin', '/api/admin')):
+            transport = admin or anonymous
+        else:
+            transport = rng.choice(customers) if customers else anonymous
+        lag = max(time.monotonic() - scheduled, 0.0)
+        try:
+            status, _, _ = transport.request(method, rewriter.rewrite(path))
+            ok = status < 500
+        except requests.exceptions.RequestException:
+            ok = False
+        stats.add(template, time.monotonic() - scheduled, lag, ok)
+
+    # Open loop: request dikirim sesuai jadwal, tidak menunggu respons sebelumnya;
+    # latensi dihitung dari jadwal sehingga antrean di pool tidak tersembunyi
+    sent = 0
+    started = time.monotonic()
+    scheduled = started
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        while time.monotonic() - started < args.duration and (not args.requests or sent < args.requests):
+            template, method, path, gap = draw()
+            scheduled += gap / args.speed
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, template, method, path, scheduled)
+            sent += 1
+    elapsed = time.monotonic() - started
+    return stats, sent, elapsed
+
+
+def print_report(stats, sent, elapsed, top=25):
+    total_errors = sum(stats.errors.values())
+    print(f"Dikirim    : {sent} request dalam {elapsed:.1f}s ({sent / elapsed:.1f} req/s)")
+    print(f"Error 5xx  : {total_errors}")
+    if stats.lags:
+        print(f"Lag kirim  : p50 {percentile(stats.lags, 50) * 1000:.0f} ms, "
+              f"p99 {percentile(stats.lags, 99) * 1000:.0f} ms, maks {max(stats.lags) * 1000:.0f} ms "
+              f"di belakang jadwal (naikkan --concurrency bila besar)")
+    print("Latensi    : dihitung dari jadwal kirim (termasuk antre di pool)")
+    print("-" * 60)
+    print(f"{'template':<44}{'req':>6}{'err':>5}{'p50':>8}{'p95':>8}{'p99':>8}")
+    rows = sorted(stats.samples.items(), key=lambda item: -len(item[1]))[:top]
+    for template, values in rows:
+        print(f"{template[:43]:<44}{len(values):>6}{stats.errors.get(template, 0):>5}"
+              f"{percentile(values, 50) * 1000:>8.1f}{percentile(values, 95) * 1000:>8.1f}"
+              f"{percentile(values, 99) * 1000:>8.1f}")
+    return total_errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay production access log traffic against a running instance")
+    parser.add_argument('logs', nargs='+', help="file log (app.log, app.log.1.gz, ...), urut dari yang terlama")
+    parser.add_argument('--url', help="base URL instance yang berjalan")
+    parser.add_argument('--profile-only', action='store_true', help="hanya tampilkan campuran request")
+    parser.add_argument('--speed', type=float, default=1.0, help="kelipatan laju asli (1-50)")
+    parser.add_argument('--duration', type=float, default=60, help="lama replay (detik)")
+    parser.add_argument('--requests', type=int, default=0, help="batas jumlah request (0 = sampai durasi habis)")
+    parser.add_argument('--concurrency', type=int, default=50, help="request yang boleh berjalan bersamaan")
+    parser.add_argument('--max-gap', type=float, default=5.0, help="jeda antar request terpanjang dari log (detik)")
+    parser.add_argument('--exclude', default=DEFAULT_EXCLUDE, help="regex path yang tidak diputar")
+    parser.add_argument('--allow-post', default=SAFE_POSTS, help="regex path POST yang aman diputar tanpa body")
+    parser.add_argument('--keep-404', action='store_true', help="ikut putar request yang dulu 404")
+    parser.add_argument('--cars', type=int, default=100, help="id mobil sintetis 1..N (tanpa --db)")
+    parser.add_argument('--users', type=int, default=1000, help="id pelanggan sintetis 2..N+1 (tanpa --db)")
+    parser.add_argument('--db', action='store_true', help="ambil id mobil/user/kode pesanan dari database app")
+    parser.add_argument('--dataset-limit', type=int, default=10000, help="batas id per jenis dari --db")
+    parser.add_argument('--sessions', type=int, default=20, help="jumlah sesi pelanggan yang login")
+    parser.add_argument('--email-pattern', default='seed{n}@example.com', help="email akun pelanggan seed, {n} = 1..sessions")
+    parser.add_argument('--password', default='password123', help="password akun seed")
+    parser.add_argument('--admin-email', help="akun admin untuk halaman /admin")
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--timeout', type=float, default=30, help="timeout HTTP (detik)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if not args.profile_only and not args.url:
+        parser.error("--url wajib kecuali --profile-only")
+    if not 0 < args.speed <= 50:
+        parser.error("--speed harus di antara 0 dan 50")
+
+    print("=" * 60)
+    print("REPLAY TRAFFIC")
+    print("=" * 60)
+
+    profile = TrafficProfile(max_gap=args.max_gap, seed=args.seed)
+    exclude, allow_post = re.compile(args.exclude), re.compile(args.allow_post)
+    for entry in read_requests(args.logs):
+        profile.add(entry, exclude, allow_post, args.keep_404)
+    if not profile.total:
+        print("❌ Tidak ada baris access log yang bisa diputar")
+        sys.exit(1)
+    profile.print_summary()
+
+    if args.profile_only:
+        sys.exit(0)
+
+    print("=" * 60)
+    stats, sent, elapsed = replay(profile, args)
+    errors = print_report(stats, sent, elapsed)
+
+    print("=" * 60)
+    if errors:
+        print(f"❌ {errors} request gagal (5xx / koneksi)")
+        sys.exit(1)
+    print("✅ Replay selesai tanpa error server")
@@ -0,0 +1,131 @@
+"""
+SEARCH INDEX
+Inverted index trigram di memori (substring + prefix, hasil berperingkat) dan pembentuk query MySQL FULLTEXT
+"""
+
+import re
+from collections import defaultdict
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Karakter operator BOOLEAN MODE yang tidak boleh lolos dari input pengguna
+BOOLEAN_OPERATORS_RE = re.compile(r'[+\-<>()~*"@]')
+
+# Skor per kata pencarian: sama persis > awalan kata > di tengah kata
+SCORE_EXACT = 3
+SCORE_PREFIX = 2
+SCORE_SUBSTRING = 1
+
+
+def search_words(text):
+    """Lowercased words of a search term or an indexed value"""
+    return WORD_RE.findall(str(text).lower())
+
+
+class TrigramIndex:
+    """Trigram -> doc ids, with substring verification and relevance ranking.
+
+    Semantik sama dengan LIKE '%kata%' per kata: setiap kata pencarian harus
+    muncul di salah satu nilai dokumen. Tidak thread-safe; pemanggil memegang lock.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self._grams = defaultdict(set)  # trigram -> doc ids
+        self._docs = {}                 # doc id -> (nilai lowercase, kata-kata)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _doc_grams(self, values):
+        grams = set()
+        for value in values:
+            for i in range(len(value) - self.n + 1):
+                grams.add(value[i:i + self.n])
+        return grams
+
+    def add(self, doc_id, *values):
+        """Index (or re-index) a document from its searchable values"""
+        self.remove(doc_id)
+        lowered = tuple(str(value).lower() for value in values if value not in (None, ''))
+        words = frozenset(word for value in lowered for word in search_words(value))
+        self._docs[doc_id] = (lowered, words)
+        for gram in self._doc_grams(lowered):
+            self._grams[gram].add(doc_id)
+
+    def remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for gram in self._doc_grams(doc[0]):
+            members = self._grams.get(gram)
+            if members is not None:
+                members.discard(doc_id)
+                if not members:
+                    del self._grams[gram]
+
+    def _candidates(self, word):
+        if len(word) >= self.n:
+            sets = [self._grams.get(word[i:i + self.n], set()) for i in range(len(word) - self.n + 1)]
+            return set.intersection(*sorted(sets, key=len))
+        # Kata pendek: gabungan trigram yang memuatnya (jumlah trigram unik terbatas)
+        return set().union(*(ids for gram, ids in self._grams.items() if word in gram)) | {
+            doc_id for doc_id, (values, _) in self._docs.items()
+            if any(len(value) < self.n and word in value for value in values)
+        }
+
+    def _word_score(self, word, values, words):
+        if word in words:
+            return SCORE_EXACT
+        if any(w.startswith(word) for w in words):
+            return SCORE_PREFIX
+        if any(word in value for value in values):
+            return SCORE_SUBSTRING
+        return 0
+
+    def match(self, query, candidates=None):
+        """Doc id -> score for documents containing every word of query"""
+        words = search_words(query)
+        if not words:
+            return {}
+
+        ids = None
+        for word in sorted(set(words), key=len, reverse=True):
+            found = self._candidates(word)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return {}
+        if candidates is not None:
+            ids &= candidates
+
+        scores = {}
+        for doc_id in ids:
+            values, doc_words = self._docs[doc_id]
+            total = 0
+            for word in words:
+                score = self._word_score(word, values, doc_words)
+                if not score:
+                    break
+                total += score
+            else:
+                scores[doc_id] = total
+        return scores
+
+    def search(self, query, candidates=None, limit=None):
+        """Doc ids ranked by score (ties keep ascending id order)"""
+        scores = self.match(query, candidates)
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+        return ranked[:limit] if limit is not None else ranked
+
+
+def fulltext_query(search, min_token=2):
+    """BOOLEAN MODE AGAINST() string requiring every word, or None if a word is too short.
+
+    Dengan parser ngram setiap kata dicari sebagai frasa n-gram, sehingga
+    hasilnya setara substring. Kata lebih pendek dari ngram_token_size tidak
+    punya token; pemanggil harus kembali ke LIKE.
+    """
+    words = search_words(BOOLEAN_OPERATORS_RE.sub(' ', search or ''))
+    if not words or any(len(word) < min_token for word in words):
+        return None
+    return ' '.join(f'+"{word}"' for word in words)
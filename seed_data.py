@@ -0,0 +1,591 @@
+"""
+SEED DATA
+Isi database dengan data sintetis skala besar (users, mobil, pesanan, pembayaran, midtrans_logs)
+untuk menguji halaman list dan laporan dengan volume realistis
+
+Contoh:
+    python seed_data.py --users 1000 --cars 50 --orders 50000
+    python seed_data.py --users 100000 --cars 500 --orders 10000000 --days 1095
+    python seed_data.py --orders 200000 --method insert --batch 5000
+    python seed_data.py --orders 1000000 --truncate --db-host 127.0.0.1 --db-password rahasia
+
+Akun pelanggan seed memakai email seed{n}@example.com dan satu password
+(default password123, hash bcrypt dihitung sekali lalu dipakai ulang), sama
+dengan default loadtest.py. Pesanan menyebar di --days hari terakhir dengan
+pertumbuhan bertahap dan puncak akhir pekan; status pembayaran mengikuti umur
+pesanan (pending hanya untuk pesanan 2 hari terakhir).
+
+Mode infile (default) memuat file TSV sementara lewat LOAD DATA LOCAL INFILE
+dan butuh local_infile=1 di server MySQL; mode insert memakai INSERT multi-baris.
+Selama muat, sesi men-set @skip_triggers = 1 sehingga trigger INSERT dilewati;
+dashboard_counters dan daily_stats dihitung ulang sekali di akhir.
+
+Koneksi memakai db_config dari create_admin.py (database lokal), bukan
+konfigurasi app - jangan arahkan ke database produksi.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from bisect import bisect_right
+from itertools import accumulate
+from datetime import date, datetime, timedelta
+
+import bcrypt
+import mysql.connector
+
+from create_admin import db_config
+from bench_search import FIRST_NAMES, LAST_NAMES
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CAR_IMAGE_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads', 'cars')
+
+CITIES = ('Jakarta', 'Bandung', 'Surabaya', 'Medan', 'Semarang', 'Yogyakarta', 'Makassar',
+          'Denpasar', 'Malang', 'Bogor', 'Tangerang', 'Bekasi')
+STREETS = ('Merdeka', 'Sudirman', 'Gatot Subroto', 'Diponegoro', 'Ahmad Yani', 'Pahlawan',
+           'Gajah Mada', 'Asia Afrika', 'Pemuda', 'Veteran', 'Cendana', 'Melati')
+PICKUPS = ('Kantor Rental', 'Bandara', 'Stasiun', 'Hotel', 'Alamat Pelanggan')
+PLATE_REGIONS = ('B', 'D', 'L', 'AB', 'DK', 'N', 'F', 'H')
+
+# (merk, model, tipe, transmisi, kapasitas, harga_per_hari minimum, maksimum)
+CAR_MODELS = (
+    ('Toyota', 'Avanza', 'mpv', 'manual', 7, 300000, 400000),
+    ('Toyota', 'Innova Reborn', 'mpv', 'automatic', 7, 550000, 750000),
+    ('Toyota', 'Fortuner', 'suv', 'automatic', 7, 900000, 1300000),
+    ('Toyota', 'Camry', 'sedan', 'automatic', 5, 1000000, 1500000),
+    ('Toyota', 'Hilux', 'truck', 'manual', 5, 700000, 900000),
+    ('Honda', 'Brio', 'hatchback', 'automatic', 5, 250000, 350000),
+    ('Honda', 'HR-V', 'suv', 'automatic', 5, 600000, 800000),
+    ('Honda', 'Civic', 'sedan', 'automatic', 5, 800000, 1100000),
+    ('Daihatsu', 'Xenia', 'mpv', 'manual', 7, 280000, 380000),
+    ('Daihatsu', 'Ayla', 'hatchback', 'manual', 5, 200000, 280000),
+    ('Suzuki', 'Ertiga', 'mpv', 'automatic', 7, 320000, 420000),
+    ('Mitsubishi', 'Pajero Sport', 'suv', 'automatic', 7, 1000000, 1400000),
+    ('Mitsubishi', 'Xpander', 'mpv', 'automatic', 7, 380000, 500000),
+    ('Mazda', 'MX-5', 'sport', 'manual', 2, 1500000, 2500000),
+)
+
+# Bobot jam pemesanan (00..23): sepi dini hari, ramai siang-malam
+HOUR_WEIGHTS = (1, 1, 1, 1, 1, 2, 3, 5, 7, 9, 10, 10, 9, 9, 10, 10, 9, 8, 8, 9, 10, 8, 5, 2)
+# Lama sewa 1..14 hari
+DURATION_WEIGHTS = (30, 25, 15, 10, 6, 4, 4, 1, 1, 1, 1, 1, 0.5, 0.5)
+# (payment_type, bank) dan bobotnya
+PAYMENT_METHODS = (('bank_transfer', 'bca'), ('bank_transfer', 'bni'), ('bank_transfer', 'bri'),
+                   ('bank_transfer', 'permata'), ('qris', None), ('gopay', None), ('credit_card', None))
+PAYMENT_WEIGHTS = (25, 12, 15, 5, 20, 15, 8)
+
+ORDER_COLUMNS = ('id', 'kode_pesanan', 'user_id', 'mobil_id', 'tanggal_pemesanan', 'tanggal_mulai',
+                 'tanggal_selesai', 'durasi_hari', 'total_harga', 'lokasi_penjemputan', 'catatan',
+                 'status', 'metode_pembayaran', 'status_pembayaran', 'midtrans_token',
+                 'midtrans_token_expires_at', 'midtrans_order_id', 'midtrans_transaction_status',
+                 'payment_type', 'bank', 'va_number', 'transaction_time', 'settlement_time',
+                 'tanggal_pembayaran', 'created_at', 'updated_at')
+PAYMENT_COLUMNS = ('pesanan_id', 'jumlah', 'metode', 'status', 'tanggal_pembayaran', 'transaction_id',
+                   'payment_type', 'bank', 'va_number', 'created_at', 'updated_at')
+LOG_COLUMNS = ('order_id', 'transaction_id', 'transaction_status', 'fraud_status', 'payment_type',
+               'bank', 'va_number', 'gross_amount', 'response_data', 'created_at')
+USER_COLUMNS = ('id', 'nama', 'email', 'password', 'nik', 'alamat', 'no_telepon', 'tanggal_lahir',
+                'role', 'status', 'created_at', 'verified_at', 'last_login')
+CAR_COLUMNS = ('id', 'merk', 'model', 'tahun', 'plat_nomor', 'tipe', 'transmisi', 'kapasitas',
+               'harga_per_hari', 'deskripsi', 'gambar', 'status', 'created_at')
+
+# Bobot kumulatif agar rng.choices tidak menjumlah ulang di setiap pesanan
+HOUR_CUM = tuple(accumulate(HOUR_WEIGHTS))
+DURATION_CUM = tuple(accumulate(DURATION_WEIGHTS))
+PAYMENT_CUM = tuple(accumulate(PAYMENT_WEIGHTS))
+OUTCOMES_RECENT = (('pending', 'paid', 'expired', 'failed'), tuple(accumulate((40, 55, 4, 1))))
+OUTCOMES_SETTLED = (('paid', 'expired', 'failed'), tuple(accumulate((80, 16, 4))))
+DURATIONS = tuple(range(1, 15))
+# Undian mobil tambahan bila mobil pertama masih terpakai pesanan aktif lain
+CAR_RETRIES = 5
+
+BASE36 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+# Escape format default LOAD DATA (FIELDS ESCAPED BY '\\')
+TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+# ============================================
+# WRITERS
+# ============================================
+
+class InsertWriter:
+    """Kumpulkan baris lalu kirim sebagai INSERT multi-baris per `batch` baris"""
+
+    def __init__(self, conn, table, columns, batch):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch = batch
+        self.rows = []
+        self.count = 0
+        placeholders = ", ".join(["%s"] * len(columns))
+        # executemany menggabungkan VALUES menjadi satu statement multi-baris
+        self.statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        self.cursor.executemany(self.statement, self.rows)
+        self.conn.commit()
+        self.count += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+
+
+class InfileWriter:
+    """Tulis baris ke file TSV sementara dan muat per `batch` baris dengan LOAD DATA LOCAL INFILE"""
+
+    def __init__(self, conn, table, columns, batch):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.batch = batch
+        self.count = 0
+        self.pending = 0
+        self.file = None
+        self.statement = (
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+            f"({', '.join(columns)})"
+        )
+
+    @staticmethod
+    def encode(value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, str):
+            return value.translate(TSV_ESCAPES)
+        return str(value)
+
+    def add(self, row):
+        if self.file is None:
+            self.file = tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv',
+                                                    delete=False, newline='\n')
+        self.file.write('\t'.join(map(self.encode, row)) + '\n')
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.flush()
+
+    def flush(self):
+        if self.file is None:
+            return
+        path = self.file.name
+        self.file.close()
+        self.file = None
+        try:
+            self.cursor.execute(self.statement, (path,))
+            self.conn.commit()
+        finally:
+            os.unlink(path)
+        self.count += self.pending
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.cursor.close()
+
+
+WRITERS = {'insert': InsertWriter, 'infile': InfileWriter}
+
+
+# ============================================
+# GENERATORS
+# ============================================
+
+def next_id(cursor, table):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cursor.fetchone()[0] + 1
+
+
+def base36(n, width):
+    digits = []
+    for _ in range(width):
+        n, rem = divmod(n, 36)
+        digits.append(BASE36[rem])
+    return ''.join(reversed(digits))
+
+
+def random_datetime(rng, start, end):
+    seconds = int((end - start).total_seconds())
+    return start + timedelta(seconds=rng.randrange(max(1, seconds)))
+
+
+def seed_users(conn, writer, rng, count, password_hash, start, now):
+    """Pelanggan dengan created_at menyebar di rentang seed (urut id)"""
+    cursor = conn.cursor()
+    user_id = next_id(cursor, 'users')
+    cursor.execute("SELECT COUNT(*) FROM users WHERE email LIKE 'seed%@example.com'")
+    seq = cursor.fetchone()[0]
+    cursor.close()
+
+    span = (now - start).total_seconds()
+    for i in range(count):
+        seq += 1
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created = start + timedelta(seconds=int(span * i / max(1, count)))
+        status = rng.choices(('active', 'inactive', 'banned'), (95, 4, 1))[0]
+        last_login = random_datetime(rng, created, now) if status == 'active' and rng.random() < 0.8 else None
+        writer.add((
+            user_id + i,
+            f"{first} {last}",
+            f"seed{seq}@example.com",
+            password_hash,
+            f"{rng.randint(31, 36)}{user_id + i:014d}",
+            f"Jl. {rng.choice(STREETS)} No. {rng.randint(1, 250)}, {rng.choice(CITIES)}",
+            f"08{rng.randint(11, 99)}{rng.randint(10**7, 10**8 - 1)}",
+            date(rng.randint(1960, 2005), rng.randint(1, 12), rng.randint(1, 28)),
+            'customer',
+            status,
+            created,
+            created,
+            last_login,
+        ))
+
+
+def car_image(merk, model):
+    """Gambar placeholder per model (dibuat sekali), nama file relatif ke CAR_IMAGE_FOLDER"""
+    from PIL import Image, ImageDraw
+
+    filename = f"seed_{merk}_{model}".lower().replace(' ', '_').replace('-', '_') + '.jpg'
+    path = os.path.join(CAR_IMAGE_FOLDER, filename)
+    if not os.path.exists(path):
+        os.makedirs(CAR_IMAGE_FOLDER, exist_ok=True)
+        shade = random.Random(filename).randint(60, 200)
+        image = Image.new('RGB', (800, 500), (shade, 90, 255 - shade))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((40, 40, 760, 460), outline=(255, 255, 255), width=6)
+        draw.text((80, 230), f"{merk} {model}", fill=(255, 255, 255))
+        image.save(path, 'JPEG', quality=85)
+    return filename
+
+
+def seed_cars(conn, writer, rng, count, start, images):
+    cursor = conn.cursor()
+    car_id = next_id(cursor, 'mobil')
+    cursor.close()
+
+    for i in range(count):
+        merk, model, tipe, transmisi, kapasitas, low, high = rng.choice(CAR_MODELS)
+        region = rng.choice(PLATE_REGIONS)
+        plate = f"{region} {car_id + i} {rng.choice(BASE36[10:])}{rng.choice(BASE36[10:])}"
+        writer.add((
+            car_id + i,
+            merk,
+            model,
+            rng.randint(2016, 2024),
+            plate,
+            tipe,
+            transmisi,
+            kapasitas,
+            rng.randrange(low, high + 1, 25000),
+            f"{merk} {model} {transmisi}, {kapasitas} kursi, terawat dan bersih.",
+            car_image(merk, model) if images else None,
+            rng.choices(('tersedia', 'maintenance'), (95, 5))[0],
+            start - timedelta(days=rng.randint(0, 180)),
+        ))
+
+
+def day_counts(rng, total, days, growth):
+    """Bagi `total` pesanan ke `days` hari: tumbuh linear `growth`x dan lebih ramai Jumat-Minggu"""
+    today = date.today()
+    first = today - timedelta(days=days - 1)
+    weights = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        trend = 1 + (growth - 1) * offset / max(1, days - 1)
+        weekend = 1.35 if day.weekday() >= 4 else 1.0
+        weights.append(trend * weekend * rng.uniform(0.85, 1.15))
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for _ in range(total - sum(counts)):
+        counts[rng.randrange(days)] += 1
+    return first, counts
+
+
+def payment_outcome(rng, age_hours):
+    outcomes, cum = OUTCOMES_RECENT if age_hours < 48 else OUTCOMES_SETTLED
+    return rng.choices(outcomes, cum_weights=cum)[0]
+
+
+def seed_orders(conn, writers, rng, total, days, growth, now):
+    """Pesanan urut waktu beserta pembayaran (paid) dan log Midtrans (pending + final).
+
+    Pesanan aktif (pending/dikonfirmasi) untuk mobil yang sama tidak pernah tumpang
+    tindih, sama seperti yang dijamin create_booking di aplikasi.
+    """
+    orders, payments, logs = writers
+    cursor = conn.cursor()
+    order_id = next_id(cursor, 'pesanan')
+    cursor.execute("""
+        SELECT id, UNIX_TIMESTAMP(created_at) FROM users
+        WHERE role = 'customer' ORDER BY created_at, id
+    """)
+    users = cursor.fetchall()
+    cursor.execute("SELECT id, harga_per_hari FROM mobil")
+    cars = cursor.fetchall()
+    cursor.close()
+    if not users or not cars:
+        raise RuntimeError("butuh minimal satu pelanggan dan satu mobil (isi --users/--cars)")
+
+    user_ids = [row[0] for row in users]
+    user_created = [float(row[1]) for row in users]
+    car_ids = [row[0] for row in cars]
+    car_prices = {row[0]: int(row[1]) for row in cars}
+    # Sebagian kecil mobil jauh lebih laris (distribusi Pareto)
+    car_cum = []
+    acc = 0.0
+    for _ in car_ids:
+        acc += rng.paretovariate(1.5)
+        car_cum.append(acc)
+    next_free = {}  # car_id -> hari pertama setelah pesanan aktif terakhir
+    hours = range(24)
+    today = now.date()
+    now_seconds = now.hour * 3600 + now.minute * 60 + now.second
+
+    first, counts = day_counts(rng, total, days, growth)
+    for offset, count in enumerate(counts):
+        day = first + timedelta(days=offset)
+        midnight = datetime(day.year, day.month, day.day)
+        limit = max(1, now_seconds) if day == today else 86400
+        seconds = sorted(
+            min(h * 3600 + rng.randrange(3600), limit - 1)
+            for h in rng.choices(hours, cum_weights=HOUR_CUM, k=count)
+        )
+        for second in seconds:
+            ordered = midnight + timedelta(seconds=second)
+            age_hours = (now - ordered).total_seconds() / 3600
+
+            eligible = bisect_right(user_created, ordered.timestamp()) or 1
+            user_id = user_ids[int(eligible * rng.random())]
+            car_id = rng.choices(car_ids, cum_weights=car_cum)[0]
+            durasi = rng.choices(DURATIONS, cum_weights=DURATION_CUM)[0]
+            mulai = day + timedelta(days=int(rng.expovariate(0.25)))
+            selesai = mulai + timedelta(days=durasi - 1)
+            outcome = payment_outcome(rng, age_hours)
+
+            if outcome == 'pending' or (outcome == 'paid' and selesai >= today):
+                # Mobil yang masih terpakai: undi mobil lain, lalu geser mulai ke hari kosong berikutnya
+                for _ in range(CAR_RETRIES):
+                    if next_free.get(car_id, mulai) <= mulai:
+                        break
+                    other = rng.choices(car_ids, cum_weights=car_cum)[0]
+                    if next_free.get(other, mulai) < next_free[car_id]:
+                        car_id = other
+                mulai = max(mulai, next_free.get(car_id, mulai))
+                selesai = mulai + timedelta(days=durasi - 1)
+                next_free[car_id] = selesai + timedelta(days=1)
+            total_harga = car_prices[car_id] * durasi
+
+            payment_type, bank = rng.choices(PAYMENT_METHODS, cum_weights=PAYMENT_CUM)[0]
+            va_number = f"{rng.randrange(10**10, 10**11)}" if bank else None
+            kode = f"RENT-{day:%Y%m%d}-S{base36(order_id, 5)}"
+            transaction_id = '%032x' % rng.getrandbits(128)
+            transaction_id = '-'.join((transaction_id[:8], transaction_id[8:12], transaction_id[12:16],
+                                       transaction_id[16:20], transaction_id[20:]))
+            transaction_time = min(ordered + timedelta(seconds=rng.randint(20, 600)), now)
+
+            token = token_expires = settlement_time = paid_at = None
+            if outcome == 'paid':
+                status = 'selesai' if selesai < today else 'dikonfirmasi'
+                midtrans_status = 'capture' if payment_type == 'credit_card' else 'settlement'
+                settlement_time = min(transaction_time + timedelta(seconds=rng.randint(30, 3600)), now)
+                paid_at = settlement_time
+            elif outcome == 'pending':
+                status = 'pending'
+                midtrans_status = 'pending'
+                token = '%032x' % rng.getrandbits(128)
+                token_expires = ordered + timedelta(hours=24)
+            else:
+                status = 'dibatalkan'
+                midtrans_status = 'expire' if outcome == 'expired' else 'deny'
+            updated = paid_at or (transaction_time + timedelta(hours=24) if outcome == 'expired' else transaction_time)
+            if updated > now:
+                updated = now
+
+            orders.add((
+                order_id, kode, user_id, car_id, ordered, mulai, selesai, durasi, total_harga,
+                rng.choice(PICKUPS), None, status, 'midtrans', outcome, token, token_expires,
+                transaction_id, midtrans_status, payment_type, bank, va_number, transaction_time,
+                settlement_time if midtrans_status == 'settlement' else None, paid_at, ordered, updated,
+            ))
+            if outcome == 'paid':
+                payments.add((
+                    order_id, total_harga, 'midtrans', 'success', paid_at, transaction_id,
+                    payment_type, bank, va_number, paid_at, paid_at,
+                ))
+
+            gross = f"{total_harga}.00"
+            logs.add(midtrans_log(kode, transaction_id, 'pending', None, payment_type, bank,
+                                  va_number, gross, transaction_time))
+            if outcome != 'pending':
+                fraud = 'accept' if payment_type == 'credit_card' else None
+                logs.add(midtrans_log(kode, transaction_id, midtrans_status, fraud, payment_type, bank,
+                                      va_number, gross, updated))
+            order_id += 1
+
+
+def midtrans_log(order_id, transaction_id, status, fraud, payment_type, bank, va_number, gross, at):
+    """Baris midtrans_logs; response_data meniru payload notifikasi (nilai tidak perlu di-escape)"""
+    status_code = {'pending': '201', 'settlement': '200', 'capture': '200'}.get(status, '407')
+    extra = f', "va_numbers": [{{"bank": "{bank}", "va_number": "{va_number}"}}]' if va_number else ''
+    if fraud:
+        extra += f', "fraud_status": "{fraud}"'
+    response = (
+        f'{{"order_id": "{order_id}", "transaction_id": "{transaction_id}", '
+        f'"transaction_status": "{status}", "status_code": "{status_code}", '
+        f'"payment_type": "{payment_type}", "gross_amount": "{gross}", '
+        f'"transaction_time": "{at}"{extra}}}'
+    )
+    return (order_id, transaction_id, status, fraud, payment_type, bank, va_number, gross, response, at)
+
+
+# ============================================
+# MAIN
+# ============================================
+
+def connect(args):
+    config = dict(db_config)
+    for key, value in (('host', args.db_host), ('user', args.db_user),
+                       ('password', args.db_password), ('database', args.db_name)):
+        if value is not None:
+            config[key] = value
+    conn = mysql.connector.connect(**config, allow_local_infile=args.method == 'infile', autocommit=False)
+    cursor = conn.cursor()
+    # Lewati trigger INSERT (lihat rental_mobil.sql) dan pengecekan per baris selama muat massal
+    cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+    cursor.execute("SET @skip_triggers = 1")
+    cursor.close()
+    return conn, config
+
+
+def truncate_orders(conn):
+    cursor = conn.cursor()
+    for table in ('midtrans_logs', 'pembayaran', 'pesanan', 'daily_stats_members', 'daily_stats'):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.close()
+
+
+def rebuild_aggregates(conn):
+    """Hitung ulang counter dashboard dan rollup harian yang dilewati trigger, lalu segarkan statistik"""
+    from app import rebuild_dashboard_counters, rebuild_daily_stats
+
+    cursor = conn.cursor()
+    cursor.execute("SET @skip_triggers = NULL")
+    cursor.execute("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+    cursor.execute("DELETE FROM dashboard_counters")
+    conn.commit()
+    cursor.close()
+    rebuild_dashboard_counters(conn)
+    rebuild_daily_stats(conn)
+
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE TABLE users, mobil, pesanan, pembayaran, midtrans_logs")
+    cursor.fetchall()
+    cursor.close()
+
+
+def run_step(label, conn, args, table, columns, fill):
+    writer = WRITERS[args.method](conn, table, columns, args.batch)
+    started = time.perf_counter()
+    fill(writer)
+    writer.close()
+    elapsed = time.perf_counter() - started
+    rate = writer.count / elapsed if elapsed else 0
+    print(f"✅ {label:<10}{writer.count:>12,} baris  {elapsed:8.1f} s  ({rate:,.0f} baris/s)")
+    return writer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset for scale testing")
+    parser.add_argument('--users', type=int, default=1000, help="jumlah pelanggan baru")
+    parser.add_argument('--cars', type=int, default=50, help="jumlah mobil baru")
+    parser.add_argument('--orders', type=int, default=10000, help="jumlah pesanan baru")
+    parser.add_argument('--days', type=int, default=730, help="rentang hari ke belakang untuk pesanan")
+    parser.add_argument('--growth', type=float, default=3.0, help="rasio volume pesanan hari terakhir / hari pertama")
+    parser.add_argument('--password', default='password123', help="password semua akun seed")
+    parser.add_argument('--method', choices=sorted(WRITERS), default='infile')
+    parser.add_argument('--batch', type=int, help="baris per statement/file (default insert 2000, infile 200000)")
+    parser.add_argument('--no-images', action='store_true', help="jangan buat gambar mobil")
+    parser.add_argument('--truncate', action='store_true',
+                        help="kosongkan pesanan, pembayaran, midtrans_logs dan daily_stats dulu")
+    parser.add_argument('--skip-rebuild', action='store_true', help="lewati rebuild counter/rollup di akhir")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db-host')
+    parser.add_argument('--db-user')
+    parser.add_argument('--db-password')
+    parser.add_argument('--db-name')
+    args = parser.parse_args()
+    if args.batch is None:
+        args.batch = 2000 if args.method == 'insert' else 200000
+
+    try:
+        conn, config = connect(args)
+    except mysql.connector.Error as err:
+        print(f"❌ ERROR KONEKSI DATABASE: {err}")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=args.days)
+
+    print("=" * 60)
+    print("SEED DATA - RENTAL MOBIL")
+    print("=" * 60)
+    print(f"Database: {config['user']}@{config['host']}/{config['database']}")
+    print(f"Metode: {args.method} (batch {args.batch:,})")
+    print(f"Users: {args.users:,}  Mobil: {args.cars:,}  Pesanan: {args.orders:,}  Rentang: {args.days} hari")
+    print("-" * 60)
+
+    started = time.perf_counter()
+    try:
+        if args.truncate:
+            truncate_orders(conn)
+            print("✅ Tabel pesanan, pembayaran, midtrans_logs dan daily_stats dikosongkan")
+
+        if args.users:
+            password_hash = bcrypt.hashpw(args.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            run_step('users', conn, args, 'users', USER_COLUMNS,
+                     lambda w: seed_users(conn, w, rng, args.users, password_hash, start, now))
+        if args.cars:
+            run_step('mobil', conn, args, 'mobil', CAR_COLUMNS,
+                     lambda w: seed_cars(conn, w, rng, args.cars, start, not args.no_images))
+
+        if args.orders:
+            writers = [WRITERS[args.method](conn, table, columns, args.batch)
+                       for table, columns in (('pesanan', ORDER_COLUMNS), ('pembayaran', PAYMENT_COLUMNS),
+                                              ('midtrans_logs', LOG_COLUMNS))]
+            step_started = time.perf_counter()
+            seed_orders(conn, writers, rng, args.orders, args.days, args.growth, now)
+            for writer in writers:
+                writer.close()
+            elapsed = time.perf_counter() - step_started
+            for label, writer in zip(('pesanan', 'pembayaran', 'midtrans'), writers):
+                print(f"✅ {label:<10}{writer.count:>12,} baris")
+            print(f"   {args.orders / elapsed:,.0f} pesanan/s ({elapsed:.1f} s)")
+
+        if not args.skip_rebuild:
+            rebuild_started = time.perf_counter()
+            rebuild_aggregates(conn)
+            print(f"✅ dashboard_counters, daily_stats dan ANALYZE selesai ({time.perf_counter() - rebuild_started:.1f} s)")
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"❌ ERROR DATABASE: {err}")
+        if args.method == 'infile' and err.errno in (1148, 2068, 3948):
+            print("   Aktifkan local_infile=1 di server MySQL atau pakai --method insert")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    print("-" * 60)
+    print(f"Selesai dalam {time.perf_counter() - started:.1f} s")
+    print(f"Login pelanggan seed: seed1@example.com / {args.password}")
+    print("=" * 60)
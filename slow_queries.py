@@ -0,0 +1,172 @@
+"""
+SLOW QUERIES
+Pencatat query lambat di lapisan cursor: fingerprint statement, agregasi count/total/p95, EXPLAIN kejadian pertama
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.DOTALL)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])')
+_PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'\bVALUES\s*\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*',
+                        re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+# Hanya statement baca yang di-EXPLAIN
+EXPLAINABLE = ('SELECT', 'WITH')
+
+
+def fingerprint(statement):
+    """Statement with literals, placeholders and IN/VALUES lists collapsed, whitespace normalised.
+
+    Query dinamis dengan jumlah filter yang sama menghasilkan fingerprint yang
+    sama, berapa pun nilai parameter atau panjang daftar IN (...).
+    """
+    text = _STRING_RE.sub('?', str(statement))
+    text = _COMMENT_RE.sub(' ', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _IN_LIST_RE.sub('IN (...)', text)
+    text = _VALUES_RE.sub('VALUES (...)', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def _verb(text):
+    words = text.lstrip(' (').split(None, 1)
+    return words[0].upper() if words else ''
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class SlowQueryStats:
+    """Aggregate for one fingerprint"""
+
+    def __init__(self, fingerprint, statement, params, sample_size):
+        self.fingerprint = fingerprint
+        self.statement = statement  # contoh pertama, untuk EXPLAIN dan tampilan
+        self.params = params
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=sample_size)  # durasi terakhir, dasar p95
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.explain = None        # list of row dicts
+        self.explain_error = None
+
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'statement': self.statement,
+            'params': self.params,
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'avg_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'p95_ms': round(_percentile(self.recent, 0.95) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'explain': self.explain,
+            'explain_error': self.explain_error,
+        }
+
+
+class SlowQueryLog:
+    """Records statements slower than threshold, grouped by fingerprint.
+
+    explain(statement, params) -> list of row dicts; dipanggil sekali per
+    fingerprint di thread terpisah agar request yang lambat tidak bertambah lambat.
+    """
+
+    def __init__(self, threshold=0.2, explain=None, max_fingerprints=200, sample_size=200):
+        self.threshold = threshold
+        self._explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._recorded = 0
+        self._overflow = 0
+
+    def observe(self, seconds, statement, params=None):
+        """InstrumentedCursor callback; cheap no-op below the threshold"""
+        if seconds < self.threshold or not statement:
+            return
+        key = fingerprint(statement)
+        if _verb(key) == 'EXPLAIN':
+            return
+        new_entry = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    self._overflow += 1
+                    return
+                entry = new_entry = self._entries[key] = SlowQueryStats(
+                    key, str(statement), _safe_params(params), self.sample_size)
+            entry.count += 1
+            entry.total += seconds
+            entry.max = max(entry.max, seconds)
+            entry.recent.append(seconds)
+            entry.last_seen = time.time()
+            self._recorded += 1
+        if new_entry is not None:
+            logger.warning(f"Slow query ({seconds * 1000:.0f} ms): {key[:200]}")
+            if self._explain is not None:
+                threading.Thread(target=self._capture_explain, args=(new_entry, statement, params),
+                                 name='slow-query-explain', daemon=True).start()
+
+    def _capture_explain(self, entry, statement, params):
+        if _verb(entry.fingerprint) not in EXPLAINABLE:
+            entry.explain_error = 'EXPLAIN hanya untuk SELECT'
+            return
+        try:
+            entry.explain = self._explain(statement, params)
+        except Exception as e:
+            entry.explain_error = str(e)
+            logger.warning(f"EXPLAIN failed for slow query: {e}")
+
+    def entries(self, sort='total'):
+        """Aggregates as dicts, worst first by total, count, p95 or max"""
+        key = {'count': 'count', 'p95': 'p95_ms', 'max': 'max_ms'}.get(sort, 'total_ms')
+        with self._lock:
+            rows = [entry.to_dict() for entry in self._entries.values()]
+        return sorted(rows, key=lambda row: row[key], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._recorded = 0
+            self._overflow = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threshold_ms': round(self.threshold * 1000, 3),
+                'fingerprints': len(self._entries),
+                'recorded': self._recorded,
+                'overflow': self._overflow,
+            }
+
+
+def _safe_params(params):
+    """Parameters as a short printable tuple (nilai panjang dipotong)"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = tuple(params.values())
+    return tuple(value if not isinstance(value, str) or len(value) <= 80 else value[:77] + '...'
+                 for value in params)
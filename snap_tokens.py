@@ -0,0 +1,142 @@
+"""
+SNAP TOKEN MANAGER
+Cache token Snap per kode_pesanan: sadar masa berlaku, satu pembuatan per pesanan (single-flight), dan prefetch di background
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Pembuatan token yang sedang berjalan; pemanggil lain menunggu hasilnya"""
+
+    __slots__ = ('done', 'token')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.token = None
+
+
+class SnapTokenManager:
+    """Expiry-aware Snap token cache with per-order single-flight creation"""
+
+    def __init__(self, create_token, store_token, ttl_minutes=1440, refresh_margin=300,
+                 max_entries=5000, wait_timeout=15, prefetch_workers=2):
+        # create_token(order_data, ttl_minutes) -> token or None (panggilan ke Midtrans)
+        # store_token(kode_pesanan, token, expires_at) menyimpan token ke pesanan
+        self._create_token = create_token
+        self._store_token = store_token
+        self.ttl_minutes = ttl_minutes
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()  # kode_pesanan -> (token, expires_at)
+        self._flights = {}            # kode_pesanan -> _Flight
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='snap-token')
+
+        self._hits = 0
+        self._misses = 0
+        self._created = 0
+        self._coalesced = 0
+        self._failures = 0
+        self._prefetched = 0
+
+    def _usable(self, expires_at):
+        return expires_at is not None and expires_at - self.refresh_margin > datetime.now()
+
+    def _fallback(self, kode_pesanan, stored_token, stored_expires_at):
+        """Stored token to use when no new one could be created: only while it has not expired"""
+        if stored_token and stored_expires_at is not None and stored_expires_at > datetime.now():
+            logger.warning(f"Falling back to stored Snap token for {kode_pesanan}")
+            return stored_token
+        return None
+
+    def _remember(self, kode_pesanan, token, expires_at):
+        self._tokens[kode_pesanan] = (token, expires_at)
+        self._tokens.move_to_end(kode_pesanan)
+        while len(self._tokens) > self.max_entries:
+            self._tokens.popitem(last=False)
+
+    def get_token(self, kode_pesanan, build_order_data, stored_token=None, stored_expires_at=None):
+        """Return a Snap token that is still valid, creating at most one per order at a time.
+
+        build_order_data() is only called when a new token must be created.
+        stored_token/stored_expires_at are the values already read from pesanan.
+        """
+        with self._lock:
+            cached = self._tokens.get(kode_pesanan)
+            if cached and self._usable(cached[1]):
+                self._tokens.move_to_end(kode_pesanan)
+                self._hits += 1
+                return cached[0]
+            if stored_token and self._usable(stored_expires_at):
+                self._remember(kode_pesanan, stored_token, stored_expires_at)
+                self._hits += 1
+                return stored_token
+
+            self._misses += 1
+            flight = self._flights.get(kode_pesanan)
+            leader = flight is None
+            if leader:
+                flight = self._flights[kode_pesanan] = _Flight()
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            flight.done.wait(self.wait_timeout)
+            return flight.token or self._fallback(kode_pesanan, stored_token, stored_expires_at)
+
+        try:
+            token = self._create_token(build_order_data(), self.ttl_minutes)
+            if token:
+                expires_at = datetime.now() + timedelta(minutes=self.ttl_minutes)
+                self._store_token(kode_pesanan, token, expires_at)
+                with self._lock:
+                    self._remember(kode_pesanan, token, expires_at)
+                    self._created += 1
+            else:
+                with self._lock:
+                    self._failures += 1
+            flight.token = token
+        except Exception as e:
+            logger.error(f"Error creating Snap token for {kode_pesanan}: {e}")
+            with self._lock:
+                self._failures += 1
+        finally:
+            with self._lock:
+                self._flights.pop(kode_pesanan, None)
+            flight.done.set()
+
+        # Token lama (masih dalam refresh_margin) hanya dipakai bila Midtrans menolak membuat token baru;
+        # token kedaluwarsa atau tanpa info kedaluwarsa tidak pernah dikembalikan
+        return flight.token or self._fallback(kode_pesanan, stored_token, stored_expires_at)
+
+    def prefetch(self, kode_pesanan, build_order_data):
+        """Create the token in the background so the payment page is a cache hit"""
+        with self._lock:
+            self._prefetched += 1
+        self._executor.submit(self.get_token, kode_pesanan, build_order_data)
+
+    def invalidate(self, kode_pesanan):
+        with self._lock:
+            self._tokens.pop(kode_pesanan, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._tokens),
+                'in_flight': len(self._flights),
+                'hits': self._hits,
+                'misses': self._misses,
+                'created': self._created,
+                'coalesced': self._coalesced,
+                'failures': self._failures,
+                'prefetched': self._prefetched,
+            }
@@ -131,6 +131,43 @@ function confirmAction(message, callback) {
     }
 }
 
+// Typeahead: isi <datalist> dari /api/suggest saat mengetik
+function attachSuggest(input, scope) {
+    if (!input) return;
+    
+    const list = document.createElement('datalist');
+    list.id = input.id + '-suggestions';
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    input.after(list);
+    
+    let timer;
+    let controller;
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) {
+            list.innerHTML = '';
+            return;
+        }
+        timer = setTimeout(() => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch(`/api/suggest?scope=${scope}&q=${encodeURIComponent(query)}`, { signal: controller.signal })
+                .then(response => response.json())
+                .then(data => {
+                    list.innerHTML = '';
+                    (data.suggestions || []).forEach(item => {
+                        const option = document.createElement('option');
+                        option.value = item.text;
+                        list.appendChild(option);
+                    });
+                })
+                .catch(() => {});
+        }, 100);
+    });
+}
+
 // Initialize when document is ready
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize socket
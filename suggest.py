@@ -0,0 +1,244 @@
+"""
+SUGGEST
+Prefix trie untuk typeahead: top-N saran per awalan dari cache di tiap node, diperbarui per baris
+"""
+
+import time
+import heapq
+import logging
+import threading
+from collections import Counter
+
+from search_index import search_words
+
+logger = logging.getLogger(__name__)
+
+
+class _Node:
+    __slots__ = ('depth', 'children', 'entries', 'top')
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.children = None  # None = daun (semua key di bawahnya ada di entries)
+        self.entries = {}     # (key, text, kind) -> entry; di node dalam hanya key yang berakhir di sini
+        self.top = []         # top_k entry terbaik di subtree, terurut
+
+
+class PrefixTrie:
+    """Burst trie: leaves hold up to burst_size keys, every node caches its top_k entries.
+
+    Entry = (-weight, text, kind, key) so sorting ascending puts the best first.
+    Setiap awal kata dari teks menjadi key, jadi "Budi Santoso" juga muncul untuk
+    awalan "san"; jenis di whole_kinds (email, plat, kode) hanya cocok dari awal.
+    Tidak thread-safe; pemanggil memegang lock.
+    """
+
+    def __init__(self, top_k=20, burst_size=64, max_depth=32, whole_kinds=()):
+        self.top_k = top_k
+        self.burst_size = burst_size
+        self.max_depth = max_depth
+        self.whole_kinds = frozenset(whole_kinds)
+        self._root = _Node(0)
+        self._weights = {}  # (text, kind) -> jumlah baris yang memakai teks ini
+
+    def __len__(self):
+        return len(self._weights)
+
+    def _keys(self, text, kind):
+        words = search_words(text)
+        if kind in self.whole_kinds:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:]) for i in range(len(words))}
+
+    def add(self, text, kind, count=1):
+        """Count one more row (or count rows) using text"""
+        if not text:
+            return
+        ident = (text, kind)
+        weight = self._weights.get(ident, 0)
+        for key in self._keys(text, kind):
+            if weight:
+                self._remove_entry(key, text, kind)
+            self._insert((-(weight + count), text, kind, key))
+        self._weights[ident] = weight + count
+
+    def remove(self, text, kind):
+        ident = (text, kind)
+        weight = self._weights.get(ident, 0)
+        if not weight:
+            return
+        for key in self._keys(text, kind):
+            self._remove_entry(key, text, kind)
+            if weight > 1:
+                self._insert((-(weight - 1), text, kind, key))
+        if weight > 1:
+            self._weights[ident] = weight - 1
+        else:
+            del self._weights[ident]
+
+    def _push_top(self, node, entry):
+        top = node.top
+        if len(top) < self.top_k or entry < top[-1]:
+            top.append(entry)
+            top.sort()
+            del top[self.top_k:]
+
+    def _recompute_top(self, node):
+        pools = [node.entries.values()]
+        if node.children:
+            pools.extend(child.top for child in node.children.values())
+        node.top = heapq.nsmallest(self.top_k, (entry for pool in pools for entry in pool))
+
+    def _insert(self, entry):
+        key = entry[3]
+        node = self._root
+        while True:
+            self._push_top(node, entry)
+            if node.children is None or len(key) == node.depth:
+                node.entries[(key, entry[1], entry[2])] = entry
+                if node.children is None and len(node.entries) > self.burst_size \
+                        and node.depth < self.max_depth:
+                    self._burst(node)
+                return
+            node = node.children.setdefault(key[node.depth], _Node(node.depth + 1))
+
+    def _burst(self, node):
+        entries = node.entries
+        node.entries = {}
+        node.children = {}
+        for ident, entry in entries.items():
+            key = ident[0]
+            if len(key) == node.depth:
+                node.entries[ident] = entry
+            else:
+                child = node.children.setdefault(key[node.depth], _Node(node.depth + 1))
+                child.entries[ident] = entry
+        for child in node.children.values():
+            self._recompute_top(child)
+            if len(child.entries) > self.burst_size and child.depth < self.max_depth:
+                self._burst(child)
+
+    def _remove_entry(self, key, text, kind):
+        ident = (key, text, kind)
+        path = [self._root]
+        node = self._root
+        while node.children is not None and len(key) > node.depth:
+            node = node.children.get(key[node.depth])
+            if node is None:
+                return
+            path.append(node)
+        entry = node.entries.pop(ident, None)
+        if entry is None:
+            return
+        for visited in reversed(path):
+            if entry in visited.top:
+                self._recompute_top(visited)
+
+    def suggest(self, prefix, limit=10):
+        """Up to limit {'text', 'type'} completions for prefix, most used first"""
+        prefix = ' '.join(search_words(prefix))
+        if not prefix:
+            return []
+        node = self._root
+        while node.children is not None and node.depth < len(prefix):
+            node = node.children.get(prefix[node.depth])
+            if node is None:
+                return []
+        if node.depth == len(prefix):
+            candidates = node.top
+        else:
+            # Daun: saring key yang benar-benar diawali prefix (paling banyak burst_size)
+            candidates = heapq.nsmallest(self.top_k, (
+                entry for (key, _, _), entry in node.entries.items() if key.startswith(prefix)
+            ))
+
+        results = []
+        seen = set()
+        for _, text, kind, _ in candidates:
+            if (text, kind) in seen:
+                continue
+            seen.add((text, kind))
+            results.append({'text': text, 'type': kind})
+            if len(results) >= limit:
+                break
+        return results
+
+
+class SuggestionSource:
+    """PrefixTrie over rows from a loader; full reload after max_age, per-row refresh between"""
+
+    def __init__(self, loader, fields, max_age=600, **trie_options):
+        # loader(row_id=None) -> list of row dicts ('id' + fields), or None when the database is unavailable
+        # fields: {kolom: jenis saran}, mis. {'nama': 'name', 'email': 'email'}
+        self._loader = loader
+        self.fields = fields
+        self.max_age = max_age
+        self._trie_options = trie_options
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        self._trie = PrefixTrie(**trie_options)
+        self._rows = {}  # id -> ((teks, jenis), ...) untuk menghapus baris lama
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.max_age
+
+    def _row_items(self, row):
+        return tuple((str(row[column]), kind) for column, kind in self.fields.items() if row.get(column))
+
+    def ensure_loaded(self):
+        if self._is_fresh():
+            return True
+        with self._load_lock:
+            if self._is_fresh():
+                return True
+            rows = self._loader()
+            if rows is None:
+                return self._loaded_at is not None
+            indexed = {row['id']: self._row_items(row) for row in rows}
+            # Hitung bobot dulu agar tiap teks disisipkan sekali, bukan dinaikkan per baris
+            counts = Counter(item for items in indexed.values() for item in items)
+            trie = PrefixTrie(**self._trie_options)
+            for (text, kind), count in counts.items():
+                trie.add(text, kind, count)
+            with self._lock:
+                self._trie = trie
+                self._rows = indexed
+                self._loaded_at = time.monotonic()
+            logger.info(f"Suggestion index loaded: {len(rows)} rows")
+        return True
+
+    def _drop(self, row_id):
+        for text, kind in self._rows.pop(row_id, ()):
+            self._trie.remove(text, kind)
+
+    def refresh(self, row_id):
+        """Re-read one row after an insert or update"""
+        if self._loaded_at is None:
+            return
+        rows = self._loader(row_id)
+        if rows is None:
+            with self._lock:
+                self._loaded_at = None
+            return
+        with self._lock:
+            self._drop(row_id)
+            for row in rows:
+                items = self._row_items(row)
+                for text, kind in items:
+                    self._trie.add(text, kind)
+                self._rows[row['id']] = items
+
+    def remove(self, row_id):
+        with self._lock:
+            self._drop(row_id)
+
+    def suggest(self, prefix, limit=10):
+        if not self.ensure_loaded():
+            return []
+        with self._lock:
+            return self._trie.suggest(prefix, limit)
+
+    def stats(self):
+        with self._lock:
+            return {'rows': len(self._rows), 'texts': len(self._trie), 'loaded': self._loaded_at is not None}
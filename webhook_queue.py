@@ -0,0 +1,237 @@
+"""
+WEBHOOK QUEUE
+Antrian notifikasi Midtrans: disimpan dulu (durable), lalu diproses worker per batch di belakang layar
+"""
+
+import time
+import zlib
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookEvent:
+    """Satu notifikasi yang sudah tersimpan di inbox"""
+
+    __slots__ = ('id', 'order_id', 'payload', 'enqueued_at')
+
+    def __init__(self, event_id, order_id, payload, enqueued_at=None):
+        self.id = event_id
+        self.order_id = order_id
+        self.payload = payload
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.monotonic()
+
+
+class WebhookQueue:
+    """Durable, sharded webhook queue drained by batching worker threads.
+
+    Events are persisted with persist() before enqueue() returns, so a crash only
+    delays them: the app calls start() once at startup, which reloads rows left
+    pending by a previous run with load_pending(). If the database is unreachable
+    then, the reload is retried on the next start()/enqueue(). Each order_id always
+    hashes to the same worker, so notifications for one order are applied in arrival
+    order while different orders proceed in parallel.
+    """
+
+    def __init__(self, persist, load_pending, handler, on_failure, workers=4, batch_size=50,
+                 batch_wait=0.05, max_attempts=5, retry_backoff=0.5):
+        # persist(order_id, payload) -> event id, or None when it could not be stored
+        # load_pending() -> [WebhookEvent] not yet processed, or None
+        # handler([WebhookEvent]) applies a batch in one transaction; raises on failure
+        # on_failure(WebhookEvent, error) records an event that exhausted its retries
+        self._persist = persist
+        self._load_pending = load_pending
+        self._handler = handler
+        self._on_failure = on_failure
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+
+        self._queues = [queue.Queue() for _ in range(self.workers)]
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._recovered_pending = False
+        self._early_ids = set()  # event id yang di-enqueue sebelum pemulihan berhasil
+        self._stats_lock = threading.Lock()
+
+        self._enqueued = 0
+        self._recovered = 0
+        self._processed = 0
+        self._failed = 0
+        self._retries = 0
+        self._batches = 0
+        self._batch_items = 0
+        self._batch_max = 0
+        self._last_batch = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._last_lag = 0.0
+
+    # ----------------------------------------
+    # Producer side
+    # ----------------------------------------
+
+    def _shard(self, order_id):
+        return zlib.crc32(str(order_id).encode()) % self.workers
+
+    def start(self):
+        """Start the worker threads (once) and requeue events left pending by a previous run"""
+        if self._threads and self._recovered_pending:
+            return
+        with self._start_lock:
+            if not self._recovered_pending:
+                self._recover()
+            if self._threads:
+                return
+            threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, args=(index,),
+                                          name=f"webhook-worker-{index}", daemon=True)
+                thread.start()
+                threads.append(thread)
+            self._threads = threads
+
+    def _recover(self):
+        pending = self._load_pending()
+        if pending is None:
+            logger.warning("Webhook queue could not load pending events; retrying on next enqueue")
+            return
+        # Event yang sudah masuk antrean di proses ini jangan dimasukkan dua kali
+        pending = [event for event in pending if event.id not in self._early_ids]
+        for event in pending:
+            self._queues[self._shard(event.order_id)].put(event)
+        with self._stats_lock:
+            self._recovered += len(pending)
+        self._recovered_pending = True
+        self._early_ids.clear()
+        if pending:
+            logger.info(f"Webhook queue recovered {len(pending)} pending events")
+
+    def enqueue(self, order_id, payload):
+        """Persist and enqueue one notification; False if it could not be stored.
+
+        start() is normally already called at app startup; calling it here is only
+        a safety net (and retries a recovery that failed then).
+        """
+        self.start()
+        event_id = self._persist(order_id, payload)
+        if event_id is None:
+            return False
+        if not self._recovered_pending:
+            with self._start_lock:
+                self._early_ids.add(event_id)
+        self._queues[self._shard(order_id)].put(WebhookEvent(event_id, order_id, payload))
+        with self._stats_lock:
+            self._enqueued += 1
+        return True
+
+    # ----------------------------------------
+    # Worker side
+    # ----------------------------------------
+
+    def _next_batch(self, shard):
+        """Block for one event, then gather more for up to batch_wait seconds"""
+        batch = [shard.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(shard.get(timeout=remaining) if remaining > 0 else shard.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, index):
+        shard = self._queues[index]
+        while True:
+            batch = self._next_batch(shard)
+            try:
+                self._handler(batch)
+                self._record(batch, len(batch))
+            except Exception as e:
+                logger.warning(f"Webhook batch of {len(batch)} failed, retrying one by one: {e}")
+                self._process_singly(batch)
+            finally:
+                for _ in batch:
+                    shard.task_done()
+
+    def _process_singly(self, batch):
+        """Isolate a failing event; later events wait so per-order ordering is kept"""
+        for event in batch:
+            attempts = 0
+            while True:
+                try:
+                    self._handler([event])
+                    self._record([event], 1)
+                    break
+                except Exception as e:
+                    attempts += 1
+                    if attempts >= self.max_attempts:
+                        logger.error(f"Webhook event {event.id} for order {event.order_id} "
+                                     f"failed after {attempts} attempts: {e}")
+                        try:
+                            self._on_failure(event, e)
+                        except Exception as failure_error:
+                            logger.error(f"Could not record failed webhook event {event.id}: {failure_error}")
+                        with self._stats_lock:
+                            self._failed += 1
+                        break
+                    with self._stats_lock:
+                        self._retries += 1
+                    time.sleep(self.retry_backoff * (2 ** (attempts - 1)))
+
+    def _record(self, events, batch_size):
+        now = time.monotonic()
+        with self._stats_lock:
+            self._batches += 1
+            self._batch_items += batch_size
+            self._batch_max = max(self._batch_max, batch_size)
+            self._last_batch = batch_size
+            for event in events:
+                lag = now - event.enqueued_at
+                self._processed += 1
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+                self._last_lag = lag
+
+    # ----------------------------------------
+    # Observability
+    # ----------------------------------------
+
+    def _oldest_age(self):
+        now = time.monotonic()
+        oldest = 0.0
+        for shard in self._queues:
+            with shard.mutex:
+                if shard.queue:
+                    oldest = max(oldest, now - shard.queue[0].enqueued_at)
+        return oldest
+
+    def stats(self):
+        """Queue depth, lag and batch statistics for the admin dashboard"""
+        depths = [shard.qsize() for shard in self._queues]
+        oldest = self._oldest_age()
+        with self._stats_lock:
+            return {
+                'workers': self.workers,
+                'running': bool(self._threads),
+                'depth': sum(depths),
+                'depth_per_worker': depths,
+                'oldest_pending_ms': round(oldest * 1000, 3),
+                'enqueued': self._enqueued,
+                'recovered': self._recovered,
+                'processed': self._processed,
+                'failed': self._failed,
+                'retries': self._retries,
+                'batches': self._batches,
+                'batch_size_avg': round(self._batch_items / self._batches, 2) if self._batches else 0.0,
+                'batch_size_max': self._batch_max,
+                'batch_size_last': self._last_batch,
+                'lag_avg_ms': round(self._lag_total * 1000 / self._processed, 3) if self._processed else 0.0,
+                'lag_max_ms': round(self._lag_max * 1000, 3),
+                'lag_last_ms': round(self._last_lag * 1000, 3),
+            }